@@ -0,0 +1,315 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.CATEGORIZE import categorize_transactions
+from app.RECURRING import recurring_rows, find_recurring
+from app.ROLLING import rolling_cash_flow
+from app.FORECAST import forecast_monthly
+
+COMMON_KEYWORDS = ['amazon', 'zomato', 'blinkit', 'dmrc', 'razorpay', 'swiggy',
+                   'uber', 'ola', 'paytm', 'google', 'lic', 'airtel', 'jio']
+GROUP_COLUMNS = ["key", "direction", "band"]
+
+
+def to_paise(values):
+    """Money as integer paise, so partial sums add up exactly in any order"""
+    return np.rint(np.nan_to_num(np.asarray(values, dtype=float)) * 100).astype(np.int64)
+
+
+def _empty_sums(columns, index_dtype):
+    return pd.DataFrame({c: pd.Series(dtype=np.int64) for c in columns},
+                        index=pd.Index([], dtype=index_dtype))
+
+
+class AnalysisPartial:
+    """Mergeable aggregates behind analyze_bank_transactions()
+
+    A partial summarizes one slice of a statement (a chunk read from disk,
+    a shard of a large frame). Partials of consecutive slices merge into
+    the partial of the whole, and finalize() turns it into the analysis
+    dict. Amounts are summed as integer paise, so the merge is exact and
+    the result doesn't depend on how the statement was split.
+
+    State is bounded by calendar days and distinct description keys,
+    except for the recurring-detection rows: key code, direction, band,
+    date and amount per transaction (about 40 bytes each, no text).
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.debit_rows = 0
+        self.credit_rows = 0
+        self.start = None
+        self.end = None
+        self.has_bal = False
+        self.first_bal = None
+        self.last_bal = None
+        self.has_desc = False
+        # Per calendar day (days since epoch): dr/cr paise
+        self.daily = _empty_sums(["dr", "cr"], np.int64)
+        # Per calendar day: closing (last row) and lowest balance
+        self.balances = pd.DataFrame({"close": pd.Series(dtype=float), "low": pd.Series(dtype=float)},
+                                     index=pd.Index([], dtype=np.int64))
+        # Per description key: dr/cr paise and row count
+        self.keys = _empty_sums(["dr", "cr", "count"], object)
+        # Counterparty names in first-appearance order; recurring keys index into it
+        self.counterparties = pd.Index([], dtype=object)
+        self.recurring = pd.DataFrame(columns=GROUP_COLUMNS + ["date", "amount"])
+        # Earliest row (date, then position) of each recurring group, with its description
+        self.firsts = pd.DataFrame(columns=GROUP_COLUMNS + ["date", "seq", "desc"])
+
+    @classmethod
+    def from_frame(cls, df, amount_tolerance=0.15):
+        """Builds the partial of one slice of processed transactions
+
+        Args:
+            df (pd.DataFrame): Rows with datetime dates, in statement order.
+                Without a desc column (but with desc_key and counterparty)
+                the recurring descriptions are left for the caller to fill
+            amount_tolerance (float): Recurring amount band width
+
+        Returns:
+            AnalysisPartial
+        """
+        part = cls()
+        part.rows = len(df)
+        if not part.rows:
+            return part
+
+        dr, cr = df['dr'].to_numpy(), df['cr'].to_numpy()
+        part.debit_rows = int((dr > 0).sum())
+        part.credit_rows = int((cr > 0).sum())
+        part.start = df['date'].min()
+        part.end = df['date'].max()
+        if 'bal' in df.columns:
+            part.has_bal = True
+            part.first_bal = df['bal'].iloc[0]
+            part.last_bal = df['bal'].iloc[-1]
+
+        paise = pd.DataFrame({"dr": to_paise(dr), "cr": to_paise(cr)})
+        days = df['date'].to_numpy().astype("datetime64[D]").astype(np.int64)
+        part.daily = paise.groupby(days).sum()
+        if part.has_bal:
+            bal = df['bal'].to_numpy(dtype=float)
+            part.balances = pd.DataFrame({"close": bal, "low": bal}).groupby(days).agg({"close": "last", "low": "min"})
+
+        if 'desc_key' not in df.columns or 'counterparty' not in df.columns:
+            if 'desc' not in df.columns:
+                return part
+            # Imported here: app.DPROCESS builds on this module
+            from app.DPROCESS import normalize_descriptions
+            desc_key, counterparty = normalize_descriptions(df['desc'])
+            df = df.assign(desc_key=desc_key, counterparty=counterparty)
+
+        part.has_desc = True
+        desc_key = df['desc_key'].cat
+        codes = desc_key.codes.to_numpy()
+        # Rows without a key are categorized as "other", like an empty key
+        names = np.append(desc_key.categories.to_numpy(dtype=object), "")
+        keys = paise.assign(count=1).groupby(np.where(codes >= 0, codes, len(names) - 1)).sum()
+        keys.index = pd.Index(names[keys.index], dtype=object)
+        part.keys = keys.groupby(level=0, sort=False).sum()
+
+        part.counterparties = pd.Index(df['counterparty'].cat.categories, dtype=object)
+        rows = recurring_rows(df, amount_tolerance)
+        firsts = rows.sort_values(GROUP_COLUMNS + ["date"], kind="mergesort").drop_duplicates(GROUP_COLUMNS)
+        part.firsts = firsts.assign(seq=firsts.index)[GROUP_COLUMNS + ["date", "seq", "desc"]]
+        part.recurring = rows.drop(columns="desc")
+        return part
+
+    def merge(self, other):
+        """Partial of this slice followed by `other`"""
+        return merge_partials([self, other])
+
+    def finalize(self, min_regularity=0.75):
+        """Builds the analysis dict, as returned by analyze_bank_transactions()"""
+        if not self.rows:
+            raise ValueError("No transactions to analyze")
+
+        total_debit = np.float64(self.daily['dr'].sum() / 100)
+        total_credit = np.float64(self.daily['cr'].sum() / 100)
+
+        balance_info = {}
+        if self.has_bal:
+            balance_info = {
+                "opening_balance": round(self.first_bal, 2),
+                "closing_balance": round(self.last_bal, 2),
+                "net_savings": round(self.last_bal - self.first_bal, 2)
+            }
+
+        # Daily aggregates
+        days = self.daily.index.to_numpy().astype("datetime64[D]")
+        daily = pd.DataFrame({
+            "date": days.astype(object),
+            "dr": self.daily['dr'].to_numpy() / 100,
+            "cr": self.daily['cr'].to_numpy() / 100
+        })
+        top_debit_days = daily.nlargest(3, 'dr')
+        top_credit_days = daily.nlargest(3, 'cr')
+
+        # Low-spending days (bottom 10% of spending days); the day buckets are
+        # complete, so the quantile is exact rather than sketched
+        low_spend_days = daily[daily['dr'] < daily['dr'].quantile(0.1)].nsmallest(2, 'dr')
+
+        # Monthly aggregates
+        monthly_paise = self.daily.groupby(days.astype("datetime64[M]")).sum()
+        monthly = pd.DataFrame({
+            "date": pd.to_datetime(monthly_paise.index),
+            "dr": monthly_paise['dr'].to_numpy() / 100,
+            "cr": monthly_paise['cr'].to_numpy() / 100
+        })
+
+        # Trailing 7/30/90-day flows over the dense calendar
+        close = low = None
+        if self.has_bal:
+            balances = self.balances.reindex(self.daily.index)
+            close, low = balances['close'].to_numpy(), balances['low'].to_numpy()
+        rolling, rolling_series = rolling_cash_flow(self.daily.index.to_numpy(), self.daily['dr'].to_numpy(),
+                                                    self.daily['cr'].to_numpy(), close, low)
+
+        frequent_merchants = {}
+        recurring = []
+        categories = {}
+        if self.has_desc:
+            # Keywords hold no digits or '#', so counting per key matches the raw text
+            lowered = pd.Series(self.keys.index, dtype=object).str.lower()
+            counts = self.keys['count'].to_numpy()
+            freq_dict = {keyword: int(lowered.str.count(keyword).to_numpy() @ counts)
+                         for keyword in COMMON_KEYWORDS}
+            frequent_merchants = {k: v for k, v in sorted(freq_dict.items(), key=lambda item: item[1], reverse=True)
+                                  if v > 0}
+
+            frame = self.recurring.assign(desc=None)
+            frame.loc[self.firsts['seq'].to_numpy(), 'desc'] = self.firsts['desc'].to_numpy()
+            recurring = find_recurring(frame, min_regularity)
+
+            categories = self._category_totals()
+
+        return {
+            "total_transactions": self.rows,
+            "debit_transactions": self.debit_rows,
+            "credit_transactions": self.credit_rows,
+            "time_period": {
+                "start_date": self.start.strftime('%d-%b-%Y'),
+                "end_date": self.end.strftime('%d-%b-%Y'),
+                "days": (self.end - self.start).days + 1
+            },
+            "amounts": {
+                "total_debit": round(total_debit, 2),
+                "total_credit": round(total_credit, 2),
+                "avg_debit": round(total_debit / self.rows, 2) if self.debit_rows > 0 else 0,
+                "avg_credit": round(total_credit / self.rows, 2) if self.credit_rows > 0 else 0
+            },
+            **balance_info,
+            "daily_analysis": {
+                "top_debit_days": top_debit_days.to_dict(orient='records'),
+                "top_credit_days": top_credit_days.to_dict(orient='records'),
+                "low_spend_days": low_spend_days.to_dict(orient='records')
+            },
+            "monthly_trends": monthly.to_dict(orient='records'),
+            "merchant_analysis": frequent_merchants,
+            "recurring_payments": recurring,
+            "category_analysis": categories,
+            "rolling_metrics": rolling,
+            "forecast": forecast_monthly(monthly, self.start, self.end),
+            "analysis_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+
+            # ✅ NEW: Full raw data for plotting full graphs
+            "raw_data": {
+                # Closing balance per day, when the statement has balances
+                "daily": (daily if close is None else daily.assign(bal=close)).to_dict(orient='records'),
+                "monthly": monthly.to_dict(orient='records'),
+                "rolling": rolling_series.to_dict(orient='records')
+            }
+        }
+
+    def _category_totals(self):
+        """category_totals() from the per-key sums"""
+        categories = categorize_transactions(pd.Series(self.keys.index, dtype=object)).to_numpy()
+        totals = self.keys.groupby(categories).sum()
+        totals = pd.DataFrame({
+            "debit": totals['dr'] / 100,
+            "credit": totals['cr'] / 100,
+            "count": totals['count']
+        }).sort_values(['debit', 'credit'], ascending=False)
+        return {
+            category: {
+                "debit": round(float(row['debit']), 2),
+                "credit": round(float(row['credit']), 2),
+                "count": int(row['count'])
+            }
+            for category, row in totals.iterrows()
+        }
+
+
+def merge_partials(parts):
+    """Merges the partials of consecutive slices, in statement order
+
+    Args:
+        parts (list): AnalysisPartial per slice, first slice first
+
+    Returns:
+        AnalysisPartial: Partial of the concatenated slices
+    """
+    parts = [p for p in parts if p.rows]
+    if not parts:
+        return AnalysisPartial()
+    if len(parts) == 1:
+        return parts[0]
+
+    merged = AnalysisPartial()
+    merged.rows = sum(p.rows for p in parts)
+    merged.debit_rows = sum(p.debit_rows for p in parts)
+    merged.credit_rows = sum(p.credit_rows for p in parts)
+    merged.start = min(p.start for p in parts)
+    merged.end = max(p.end for p in parts)
+    merged.has_bal = parts[0].has_bal
+    merged.first_bal = parts[0].first_bal
+    merged.last_bal = parts[-1].last_bal
+    merged.has_desc = all(p.has_desc for p in parts)
+
+    merged.daily = pd.concat([p.daily for p in parts]).groupby(level=0).sum()
+    # A day split across slices closes on its later slice's last row
+    merged.balances = pd.concat([p.balances for p in parts]).groupby(level=0).agg({"close": "last", "low": "min"})
+    merged.keys = pd.concat([p.keys for p in parts]).groupby(level=0, sort=False).sum()
+
+    # Counterparties keep their first-appearance order across slices, so
+    # recurring groups sort the same as in one frame
+    names = parts[0].counterparties
+    recurring, firsts = [], []
+    offset = 0
+    for p in parts:
+        names = names.append(p.counterparties[~p.counterparties.isin(names)])
+        # Slice-local codes -> merged codes; -1 (no counterparty) stays -1
+        remap = np.append(names.get_indexer(p.counterparties), -1)
+        if not p.recurring.empty:
+            recurring.append(p.recurring.assign(key=remap[p.recurring['key'].to_numpy()])
+                             .set_axis(p.recurring.index + offset))
+            firsts.append(p.firsts.assign(key=remap[p.firsts['key'].to_numpy()], seq=p.firsts['seq'] + offset))
+        offset += p.rows
+    merged.counterparties = names
+    if recurring:
+        merged.recurring = pd.concat(recurring)
+    if firsts:
+        merged.firsts = (pd.concat(firsts, ignore_index=True)
+                         .sort_values(GROUP_COLUMNS + ["date", "seq"], kind="mergesort")
+                         .drop_duplicates(GROUP_COLUMNS))
+    return merged
+
+
+def analyze_chunks(chunks, amount_tolerance=0.15, min_regularity=0.75):
+    """Analyzes a statement delivered as an iterator of DataFrame chunks
+
+    Each chunk is reduced to its partial as it arrives, so only one chunk
+    of raw rows is in memory at a time.
+
+    Args:
+        chunks: Iterable of processed transaction frames, in statement order
+
+    Returns:
+        dict: Same structure and values as analyze_bank_transactions()
+    """
+    parts = [AnalysisPartial.from_frame(chunk, amount_tolerance) for chunk in chunks]
+    return merge_partials(parts).finalize(min_regularity)
@@ -1,21 +1,209 @@
 import os
+import json
+import time
+import hashlib
+import threading
+import urllib.request
+from collections import deque
+from typing import Any, List, Optional
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import Generation, LLMResult
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from langchain_groq import ChatGroq
-from app.DPROCESS import process_csv_file,analyze_bank_transactions,format_analysis_for_prompt
+from app.DPROCESS import process_statement_file,analyze_bank_transactions,format_analysis_for_prompt
+from app.TRACE import traced, tracing
+from app.FRAUD import screen_transactions, format_screen_for_prompt
+from app.RETRIEVAL import TransactionIndex, format_retrieval_for_prompt
+from app.RATELIMIT import get_rate_limiter, estimate_tokens, prompt_key
 
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Step 2: Set up Groq LLM
-def load_llm():
+# Step 2: Set up the LLM backend
+class OpenAICompatibleLLM(LLM):
+    """Any server speaking the OpenAI /chat/completions API (llama.cpp,
+    vLLM, Ollama, LM Studio, app/LLMSTUB.py)"""
+    base_url: str = "http://127.0.0.1:8000/v1"
+    model_name: str = "local-model"
+    api_key: Optional[str] = None
+    temperature: float = 0.2
+    timeout: float = 120.0
+
+    @property
+    def _llm_type(self):
+        return "openai-compatible"
+
+    def _complete(self, prompt, stop=None):
+        body = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature
+        }
+        if stop:
+            body["stop"] = stop
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.base_url.rstrip("/") + "/chat/completions",
+                                         data=json.dumps(body).encode("utf-8"), headers=headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        return self._complete(prompt, stop)["choices"][0]["message"]["content"]
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> LLMResult:
+        # Like LLM._generate, but passes the server's usage counts on as
+        # llm_output["token_usage"], as the chat model integrations do
+        generations, usage = [], {}
+        for prompt in prompts:
+            payload = self._complete(prompt, stop)
+            generations.append([Generation(text=payload["choices"][0]["message"]["content"])])
+            for key, value in (payload.get("usage") or {}).items():
+                if isinstance(value, (int, float)):
+                    usage[key] = usage.get(key, 0) + value
+        return LLMResult(generations=generations, llm_output={"token_usage": usage} if usage else None)
+
+
+class FakeBankLLM(LLM):
+    """Deterministic offline backend for benchmarks and demos: the same
+    prompt always gives the same answer, after a fixed latency"""
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        facts = [line.strip() for line in prompt.splitlines()
+                 if line.strip().startswith("•") and "₹" in line][:5]
+        return "\n".join([f"Offline analysis ({len(prompt):,} character prompt, ref {digest}).", *facts])
+
+
+def _load_groq():
+    # Retries are handled by the shared rate limiter in run_analysis().
+    # GROQ_API_BASE points the client elsewhere, e.g. at app/LLMSTUB.py
     return ChatGroq(
         groq_api_key=GROQ_API_KEY,
-        model_name="Llama3-8b-8192"
+        model_name="Llama3-8b-8192",
+        max_retries=0,
+        **({"groq_api_base": os.getenv("GROQ_API_BASE")} if os.getenv("GROQ_API_BASE") else {})
     )
 
+
+def _load_openai_compatible():
+    return OpenAICompatibleLLM(
+        base_url=os.getenv("LLM_BASE_URL", "http://127.0.0.1:8000/v1"),
+        model_name=os.getenv("LLM_MODEL", "local-model"),
+        api_key=os.getenv("LLM_API_KEY")
+    )
+
+
+def _load_fake():
+    return FakeBankLLM(latency=float(os.getenv("FAKE_LLM_LATENCY", 0)))
+
+
+# name: loader, the LLM's _llm_type, and whether calls go through the shared
+# Groq rate limiter (local servers and the fake backend don't need it)
+LLM_BACKENDS = {
+    "groq": {"load": _load_groq, "llm_type": "groq-chat", "rate_limited": True},
+    "openai": {"load": _load_openai_compatible, "llm_type": "openai-compatible", "rate_limited": False},
+    "fake": {"load": _load_fake, "llm_type": "fake", "rate_limited": False}
+}
+DEFAULT_BACKEND = os.getenv("LLM_BACKEND", "groq")
+
+
+def load_llm(backend=None):
+    """Returns the LLM for a registered backend (LLM_BACKEND env var by default)"""
+    name = backend or DEFAULT_BACKEND
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Choose from: {', '.join(LLM_BACKENDS)}")
+    return LLM_BACKENDS[name]["load"]()
+
+
+def backend_name(llm):
+    """Registry name of an LLM instance, falling back to its type"""
+    llm_type = getattr(llm, "_llm_type", type(llm).__name__)
+    for name, spec in LLM_BACKENDS.items():
+        if spec["llm_type"] == llm_type:
+            return name
+    return llm_type
+
+
+class BackendMetrics:
+    """Latency and throughput of recent LLM calls, per backend
+
+    Args:
+        maxlen (int): Calls kept per backend
+    """
+
+    def __init__(self, maxlen=500):
+        self.maxlen = maxlen
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, backend, latency, prompt_tokens, completion_tokens, ok=True):
+        with self._lock:
+            calls = self._calls.setdefault(backend, deque(maxlen=self.maxlen))
+            calls.append((latency, prompt_tokens, completion_tokens, ok))
+
+    def summary(self):
+        """Returns {backend: calls, errors, latency mean/p50/p95, tokens/s}"""
+        with self._lock:
+            snapshot = {name: list(calls) for name, calls in self._calls.items()}
+        summary = {}
+        for name, calls in snapshot.items():
+            latency, prompt, completion, ok = (np.array(column, dtype=float) for column in zip(*calls))
+            ok = ok.astype(bool)
+            done = latency[ok]
+            summary[name] = {
+                "calls": len(calls),
+                "errors": int((~ok).sum()),
+                "latency_mean_s": round(float(done.mean()), 3) if done.size else None,
+                "latency_p50_s": round(float(np.percentile(done, 50)), 3) if done.size else None,
+                "latency_p95_s": round(float(np.percentile(done, 95)), 3) if done.size else None,
+                "prompt_tokens_per_s": round(float(prompt[ok].sum() / done.sum()), 1) if done.sum() else None,
+                "completion_tokens_per_s": round(float(completion[ok].sum() / done.sum()), 1) if done.sum() else None
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+
+
+BACKEND_METRICS = BackendMetrics()
+
+
+class TokenUsage(BaseCallbackHandler):
+    """Collects the token counts a backend reports with its response
+
+    ChatGroq and OpenAICompatibleLLM put the API's usage block in
+    llm_output["token_usage"]; backends that report nothing leave the
+    counts at None.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.prompt_tokens = None
+        self.completion_tokens = None
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage.get("prompt_tokens") is not None:
+            self.prompt_tokens = (self.prompt_tokens or 0) + int(usage["prompt_tokens"])
+        if usage.get("completion_tokens") is not None:
+            self.completion_tokens = (self.completion_tokens or 0) + int(usage["completion_tokens"])
+
 # Step 3: Define prompt templates
 def prompting(style="default"):
     """Returns a tailored prompt template for bank statement analysis.
@@ -71,21 +259,20 @@ Format your response with clear headings and use precise figures. Provide contex
             template="""
 You are a forensic accounting specialist.
 
-Analyze these transactions for potential fraud:
+Review these transactions for potential fraud:
 
 {data}
 
-Conduct the following statistical checks:
+The statistical checks below were already run locally over every transaction.
+Only the flagged transactions are listed, each with the checks it failed:
 
 1. Anomaly Detection:
-- Transactions >3 standard deviations from mean
-- After-hours transactions (outside 9am-5pm)
-- Geographic anomalies (unusual locations)
+- Transactions >3 standard deviations from mean (global or rolling)
 
 2. Pattern Analysis:
-- Duplicate transaction amounts
-- Rapid sequence transactions (<5 min apart)
-- Round-number transactions (e.g., $500.00)
+- Duplicate transaction amounts (same day, counterparty and amount)
+- Rapid sequence transactions (3+ debits to one counterparty in a day)
+- Round-number transactions (e.g., ₹10,000.00)
 
 3. Risk Assessment:
 For each suspicious transaction:
@@ -108,6 +295,9 @@ Analyze this financial data:
 
 {data}
 
+Use the precomputed Category Breakdown for income sources and expense
+categories instead of inferring categories from transaction descriptions.
+
 Provide a statistical comparison:
 
 1. Income Analysis:
@@ -123,7 +313,7 @@ Provide a statistical comparison:
 
 3. Savings Capacity:
 - Monthly savings rate: [amount] ([%])
-- Projected annual savings
+- Projected annual savings (take it from the precomputed Forecast section)
 - Break-even analysis
 
 Include quarterly trends and statistical significance of changes.
@@ -139,6 +329,9 @@ Based on:
 
 {data}
 
+Use the precomputed Category Breakdown as the spending categories; do not
+re-derive categories from transaction descriptions.
+
 Generate data-driven recommendations:
 
 1. Current State Analysis:
@@ -183,7 +376,35 @@ Structure your response professionally with clear section headings.
 """
 )
 
-# Step 4: Run LLM analysis
+# Step 4: Build the data block for the chosen style
+def build_prompt_data(analysis, df, style="default", question=None, compact=False, index=None):
+    """Builds the {data} text sent to the LLM for an analysis style
+    
+    Args:
+        analysis (dict): Results from analyze_bank_transactions()
+        df (pd.DataFrame): Processed transaction data
+        style (str): Analysis style, as in prompting()
+        question (str): User question for the default style
+        compact (bool): Use the compact transaction encoding
+        index (TransactionIndex): Retrieval index for the statement; built
+            on the fly for the default style when None
+        
+    Returns:
+        str: Prompt data text
+    """
+    if style == "fraud_check":
+        # Statistical checks run locally; only the flagged rows go to the LLM
+        flagged, summary = screen_transactions(df)
+        return format_analysis_for_prompt(analysis) + "\n" + format_screen_for_prompt(flagged, summary)
+    if style == "default" and question:
+        # Only the rows relevant to the question, unless it can't be narrowed down
+        retrieved = format_retrieval_for_prompt(analysis, index or TransactionIndex(df), question)
+        if retrieved is not None:
+            return retrieved
+    return format_analysis_for_prompt(analysis, df, compact=compact)
+
+# Step 5: Run LLM analysis
+@traced("llm")
 def run_analysis(llm, data_text, question, style="default"):
     prompt_template = prompting(style)
      # Wrap in LLMChain
@@ -192,9 +413,46 @@ def run_analysis(llm, data_text, question, style="default"):
         inputs = {"data": data_text, "question": question}
     else:
         inputs = {"data": data_text}
-    return chain.run(inputs)
+    prompt_text = prompt_template.format(**inputs)
+    backend = backend_name(llm)
+    usage = TokenUsage()
+    # Rough counts (~4 characters per token) for backends that report no usage
+    estimated_prompt = len(prompt_text) // 4
+    started = time.perf_counter()
+    try:
+        if LLM_BACKENDS.get(backend, {}).get("rate_limited"):
+            # Shared request/token budgets, backoff retries, and one upstream
+            # call for identical prompts already in flight
+            model = getattr(llm, "model_name", type(llm).__name__)
+            result = get_rate_limiter().call(lambda: chain.run(inputs, callbacks=[usage]),
+                                             tokens=estimate_tokens(prompt_text),
+                                             key=prompt_key(model, prompt_text))
+        else:
+            result = chain.run(inputs, callbacks=[usage])
+    except Exception:
+        BACKEND_METRICS.record(backend, time.perf_counter() - started, estimated_prompt, 0, ok=False)
+        raise
+    BACKEND_METRICS.record(
+        backend, time.perf_counter() - started,
+        usage.prompt_tokens if usage.prompt_tokens is not None else estimated_prompt,
+        usage.completion_tokens if usage.completion_tokens is not None else len(result) // 4
+    )
+    return result
+
+# Step 5b: Background job wrapper (see app/JOBS.py)
+def analysis_job(analysis, df, style="default", question=None, compact=False, index=None, backend=None):
+    """Builds the prompt and runs the LLM, for use as a JobQueue job
+    
+    Returns:
+        dict: result, prompt_text and the job's trace spans
+    """
+    with tracing(memory=False) as tracer:
+        llm = load_llm(backend)
+        prompt_text = build_prompt_data(analysis, df, style, question, compact=compact, index=index)
+        result = run_analysis(llm, prompt_text, question, style)
+    return {"result": result, "prompt_text": prompt_text, "spans": tracer.to_records()}
 
-# Step 5: Prompt user for style
+# Step 6: Prompt user for style
 def choose_style():
     print("\nChoose analysis style:")
     print("1. Default (ask your own question)")
@@ -218,13 +476,14 @@ def main_bank_llm():
         print("❌ Invalid file path. Please try again.")
         file_path = input("📂 Enter file path (.csv or .pdf): ").strip()
 
-    if file_path.lower().endswith('.csv'):
-        print("📊 Processing CSV file...")
+    if file_path.lower().endswith(('.csv', '.pdf')):
+        print(f"📊 Processing {file_path.rsplit('.', 1)[-1].upper()} file...")
         try:
-            # process_csv_file should return (DataFrame, text_for_llm)
-            df = process_csv_file(file_path)
+            df = process_statement_file(file_path)
+            if "ingest" in df.attrs:
+                ingest = df.attrs["ingest"]
+                print(f"📄 Read {ingest['pages']} pages in {ingest['seconds']}s ({ingest['pages_per_sec']} pages/s)")
             analysis=analyze_bank_transactions(df)
-            all_data_text=format_analysis_for_prompt(analysis,df)
             print("\nLLM Prompt Text (truncated to 8000 chars):")
 
             style = choose_style()
@@ -236,13 +495,15 @@ def main_bank_llm():
             else:
                 question = None
 
+            all_data_text = build_prompt_data(analysis, df, style, question)
+
             llm = load_llm()
             print("\n🔍 Running analysis...\n")
             result = run_analysis(llm, all_data_text, question, style)
             print("\n🧠 Analysis Result:\n")
             print(result)
         except Exception as e:
-            print(f"❌ Error while processing CSV: {e}")
+            print(f"❌ Error while processing statement: {e}")
     else:
         print("❌ Unsupported file format. Please provide a CSV or PDF file.")
 
@@ -0,0 +1,310 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from app.DPROCESS import (process_statement_file, analyze_bank_transactions, analyze_statement_chunked,
+                          format_analysis_for_prompt)
+from app.TRACE import tracing
+
+
+def collect_statement_files(inputs, extensions=(".csv", ".pdf")):
+    """Expands globs and directories into a sorted list of statement files
+
+    Args:
+        inputs (list): File paths, glob patterns or directories
+        extensions (tuple): File extensions to pick up from directories
+
+    Returns:
+        list: Unique, sorted file paths
+    """
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                for name in names:
+                    if name.lower().endswith(extensions):
+                        files.add(os.path.join(root, name))
+        else:
+            for match in glob.glob(item, recursive=True):
+                if os.path.isfile(match):
+                    files.add(match)
+    return sorted(files)
+
+
+def process_statement(file_path, include_prompt=False, log_spans=False, chunksize=None):
+    """Parses and analyzes one statement, timing each stage
+
+    Runs in a worker process, so it never raises: failures are returned as
+    records with status "error" and the batch keeps going.
+
+    Args:
+        file_path (str): Path to the CSV or PDF statement
+        include_prompt (bool): Also build the LLM prompt text
+        log_spans (bool): Emit a structured log line per stage
+        chunksize (int): Analyze CSVs this many rows at a time instead of
+            loading them whole (ignored with include_prompt)
+
+    Returns:
+        dict: Result record with rows, per-stage timings and analysis
+    """
+    if log_spans:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    record = {"file": file_path, "status": "ok", "rows": 0, "timings": {}}
+    with tracing(memory=False, log=log_spans) as tracer:
+        try:
+            if chunksize and not include_prompt and file_path.lower().endswith(".csv"):
+                record["analysis"] = analyze_statement_chunked(file_path, chunksize)
+                record["rows"] = record["analysis"]["total_transactions"]
+            else:
+                # Already one statement per worker process, so PDF pages are read serially
+                df = process_statement_file(file_path, pdf_workers=1)
+                record["rows"] = len(df)
+                if "integrity" in df.attrs:
+                    record["integrity"] = df.attrs["integrity"]
+                record["analysis"] = analyze_bank_transactions(df)
+                if include_prompt:
+                    record["prompt"] = format_analysis_for_prompt(record["analysis"], df)
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+    record["timings"] = tracer.stage_totals()
+    return record
+
+
+def _json_default(obj):
+    """Serializes the pandas/numpy values found in analysis dicts"""
+    if isinstance(obj, (pd.Timestamp, datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Period):
+        return str(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonlWriter:
+    """Streams result records to a JSON Lines file"""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self.file.write(json.dumps(record, default=_json_default, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Streams result records to a Parquet file in row groups
+
+    Nested fields (timings, integrity, analysis) are stored as JSON strings so every
+    row group shares one flat schema.
+    """
+
+    def __init__(self, path, batch_size=500):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("file", pa.string()),
+            ("status", pa.string()),
+            ("rows", pa.int64()),
+            ("error", pa.string()),
+            ("timings", pa.string()),
+            ("integrity", pa.string()),
+            ("analysis", pa.string()),
+            ("prompt", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.pending = []
+
+    def write(self, record):
+        self.pending.append({
+            "file": record["file"],
+            "status": record["status"],
+            "rows": record["rows"],
+            "error": record.get("error"),
+            "timings": json.dumps(record["timings"]),
+            "integrity": json.dumps(record["integrity"]) if "integrity" in record else None,
+            "analysis": json.dumps(record["analysis"], default=_json_default, ensure_ascii=False)
+                        if "analysis" in record else None,
+            "prompt": record.get("prompt"),
+        })
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            table = self.pa.Table.from_pylist(self.pending, schema=self.schema)
+            self.writer.write_table(table)
+            self.pending = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def open_writer(path, fmt=None):
+    """Returns a streaming writer for the output path
+
+    Args:
+        path (str): Output file path
+        fmt (str): "jsonl" or "parquet"; inferred from the extension when None
+
+    Returns:
+        JsonlWriter | ParquetWriter
+    """
+    if fmt is None:
+        fmt = "parquet" if path.lower().endswith(".parquet") else "jsonl"
+    if fmt == "parquet":
+        return ParquetWriter(path)
+    if fmt == "jsonl":
+        return JsonlWriter(path)
+    raise ValueError(f"Unsupported output format: {fmt}")
+
+
+def run_batch(files, writer, workers=None, include_prompt=False, on_record=None, log_spans=False,
+              chunksize=None):
+    """Processes statements in a worker pool and streams records to the writer
+
+    Args:
+        files (list): Statement file paths
+        writer: Object with a write(record) method
+        workers (int): Number of worker processes (default: CPU count)
+        include_prompt (bool): Also build the LLM prompt text per file
+        on_record (callable): Optional callback invoked with each record
+        log_spans (bool): Emit structured per-stage logs from the workers
+        chunksize (int): Analyze CSVs out of core, this many rows at a time
+
+    Returns:
+        dict: Throughput summary with per-stage timings
+    """
+    stage_times = {}
+    ok = failed = total_rows = 0
+    start = time.perf_counter()
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # At most two submissions per worker are in flight, and each finished
+        # future is dropped once its record is written, so memory stays flat
+        # however many files there are
+        remaining = iter(files)
+        in_flight = set()
+        while True:
+            for path in remaining:
+                in_flight.add(pool.submit(process_statement, path, include_prompt, log_spans, chunksize))
+                if len(in_flight) >= workers * 2:
+                    break
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                writer.write(record)
+                if record["status"] == "ok":
+                    ok += 1
+                    total_rows += record["rows"]
+                    for stage, seconds in record["timings"].items():
+                        stage_times.setdefault(stage, []).append(seconds)
+                else:
+                    failed += 1
+                if on_record:
+                    on_record(record)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "files": len(files),
+        "succeeded": ok,
+        "failed": failed,
+        "rows": total_rows,
+        "wall_seconds": round(elapsed, 3),
+        "files_per_sec": round(len(files) / elapsed, 2) if elapsed > 0 else 0.0,
+        "rows_per_sec": round(total_rows / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": {
+            stage: {
+                "total": round(sum(times), 3),
+                "mean": round(sum(times) / len(times), 4),
+                "max": round(max(times), 4)
+            }
+            for stage, times in stage_times.items() if times
+        }
+    }
+
+
+def format_batch_summary(summary):
+    """Formats the batch summary as a readable report"""
+    lines = []
+    lines.append("📦 Batch Summary")
+    lines.append("=" * 50)
+    lines.append(f"• Files: {summary['files']} ({summary['succeeded']} ok, {summary['failed']} failed)")
+    lines.append(f"• Rows: {summary['rows']:,}")
+    lines.append(f"• Wall time: {summary['wall_seconds']}s")
+    lines.append(f"• Throughput: {summary['files_per_sec']} files/s, {summary['rows_per_sec']:,} rows/s")
+    if summary["stages"]:
+        lines.append("\n⏱️ Per-stage timings (seconds, summed across workers):")
+        for stage, stats in summary["stages"].items():
+            lines.append(f"  → {stage}: total {stats['total']}, mean {stats['mean']}, max {stats['max']}")
+    return "\n".join(lines)
+
+
+def main_batch(argv=None):
+    """Non-interactive entry point for nightly statement batches"""
+    parser = argparse.ArgumentParser(
+        description="Parse and analyze bank statements in bulk without prompts."
+    )
+    parser.add_argument("inputs", nargs="+", help="CSV/PDF files, glob patterns or directories")
+    parser.add_argument("-o", "--output", required=True, help="Output file (.jsonl or .parquet)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Output format (default: from extension)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--prompt", action="store_true", help="Include the formatted LLM prompt text")
+    parser.add_argument("--log-spans", action="store_true", help="Log one JSON line per stage to stderr")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Analyze CSVs this many rows at a time (for statements bigger than RAM)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print the final summary")
+    args = parser.parse_args(argv)
+
+    files = collect_statement_files(args.inputs)
+    if not files:
+        print("❌ No statement files matched the given inputs.", file=sys.stderr)
+        return 1
+
+    def report(record):
+        if args.quiet:
+            return
+        if record["status"] == "ok":
+            print(f"✅ {record['file']} ({record['rows']} rows)")
+        else:
+            print(f"❌ {record['file']}: {record['error']}")
+
+    writer = open_writer(args.output, args.format)
+    try:
+        summary = run_batch(files, writer, workers=args.workers,
+                            include_prompt=args.prompt, on_record=report,
+                            log_spans=args.log_spans, chunksize=args.chunksize)
+    finally:
+        writer.close()
+
+    print(format_batch_summary(summary))
+    return 0 if summary["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main_batch())
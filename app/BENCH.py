@@ -0,0 +1,478 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.DPROCESS import process_csv_file, analyze_bank_transactions, format_analysis_for_prompt
+from app.TRACE import tracing
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# --full adds 10M rows: several GB of RAM and minutes per run, so not the default
+FULL_SIZES = DEFAULT_SIZES + [10_000_000]
+DEFAULT_HISTORY = os.path.join("benchmarks", "history.json")
+
+PREAMBLE = [
+    "Account Name,MR SYNTHETIC CUSTOMER",
+    "Account Number,=\"{account}\"",
+    "IFSC Code,CNRB0001234",
+    "Branch Name,NEW DELHI MAIN",
+    "Statement Period,{start} to {end}",
+    ",",
+]
+HEADER = "Txn Date,Value Date,Cheque No.,Description,Branch Code,Debit,Credit,Balance,"
+
+MERCHANTS = ["SWIGGY", "ZOMATO", "AMAZON PAY", "BLINKIT", "DMRC", "UBER INDIA", "OLA CABS",
+             "PAYTM", "GOOGLE PLAY", "AIRTEL", "RELIANCE JIO", "BIGBASKET", "IRCTC", "NETFLIX"]
+VPAS = ["swiggy@ybl", "zomato@hdfcbank", "amazon@apl", "blinkit@icici", "dmrc@paytm", "uber@axis",
+        "ola@ybl", "paytm@paytm", "googleplay@okaxis", "airtel@ybl", "jio@sbi", "bigbasket@ybl",
+        "irctc@sbi", "netflix@icici"]
+PEOPLE = ["RAHUL KUMAR", "PRIYA SINGH", "AMIT VERMA", "NEHA GUPTA", "VIKAS YADAV", "POOJA SHARMA"]
+BANKS = ["YESB", "HDFC", "ICIC", "SBIN", "UTIB", "PUNB"]
+
+
+def _format_money(values):
+    """Formats amounts like the bank export ("1,250.00"), blank when zero"""
+    formatted = pd.Series(values).map("{:,.2f}".format)
+    return formatted.where(values > 0, "")
+
+
+def _synthetic_chunk(rng, n_rows, day_offsets, start_date, balance):
+    """Builds one chunk of statement lines and returns (lines, closing balance)"""
+    kind = rng.choice(5, size=n_rows, p=[0.70, 0.12, 0.02, 0.08, 0.08])
+    refs = rng.integers(100_000_000_000, 999_999_999_999, size=n_rows).astype(str)
+    merchant_idx = rng.integers(0, len(MERCHANTS), size=n_rows)
+    person_idx = rng.integers(0, len(PEOPLE), size=n_rows)
+    bank_idx = rng.integers(0, len(BANKS), size=n_rows)
+
+    merchants = np.array(MERCHANTS)[merchant_idx]
+    vpas = np.array(VPAS)[merchant_idx]
+    people = np.array(PEOPLE)[person_idx]
+    banks = np.array(BANKS)[bank_idx]
+
+    s_refs = pd.Series(refs)
+    upi_dr = "UPI/DR/" + s_refs + "/" + merchants + "/" + banks + "/" + vpas + "/Payment"
+    upi_cr = "UPI/CR/" + s_refs + "/" + people + "/" + banks + "/" + "upi@" + banks.astype(object) + "/Transfer"
+    neft_cr = "NEFT CR-" + banks + "0000" + s_refs.str[:3] + "-ACME CORP-SALARY"
+    chq = "CHQ PAID-MICR CLG-LIC OF INDIA"
+    atm = "ATM WDL-" + s_refs.str[:6] + "-NEW DELHI"
+    desc = np.select(
+        [kind == 0, kind == 1, kind == 2, kind == 3],
+        [upi_dr, upi_cr, neft_cr, chq],
+        default=atm
+    )
+
+    amounts = np.round(rng.lognormal(mean=6.5, sigma=1.2, size=n_rows), 2)
+    amounts[kind == 2] = np.round(rng.normal(55_000, 5_000, size=(kind == 2).sum()), 2)
+    amounts[kind == 4] = rng.choice([500.0, 1000.0, 2000.0, 5000.0], size=(kind == 4).sum())
+    is_credit = (kind == 1) | (kind == 2)
+    debit = np.where(is_credit, 0.0, amounts)
+    credit = np.where(is_credit, amounts, 0.0)
+    balances = np.round(balance + np.cumsum(credit - debit), 2)
+
+    dates = (pd.Timestamp(start_date) + pd.to_timedelta(day_offsets, unit="D")).strftime("%d-%m-%Y")
+    date_field = "=\"" + pd.Series(dates) + "\""
+    cheque = np.where(kind == 3, "=\"" + pd.Series(refs).str[:6] + "\"", "=\"\"")
+
+    lines = (
+        date_field + "," + date_field + "," + cheque + ",\"" + desc + "\",1234,"
+        + "\"" + _format_money(debit) + "\",\"" + _format_money(credit) + "\",\""
+        + pd.Series(balances).map("{:,.2f}".format) + "\","
+    )
+    return lines, balances[-1] if n_rows else balance
+
+
+def generate_statement(n_rows, path, seed=0, start_date="2015-01-01", days=None, chunk_rows=500_000):
+    """Writes a synthetic statement in the layout preprocess_compact_csv expects
+
+    Includes the account preamble, ="..." quoted dates and cheque numbers,
+    comma-formatted amounts and a trailing empty (Unnamed) column. Rows are
+    generated in chunks so 10M-row files don't need 10M rows in memory.
+
+    Args:
+        n_rows (int): Number of transactions
+        path (str): Output CSV path
+        seed (int): Random seed, so runs are reproducible
+        start_date (str): First transaction date
+        days (int): Calendar span; defaults to about 5 transactions a day,
+            capped at ten years so large sizes become denser ledgers
+        chunk_rows (int): Rows generated per chunk
+
+    Returns:
+        str: The output path
+    """
+    rng = np.random.default_rng(seed)
+    days = days or min(max(n_rows // 5, 30), 3650)
+    # Sorted uniform day offsets keep the statement in chronological order
+    offsets = np.sort(rng.integers(0, days, size=n_rows))
+    end_date = pd.Timestamp(start_date) + pd.Timedelta(days=days - 1)
+    balance = 50_000.0
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for line in PREAMBLE:
+            f.write(line.format(account=f"{seed:010d}",
+                                start=pd.Timestamp(start_date).strftime("%d-%m-%Y"),
+                                end=end_date.strftime("%d-%m-%Y")) + "\n")
+        f.write(HEADER + "\n")
+        for start in range(0, n_rows, chunk_rows):
+            chunk_offsets = offsets[start:start + chunk_rows]
+            lines, balance = _synthetic_chunk(rng, len(chunk_offsets), chunk_offsets, start_date, balance)
+            f.write("\n".join(lines) + "\n")
+    return path
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def _run_stages(path, include_format):
+    df = process_csv_file(path)
+    analysis = analyze_bank_transactions(df)
+    if include_format:
+        format_analysis_for_prompt(analysis, df)
+
+
+def benchmark_size(path, n_rows, repeat=3, max_format_rows=200_000):
+    """Times each pipeline stage on one statement
+
+    Timings are the best of `repeat` runs without memory tracking; peak
+    memory comes from one extra run under tracemalloc, whose overhead would
+    otherwise distort the timings.
+
+    Args:
+        path (str): Statement CSV
+        n_rows (int): Rows in the statement
+        repeat (int): Timed runs per stage
+        max_format_rows (int): Skip prompt formatting above this size
+
+    Returns:
+        dict: Per-stage best wall time, rows/s and peak memory
+    """
+    include_format = n_rows <= max_format_rows
+    best = {}
+    for _ in range(repeat):
+        with tracing(memory=False, log=False) as tracer:
+            _run_stages(path, include_format)
+        for name, seconds in tracer.stage_totals().items():
+            best[name] = min(best.get(name, float("inf")), seconds)
+
+    with tracing(memory=True, log=False) as tracer:
+        _run_stages(path, include_format)
+    peaks = {span.name: span.peak_mem for span in tracer.spans}
+
+    stages = {}
+    for name, seconds in best.items():
+        stages[name] = {
+            "wall_s": round(seconds, 6),
+            "rows_per_sec": round(n_rows / seconds, 1) if seconds > 0 else None,
+            "peak_mem_mb": round(peaks.get(name, 0) / 1_048_576, 3)
+        }
+    if not include_format:
+        stages["format"] = {"skipped": True}
+    return {"rows": n_rows, "file_mb": round(os.path.getsize(path) / 1_048_576, 3), "stages": stages}
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+
+
+def find_regressions(previous, current, threshold=0.2):
+    """Lists stages that got slower than the previous run by more than threshold
+
+    Args:
+        previous (dict): Earlier history entry
+        current (dict): New history entry
+        threshold (float): Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        list: (rows, stage, old_seconds, new_seconds) tuples
+    """
+    regressions = []
+    old_results = {r["rows"]: r for r in previous.get("results", [])}
+    for result in current["results"]:
+        old = old_results.get(result["rows"])
+        if not old:
+            continue
+        for stage, stats in result["stages"].items():
+            old_stats = old["stages"].get(stage, {})
+            if "wall_s" in stats and "wall_s" in old_stats and old_stats["wall_s"] > 0:
+                if stats["wall_s"] > old_stats["wall_s"] * (1 + threshold):
+                    regressions.append((result["rows"], stage, old_stats["wall_s"], stats["wall_s"]))
+    return regressions
+
+
+def run_benchmarks(sizes=None, repeat=3, history_path=DEFAULT_HISTORY, data_dir=None,
+                   max_format_rows=200_000, seed=0):
+    """Generates statements at each size, benchmarks them and records history
+
+    Returns:
+        tuple: (history entry, list of regressions against the previous entry)
+    """
+    sizes = sizes or DEFAULT_SIZES
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "bank_dashboard_bench")
+    os.makedirs(data_dir, exist_ok=True)
+
+    results = []
+    for n_rows in sizes:
+        path = os.path.join(data_dir, f"statement_{n_rows}_{seed}.csv")
+        if not os.path.exists(path):
+            print(f"🧪 Generating {n_rows:,} rows -> {path}")
+            generate_statement(n_rows, path, seed=seed)
+        print(f"⏱️ Benchmarking {n_rows:,} rows...")
+        results.append(benchmark_size(path, n_rows, repeat=repeat, max_format_rows=max_format_rows))
+
+    entry = {
+        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results
+    }
+    history = load_history(history_path)
+    regressions = find_regressions(history[-1], entry) if history else []
+    history.append(entry)
+    save_history(history_path, history)
+    return entry, regressions
+
+
+def format_benchmark_report(entry, regressions):
+    lines = []
+    lines.append("📊 Benchmark Results")
+    lines.append("=" * 50)
+    for result in entry["results"]:
+        lines.append(f"\n• {result['rows']:,} rows ({result['file_mb']} MB)")
+        for stage, stats in result["stages"].items():
+            if stats.get("skipped"):
+                lines.append(f"  → {stage}: skipped")
+            else:
+                lines.append(f"  → {stage}: {stats['wall_s']:.4f}s, {stats['rows_per_sec']:,} rows/s, "
+                             f"peak {stats['peak_mem_mb']} MB")
+    if regressions:
+        lines.append("\n⚠️ Regressions vs previous run:")
+        for rows, stage, old, new in regressions:
+            lines.append(f"  → {rows:,} rows / {stage}: {old:.4f}s -> {new:.4f}s")
+    return "\n".join(lines)
+
+
+def benchmark_backends(backends, calls=10, rows=2_000, style="summary", seed=0):
+    """Times LLM backends on the same prompt, built from a synthetic statement
+    
+    Args:
+        backends (list): Names registered in app.BANK_LLM.LLM_BACKENDS
+        calls (int): Sequential calls per backend
+        rows (int): Rows in the synthetic statement behind the prompt
+        style (str): Prompt style sent
+        
+    Returns:
+        dict: BackendMetrics summary per backend
+    """
+    # Imported here so the pipeline benchmarks don't need the LLM stack
+    from app.BANK_LLM import load_llm, run_analysis, build_prompt_data, BACKEND_METRICS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        generate_statement(rows, path, seed=seed)
+        df = process_csv_file(path)
+    data_text = build_prompt_data(analyze_bank_transactions(df), df, style)
+
+    BACKEND_METRICS.reset()
+    for backend in backends:
+        llm = load_llm(backend)
+        for _ in range(calls):
+            try:
+                run_analysis(llm, data_text, None, style)
+            except Exception as e:
+                print(f"⚠️ {backend}: {e}")
+    return BACKEND_METRICS.summary()
+
+
+def benchmark_scaling(n_rows=2_000_000, max_workers=None, repeat=3, by="month", data_dir=None, seed=0):
+    """Times analyze_bank_transactions() on 1..N processes
+
+    Every parallel result is checked against the serial one.
+
+    Args:
+        n_rows (int): Rows in the synthetic statement
+        max_workers (int): Largest process count (default: CPU count)
+        repeat (int): Timed runs per process count (best is kept)
+        by (str): Shard mode passed to app.PARALLEL.analyze_parallel
+
+    Returns:
+        list: {"workers", "wall_s", "speedup", "identical"} per process count
+    """
+    # Imported here so the pipeline benchmarks don't load the pool machinery
+    from app.PARALLEL import analyze_parallel
+
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "bank_dashboard_bench")
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"statement_{n_rows}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"🧪 Generating {n_rows:,} rows -> {path}")
+        generate_statement(n_rows, path, seed=seed)
+    df = process_csv_file(path)
+
+    def run(workers):
+        analysis = analyze_parallel(df, workers=workers, by=by, min_shard_rows=1)
+        analysis.pop("analysis_date")
+        return analysis
+
+    reference = None
+    results = []
+    for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            analysis = run(workers)
+            best = min(best, time.perf_counter() - start)
+        if reference is None:
+            reference = analysis
+        results.append({
+            "workers": workers,
+            "wall_s": round(best, 4),
+            "speedup": round(results[0]["wall_s"] / best, 2) if results else 1.0,
+            "identical": analysis == reference
+        })
+    return results
+
+
+def benchmark_forecast(accounts=10_000, months=60, loop_accounts=200, seed=0):
+    """Times batched forecasting of many accounts against one call per account
+
+    Args:
+        accounts (int): Synthetic accounts forecast in one batch
+        months (int): Longest history; accounts start at random months
+        loop_accounts (int): Accounts also forecast one by one for comparison
+
+    Returns:
+        dict: Wall times, accounts/s for both modes and whether the
+            per-account results equal the batched ones
+    """
+    from app.FORECAST import forecast_accounts
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+    base = rng.uniform(10_000, 100_000, (accounts, 1))
+    season = 1 + rng.uniform(0, 0.3, (accounts, 1)) * np.sin(2 * np.pi * t / 12)
+    dr = base * season * rng.normal(1, 0.05, (accounts, months))
+    cr = base * 1.05 * rng.normal(1, 0.05, (accounts, months))
+    calendar = pd.date_range("2015-01-01", periods=months, freq="MS")
+    starts = rng.integers(0, months - 3, accounts)
+    inputs = {
+        f"account_{i}": (pd.DataFrame({"date": calendar[starts[i]:], "dr": dr[i, starts[i]:],
+                                       "cr": cr[i, starts[i]:]}), None, None)
+        for i in range(accounts)
+    }
+
+    start = time.perf_counter()
+    batched = forecast_accounts(inputs)
+    batch_s = time.perf_counter() - start
+
+    subset = list(inputs)[:loop_accounts]
+    start = time.perf_counter()
+    looped = {name: forecast_accounts({name: inputs[name]})[name] for name in subset}
+    loop_s = time.perf_counter() - start
+    return {
+        "accounts": accounts,
+        "months": months,
+        "batch_s": round(batch_s, 4),
+        "batch_accounts_per_s": round(accounts / batch_s, 1),
+        "loop_accounts_per_s": round(len(subset) / loop_s, 1),
+        "identical": all(looped[name] == batched[name] for name in subset)
+    }
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the statement processing pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                        help=f"Row counts to benchmark (default: {', '.join(f'{n:,}' for n in DEFAULT_SIZES)})")
+    parser.add_argument("--full", action="store_true", help="Benchmark 1k to 10M rows (ignored with --sizes)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size (best is kept)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON history file")
+    parser.add_argument("--data-dir", default=None, help="Where generated statements are cached")
+    parser.add_argument("--max-format-rows", type=int, default=200_000,
+                        help="Skip prompt formatting above this many rows")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--generate", metavar="PATH", help="Only write one synthetic statement to PATH")
+    parser.add_argument("--rows", type=int, default=10_000, help="Rows for --generate")
+    parser.add_argument("--llm-backends", nargs="+", metavar="NAME",
+                        help="Only compare these LLM backends (e.g. fake openai groq)")
+    parser.add_argument("--llm-calls", type=int, default=10, help="Calls per backend for --llm-backends")
+    parser.add_argument("--scaling", type=int, metavar="ROWS",
+                        help="Only time sharded analysis of ROWS rows on 1..--max-workers processes")
+    parser.add_argument("--max-workers", type=int, default=None, help="Largest process count for --scaling")
+    parser.add_argument("--shard-by", choices=["month", "rows"], default="month", help="Shard mode for --scaling")
+    parser.add_argument("--forecast-accounts", type=int, metavar="N",
+                        help="Benchmark batched forecasting of N synthetic accounts instead")
+    parser.add_argument("--forecast-months", type=int, default=60, help="History length for --forecast-accounts")
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        results = benchmark_scaling(args.scaling, max_workers=args.max_workers, repeat=args.repeat,
+                                    by=args.shard_by, data_dir=args.data_dir, seed=args.seed)
+        print(f"🧮 Sharded Analysis Scaling ({args.scaling:,} rows, {os.cpu_count()} CPUs)")
+        print("=" * 50)
+        for r in results:
+            check = "✅ identical" if r["identical"] else "❌ differs from serial"
+            print(f"• {r['workers']} process(es): {r['wall_s']:.4f}s, {r['speedup']}x, {check}")
+        return 0 if all(r["identical"] for r in results) else 1
+
+    if args.forecast_accounts:
+        r = benchmark_forecast(args.forecast_accounts, months=args.forecast_months, seed=args.seed)
+        print(f"🔮 Batched Forecasting ({r['accounts']:,} accounts, up to {r['months']} months)")
+        print("=" * 50)
+        print(f"• Batch: {r['batch_s']:.4f}s, {r['batch_accounts_per_s']:,} accounts/s")
+        print(f"• One call per account: {r['loop_accounts_per_s']:,} accounts/s")
+        print("✅ identical" if r["identical"] else "❌ per-account results differ from the batch")
+        return 0 if r["identical"] else 1
+
+    if args.llm_backends:
+        summary = benchmark_backends(args.llm_backends, calls=args.llm_calls, seed=args.seed)
+        print("🧠 LLM Backend Comparison")
+        print("=" * 50)
+        for backend, stats in summary.items():
+            print(f"\n• {backend}: {stats['calls']} calls, {stats['errors']} errors")
+            print(f"  → latency mean {stats['latency_mean_s']}s, p50 {stats['latency_p50_s']}s, "
+                  f"p95 {stats['latency_p95_s']}s")
+            print(f"  → {stats['prompt_tokens_per_s']} prompt tokens/s, "
+                  f"{stats['completion_tokens_per_s']} completion tokens/s")
+        return 0
+
+    if args.generate:
+        start = time.perf_counter()
+        generate_statement(args.rows, args.generate, seed=args.seed)
+        print(f"✅ Wrote {args.rows:,} rows to {args.generate} in {time.perf_counter() - start:.2f}s")
+        return 0
+
+    sizes = args.sizes or (FULL_SIZES if args.full else DEFAULT_SIZES)
+    entry, regressions = run_benchmarks(sizes, repeat=args.repeat, history_path=args.history,
+                                        data_dir=args.data_dir, max_format_rows=args.max_format_rows,
+                                        seed=args.seed)
+    print(format_benchmark_report(entry, regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
@@ -0,0 +1,138 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Known counterparties, matched against the payee field of UPI descriptions
+MERCHANT_MAP = {
+    "swiggy": "food", "zomato": "food", "dominos": "food", "mcdonalds": "food", "eatsure": "food",
+    "blinkit": "groceries", "bigbasket": "groceries", "zepto": "groceries", "dmart": "groceries",
+    "jiomart": "groceries",
+    "amazon": "shopping", "amazon pay": "shopping", "flipkart": "shopping", "myntra": "shopping",
+    "ajio": "shopping", "meesho": "shopping", "nykaa": "shopping",
+    "uber": "travel", "uber india": "travel", "ola": "travel", "ola cabs": "travel", "rapido": "travel",
+    "irctc": "travel", "dmrc": "travel", "makemytrip": "travel", "indigo": "travel", "redbus": "travel",
+    "airtel": "telecom", "reliance jio": "telecom", "jio": "telecom", "vodafone idea": "telecom",
+    "netflix": "entertainment", "spotify": "entertainment", "hotstar": "entertainment",
+    "bookmyshow": "entertainment", "google play": "entertainment",
+    "lic": "insurance", "lic of india": "insurance",
+    "zerodha": "investments", "groww": "investments",
+}
+
+# Category rules in priority order, compiled into one alternation of named groups.
+# Each branch is an anchored lookahead, so the first rule that matches anywhere
+# in the description wins rather than the leftmost match.
+CATEGORY_RULES = [
+    ("salary", r"salary|\bsal\b|payroll"),
+    ("interest", r"\bint\.? ?(?:pd|paid|cr)\b|interest"),
+    ("refund", r"refund|reversal|cashback"),
+    ("cash_withdrawal", r"\batm\b|cash wdl|cash withdrawal|\bnfs\b"),
+    ("emi_loans", r"\bemi\b|loan|\bach\b.*(?:bajaj|finance)|nach"),
+    ("rent", r"\brent\b|nobroker|housing"),
+    ("insurance", r"insurance|\blic\b|policy|premium"),
+    ("investments", r"mutual fund|\bmf\b|\bsip\b|zerodha|groww|\bppf\b|\bnps\b|indian clearing"),
+    ("utilities", r"electricity|\bbses\b|tata power|water bill|\bgas\b|bbps|bill ?pay|billdesk"),
+    ("telecom", r"airtel|\bjio\b|vodafone|\bvi\b|broadband|recharge|postpaid"),
+    ("fuel", r"petrol|diesel|\bfuel\b|\bhpcl\b|\bbpcl\b|indian oil|\bioc\b|filling station"),
+    ("food", r"swiggy|zomato|restaurant|cafe|dominos|pizza|mcdonald|\bkfc\b|eatsure"),
+    ("groceries", r"blinkit|bigbasket|zepto|grocery|grofers|dmart|jiomart|supermarket"),
+    ("shopping", r"amazon|flipkart|myntra|ajio|meesho|nykaa|\bmall\b"),
+    ("travel", r"uber|\bola\b|rapido|irctc|dmrc|metro|makemytrip|indigo|redbus|airline|\bfastag\b"),
+    ("entertainment", r"netflix|spotify|hotstar|prime video|bookmyshow|google play|youtube"),
+    ("fees_charges", r"charges?\b|\bfee\b|\bgst\b|penalty|\bsms alert|\bamc\b"),
+    ("cheque", r"\bchq\b|cheque|\bclg\b"),
+    ("upi_transfer", r"\bupi\b"),
+    ("bank_transfer", r"\bneft\b|\bimps\b|\brtgs\b|\bft\b|transfer"),
+]
+
+COMBINED_RULES = re.compile(
+    "^(?:" + "|".join(f"(?=.*?(?P<{name}>{pattern}))" for name, pattern in CATEGORY_RULES) + ")",
+    re.IGNORECASE | re.DOTALL
+)
+UPI_PAYEE = re.compile(r"^UPI/(?:DR|CR)/[^/]*/([^/]+)/", re.IGNORECASE)
+
+_CATEGORY_CACHE = {}
+_CACHE_LIMIT = 500_000
+
+
+def _categorize_uniques(descriptions):
+    """Categorizes a Series of distinct lowercased description keys"""
+    lowered = descriptions
+    payees = lowered.str.extract(UPI_PAYEE, expand=False).str.strip()
+    by_merchant = payees.map(MERCHANT_MAP)
+
+    matches = lowered.str.extract(COMBINED_RULES)
+    matched_any = matches.notna().any(axis=1)
+    # Named groups are mutually exclusive per match, so the first non-null column wins
+    by_rule = matches.notna().idxmax(axis=1).where(matched_any)
+
+    return by_merchant.fillna(by_rule).fillna("other")
+
+
+def categorize_transactions(desc):
+    """Assigns a spending/income category to each transaction description
+
+    Descriptions are lowercased and digit runs (UPI refs, cheque and
+    account numbers) collapsed to '#' so they reduce to a small set of
+    keys. Each key is categorized once and cached by its hash, so repeated
+    merchants and reruns skip the regex pass.
+
+    Args:
+        desc (pd.Series): Raw descriptions, or the categorical desc_key
+            interned at ingestion (then no per-row normalization runs)
+
+    Returns:
+        pd.Series: Category per row, aligned with desc
+    """
+    try:
+        if isinstance(desc.dtype, pd.CategoricalDtype):
+            keys = pd.Series(desc.cat.categories).str.lower()
+            key_codes, uniques = pd.factorize(keys, sort=False)
+            raw_codes = desc.cat.codes.to_numpy()
+        else:
+            raw_codes, raw_uniques = pd.factorize(desc.astype(str), sort=False)
+            keys = pd.Series(raw_uniques).str.lower().str.replace(r'\d+', '#', regex=True)
+            key_codes, uniques = pd.factorize(keys, sort=False)
+        codes = np.where(raw_codes == -1, -1, key_codes[raw_codes]) if len(key_codes) else raw_codes
+        hashes = [hash(d) for d in uniques]
+        cached = np.array([_CATEGORY_CACHE.get(h) for h in hashes], dtype=object)
+        missing = np.flatnonzero(pd.isna(cached))
+
+        if len(missing):
+            fresh = _categorize_uniques(pd.Series(uniques[missing]))
+            cached[missing] = fresh.to_numpy()
+            if len(_CATEGORY_CACHE) + len(missing) > _CACHE_LIMIT:
+                _CATEGORY_CACHE.clear()
+            _CATEGORY_CACHE.update(zip((hashes[i] for i in missing), fresh))
+
+        categories = cached[codes] if len(cached) else np.full(len(codes), "other", dtype=object)
+        categories[codes == -1] = "other"
+        return pd.Series(categories, index=desc.index, name="category")
+
+    except Exception as e:
+        raise ValueError(f"Error categorizing transactions: {str(e)}")
+
+
+def category_totals(df, categories=None):
+    """Sums debits and credits per category
+
+    Args:
+        df (pd.DataFrame): Processed transaction data
+        categories (pd.Series): Precomputed categories; derived from desc when None
+
+    Returns:
+        dict: {category: {"debit", "credit", "count"}}, largest spend first
+    """
+    if categories is None:
+        categories = categorize_transactions(df['desc_key'] if 'desc_key' in df.columns else df['desc'])
+    totals = df[['dr', 'cr']].groupby(categories.to_numpy()).agg(
+        debit=('dr', 'sum'), credit=('cr', 'sum'), count=('dr', 'size')
+    ).sort_values(['debit', 'credit'], ascending=False)
+    return {
+        category: {
+            "debit": round(float(row['debit']), 2),
+            "credit": round(float(row['credit']), 2),
+            "count": int(row['count'])
+        }
+        for category, row in totals.iterrows()
+    }
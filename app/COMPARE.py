@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+from app.TRACE import traced
+
+# Preset name: (period frequency, periods back for the comparison)
+PRESETS = {
+    "month": ("M", 1),
+    "quarter": ("Q", 1),
+    "year": ("Y", 1),
+    "month_last_year": ("M", 12)
+}
+
+
+def _day(value):
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
+
+
+class PeriodTotals:
+    """Prefix sums of daily aggregates for constant-time period totals
+
+    Debit/credit paise and counts are laid out on a dense calendar and
+    accumulated once, so the total of any date range is the difference of
+    two prefix entries, whatever the range length. Closing balances are
+    carried forward over days without transactions.
+
+    Args:
+        days (np.ndarray): Sorted days since 1970-01-01 with transactions
+            (or a balance)
+        debit, credit (np.ndarray): Paise per day
+        debit_count, credit_count (np.ndarray): Transactions per day
+        close (np.ndarray): Closing balance per day, or None
+    """
+
+    def __init__(self, days, debit, credit, debit_count, credit_count, close=None):
+        self.first = int(days[0]) if len(days) else 0
+        length = int(days[-1]) - self.first + 1 if len(days) else 0
+        positions = np.asarray(days, dtype=np.int64) - self.first
+        self.prefix = {}
+        active_days = (np.asarray(debit_count) + np.asarray(credit_count)) > 0
+        for name, values in (("debit", debit), ("credit", credit), ("debit_count", debit_count),
+                             ("credit_count", credit_count), ("active_days", active_days)):
+            dense = np.zeros(length, dtype=np.int64)
+            dense[positions] = np.asarray(values, dtype=np.int64)
+            self.prefix[name] = np.concatenate([[0], np.cumsum(dense)])
+        self.close = None
+        if close is not None and length:
+            active = np.zeros(length, dtype=bool)
+            active[positions] = True
+            self.close = np.asarray(close, dtype=float)[np.cumsum(active) - 1]
+
+    @classmethod
+    def from_cube(cls, cube, analysis=None):
+        """Builds the prefix sums from an AggregateCube's day x direction cells
+
+        Closing balances are taken from analysis["raw_data"]["daily"] when
+        given and present.
+        """
+        days = cube.day.astype(np.int64)
+        balances = None
+        records = (analysis or {}).get("raw_data", {}).get("daily") or []
+        if records and "bal" in records[0]:
+            balances = pd.DataFrame(records)
+            balance_days = pd.to_datetime(balances['date']).to_numpy().astype("datetime64[D]").astype(np.int64)
+            # Days with only zero-amount rows have a balance but no cube cell
+            days = np.concatenate([days, balance_days])
+        unique = np.unique(days)
+
+        # Cells are summed straight from the cube's paise, so totals stay exact
+        position = np.searchsorted(unique, cube.day.astype(np.int64))
+        sums = {}
+        for code, direction in enumerate(("debit", "credit")):
+            mask = cube.direction == code
+            amount = np.zeros(len(unique), dtype=np.int64)
+            count = np.zeros(len(unique), dtype=np.int64)
+            np.add.at(amount, position[mask], cube.amount[mask])
+            np.add.at(count, position[mask], cube.count[mask])
+            sums[direction] = (amount, count)
+
+        close = None
+        if balances is not None:
+            close = pd.Series(balances['bal'].to_numpy(dtype=float), index=balance_days).reindex(unique).ffill().to_numpy()
+        return cls(unique, sums["debit"][0], sums["credit"][0], sums["debit"][1], sums["credit"][1], close)
+
+    @property
+    def start(self):
+        return pd.Timestamp(np.datetime64(self.first, "D"))
+
+    @property
+    def end(self):
+        return pd.Timestamp(np.datetime64(self.first + len(self.prefix["debit"]) - 2, "D"))
+
+    def totals(self, start, end):
+        """Metrics of the inclusive date range, clipped to the statement
+
+        Returns:
+            dict: debit, credit, net, debit_count, credit_count, transactions,
+                avg_debit, avg_credit, active_days, days covered and (with
+                balances) opening/closing balance
+        """
+        length = len(self.prefix["debit"]) - 1
+        a = min(max(_day(start) - self.first, 0), length)
+        b = min(max(_day(end) - self.first + 1, 0), length)
+        b = max(a, b)
+        sums = {name: int(prefix[b] - prefix[a]) for name, prefix in self.prefix.items()}
+        debit, credit = sums["debit"] / 100, sums["credit"] / 100
+        result = {
+            "debit": round(debit, 2),
+            "credit": round(credit, 2),
+            "net": round(credit - debit, 2),
+            "debit_count": sums["debit_count"],
+            "credit_count": sums["credit_count"],
+            "transactions": sums["debit_count"] + sums["credit_count"],
+            "avg_debit": round(debit / sums["debit_count"], 2) if sums["debit_count"] else 0.0,
+            "avg_credit": round(credit / sums["credit_count"], 2) if sums["credit_count"] else 0.0,
+            "active_days": sums["active_days"],
+            "days": b - a
+        }
+        if self.close is not None and b > a:
+            result["opening_balance"] = round(float(self.close[a - 1]), 2) if a > 0 else None
+            result["closing_balance"] = round(float(self.close[b - 1]), 2)
+        return result
+
+    def compare(self, current, previous):
+        """Per-metric deltas between two (start, end) date ranges
+
+        Returns:
+            dict: current and previous ranges and totals, and for each
+                numeric metric its change and percent change (None when
+                the previous value is 0)
+        """
+        now, before = self.totals(*current), self.totals(*previous)
+        changes = {}
+        for metric, value in now.items():
+            old = before.get(metric)
+            if value is None or old is None:
+                continue
+            change = round(value - old, 2)
+            changes[metric] = {
+                "current": value,
+                "previous": old,
+                "change": change,
+                "pct_change": round(100 * change / abs(old), 1) if old else None
+            }
+        return {
+            "current": {"start": pd.Timestamp(current[0]).strftime('%d-%b-%Y'),
+                        "end": pd.Timestamp(current[1]).strftime('%d-%b-%Y'), **now},
+            "previous": {"start": pd.Timestamp(previous[0]).strftime('%d-%b-%Y'),
+                         "end": pd.Timestamp(previous[1]).strftime('%d-%b-%Y'), **before},
+            "changes": changes
+        }
+
+    def preset_ranges(self, preset="month", reference=None, like_for_like=True):
+        """Current and comparison ranges for a preset
+
+        Args:
+            preset (str): "month", "quarter", "year" (each against the one
+                before) or "month_last_year"
+            reference: Date inside the current period (default: statement end)
+            like_for_like (bool): When the statement ends inside the current
+                period, cut the comparison period to the same elapsed days
+
+        Returns:
+            tuple: ((start, end), (start, end)) as Timestamps
+        """
+        freq, back = PRESETS[preset]
+        period = pd.Period(pd.Timestamp(reference) if reference is not None else self.end, freq=freq)
+        previous = period - back
+        current_range = (period.start_time.normalize(), period.end_time.normalize())
+        previous_range = (previous.start_time.normalize(), previous.end_time.normalize())
+        if like_for_like and current_range[1] > self.end:
+            elapsed = self.end - current_range[0]
+            current_range = (current_range[0], self.end)
+            previous_range = (previous_range[0], min(previous_range[0] + elapsed, previous_range[1]))
+        return current_range, previous_range
+
+    def compare_preset(self, preset="month", reference=None, like_for_like=True):
+        """compare() of the ranges from preset_ranges()"""
+        return self.compare(*self.preset_ranges(preset, reference, like_for_like))
+
+
+def merchant_movers(cube, current, previous, n=10, direction="debit"):
+    """Counterparties whose totals changed most between two date ranges
+
+    Unlike PeriodTotals this is a pass over the cube cells of both ranges.
+
+    Returns:
+        pd.DataFrame: merchant, current, previous and change, largest
+            absolute changes first
+    """
+    totals = [cube.drill("merchant", start=start, end=end, direction=direction).set_index("merchant")["amount"]
+              for start, end in (current, previous)]
+    table = pd.concat(totals, axis=1, keys=["current", "previous"]).fillna(0.0)
+    table = table[table.index != ""]
+    table["change"] = (table["current"] - table["previous"]).round(2)
+    order = table["change"].abs().sort_values(ascending=False, kind="stable").index[:n]
+    return table.loc[order].rename_axis("merchant").reset_index()
+
+
+@traced("compare")
+def build_period_totals(cube, analysis=None):
+    """Builds the prefix sums behind the period comparison view
+
+    Args:
+        cube (AggregateCube): Aggregates of the statement
+        analysis (dict): Result of the analysis, for daily closing balances
+
+    Returns:
+        PeriodTotals
+    """
+    return PeriodTotals.from_cube(cube, analysis)
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+from app.AGGREGATE import to_paise
+from app.TRACE import traced
+
+DIMENSIONS = ("day", "month", "weekday", "merchant", "direction")
+DIRECTIONS = np.array(["debit", "credit"], dtype=object)
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _runs(keys):
+    """Sort order and run starts of the rows of `keys` (first key varies slowest)"""
+    order = np.lexsort(keys[::-1])
+    if not len(order):
+        return order, np.array([], dtype=np.int64)
+    changed = np.zeros(len(order), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        sorted_key = key[order]
+        changed[1:] |= sorted_key[1:] != sorted_key[:-1]
+    return order, np.flatnonzero(changed)
+
+
+class AggregateCube:
+    """Debit/credit sums and counts per day x merchant x direction
+
+    The finest cells (one per day, counterparty and direction that occur
+    in the statement) are kept as parallel numpy arrays. Month and weekday
+    are functions of the day, so every roll-up, slice and drill-down is a
+    pass over the cells, never over the transactions. Amounts are integer
+    paise, so any roll-up matches the analysis totals exactly.
+
+    A row with both a debit and a credit contributes one cell entry for
+    each; rows with neither are left out (as in the debit/credit counts).
+    """
+
+    def __init__(self, day, merchant, direction, amount, count, merchants):
+        self.day = day                  # days since 1970-01-01, int32
+        self.merchant = merchant        # index into merchants; -1 is no counterparty
+        self.direction = direction      # 0 debit, 1 credit
+        self.amount = amount            # paise, int64
+        self.count = count              # transactions, int32
+        self.merchants = merchants
+
+    @classmethod
+    def from_frame(cls, df):
+        """Builds the cube of processed transactions in one grouping pass
+
+        Args:
+            df (pd.DataFrame): Rows with datetime dates and dr/cr; merchants
+                come from the counterparty column (derived from desc if missing)
+
+        Returns:
+            AggregateCube
+        """
+        days = df['date'].to_numpy().astype("datetime64[D]").astype(np.int64)
+        if 'counterparty' not in df.columns and 'desc' in df.columns:
+            # Imported here: app.DPROCESS builds on this module
+            from app.DPROCESS import normalize_descriptions
+            df = df.assign(counterparty=normalize_descriptions(df['desc'])[1])
+        if 'counterparty' in df.columns:
+            codes = df['counterparty'].cat.codes.to_numpy().astype(np.int64)
+            merchants = pd.Index(df['counterparty'].cat.categories, dtype=object)
+        else:
+            codes = np.full(len(df), -1, dtype=np.int64)
+            merchants = pd.Index([], dtype=object)
+
+        dr, cr = to_paise(df['dr']), to_paise(df['cr'])
+        is_dr, is_cr = dr > 0, cr > 0
+        day = np.concatenate([days[is_dr], days[is_cr]])
+        merchant = np.concatenate([codes[is_dr], codes[is_cr]])
+        direction = np.repeat(np.array([0, 1], dtype=np.int64), [is_dr.sum(), is_cr.sum()])
+        amount = np.concatenate([dr[is_dr], cr[is_cr]])
+        return cls._grouped(day, merchant, direction, amount, np.ones(len(amount), dtype=np.int64), merchants)
+
+    @classmethod
+    def _grouped(cls, day, merchant, direction, amount, count, merchants):
+        order, starts = _runs([day, merchant, direction])
+        if not len(starts):
+            return cls(np.array([], dtype=np.int32), np.array([], dtype=np.int32), np.array([], dtype=np.int8),
+                       np.array([], dtype=np.int64), np.array([], dtype=np.int32), merchants)
+        first = order[starts]
+        return cls(day[first].astype(np.int32), merchant[first].astype(np.int32), direction[first].astype(np.int8),
+                   np.add.reduceat(amount[order], starts), np.add.reduceat(count[order], starts).astype(np.int32),
+                   merchants)
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.day, self.merchant, self.direction, self.amount, self.count))
+
+    def _codes(self, dimension):
+        if dimension == "day":
+            return self.day.astype(np.int64)
+        if dimension == "month":
+            return self.day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        if dimension == "weekday":
+            # 1970-01-01 was a Thursday; 0 is Monday like pandas
+            return (self.day.astype(np.int64) + 3) % 7
+        if dimension == "merchant":
+            return self.merchant.astype(np.int64)
+        if dimension == "direction":
+            return self.direction.astype(np.int64)
+        raise ValueError(f"Unknown dimension: {dimension}. Use one of: {', '.join(DIMENSIONS)}")
+
+    def _labels(self, dimension, codes):
+        if dimension == "day":
+            return pd.to_datetime(codes.astype("datetime64[D]"))
+        if dimension == "month":
+            return pd.to_datetime(codes.astype("datetime64[M]"))
+        if dimension == "merchant":
+            names = np.append(self.merchants.to_numpy(dtype=object), "")
+            return names[codes]
+        if dimension == "direction":
+            return DIRECTIONS[codes]
+        return codes
+
+    def slice(self, start=None, end=None, months=None, weekdays=None, merchants=None, direction="all"):
+        """Sub-cube of the cells matching every given filter
+
+        Args:
+            start, end: Inclusive date bounds
+            months (list): Month starts (anything pd.Timestamp accepts) to keep
+            weekdays (list): Weekday numbers to keep, 0 is Monday
+            merchants (list): Counterparty names to keep ("" is none)
+            direction (str): "all", "debit" or "credit"
+
+        Returns:
+            AggregateCube: Same merchants, fewer cells
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.day >= pd.Timestamp(start).to_datetime64().astype("datetime64[D]").astype(np.int64)
+        if end is not None:
+            mask &= self.day <= pd.Timestamp(end).to_datetime64().astype("datetime64[D]").astype(np.int64)
+        if months is not None:
+            wanted = pd.to_datetime(list(months)).to_numpy().astype("datetime64[M]").astype(np.int64)
+            mask &= np.isin(self._codes("month"), wanted)
+        if weekdays is not None:
+            mask &= np.isin(self._codes("weekday"), list(weekdays))
+        if merchants is not None:
+            wanted = self.merchants.get_indexer([m for m in merchants if m != ""])
+            wanted = wanted[wanted >= 0]
+            if "" in merchants:
+                wanted = np.append(wanted, -1)
+            mask &= np.isin(self.merchant, wanted)
+        if direction != "all":
+            mask &= self.direction == (0 if direction == "debit" else 1)
+        return AggregateCube(self.day[mask], self.merchant[mask], self.direction[mask],
+                             self.amount[mask], self.count[mask], self.merchants)
+
+    def rollup(self, by=()):
+        """Amount and count totals per combination of the `by` dimensions
+
+        Args:
+            by (str | list): Any of day, month, weekday, merchant, direction;
+                empty for the grand total
+
+        Returns:
+            pd.DataFrame: One row per group (sorted by the dimensions) with
+                amount in rupees and count
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        if not by:
+            return pd.DataFrame({"amount": [self.amount.sum() / 100], "count": [int(self.count.sum())]})
+        keys = [self._codes(dimension) for dimension in by]
+        order, starts = _runs(keys)
+        result = {dimension: self._labels(dimension, key[order][starts]) for dimension, key in zip(by, keys)}
+        if len(starts):
+            result["amount"] = np.add.reduceat(self.amount[order], starts) / 100
+            result["count"] = np.add.reduceat(self.count[order].astype(np.int64), starts)
+        else:
+            result["amount"] = np.array([], dtype=float)
+            result["count"] = np.array([], dtype=np.int64)
+        return pd.DataFrame(result)
+
+    def drill(self, by, **filters):
+        """rollup(by) of the sub-cube selected by slice(**filters)"""
+        return self.slice(**filters).rollup(by)
+
+    def pivot(self, index, columns, value="amount", **filters):
+        """Two-dimensional table of one measure, zeros for empty cells"""
+        table = self.drill([index, columns], **filters)
+        return table.pivot(index=index, columns=columns, values=value).fillna(0)
+
+    def top_merchants(self, n=10, direction="debit"):
+        """Counterparties with the largest totals in one direction"""
+        totals = self.drill("merchant", direction=direction)
+        return totals[totals["merchant"] != ""].nlargest(n, "amount").reset_index(drop=True)
+
+
+@traced("cube")
+def build_cube(df):
+    """Builds the aggregate cube behind the dashboard drill-downs
+
+    Args:
+        df (pd.DataFrame): Processed transaction data
+
+    Returns:
+        AggregateCube
+    """
+    return AggregateCube.from_frame(df)
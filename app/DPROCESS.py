@@ -1,9 +1,22 @@
 import pandas as pd
+import io
+import os
 import re
-from datetime import datetime
+from contextlib import nullcontext
+from functools import lru_cache
 import numpy as np
-from transformers import AutoTokenizer
+from app.TRACE import traced
+from app.AGGREGATE import AnalysisPartial, analyze_chunks, to_paise
+from app.FORMATS import sniff_format
 
+@lru_cache(maxsize=4)
+def load_tokenizer(tokenizer_name="t5-base"):
+    """Loads a tokenizer once per process"""
+    # Imported lazily so batch workers that never count tokens skip loading torch
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(tokenizer_name)
+
+@traced("tokens")
 def count_tokens(text, tokenizer_name="t5-base"):
     """Count tokens using open-source tokenizers
     
@@ -15,113 +28,411 @@ def count_tokens(text, tokenizer_name="t5-base"):
         tuple: (num_tokens, num_chars)
     """
     try:
-        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        tokenizer = load_tokenizer(tokenizer_name)
         tokens = tokenizer.encode(text)
         return len(tokens), len(text)
     except Exception as e:
         print(f"Error counting tokens with {tokenizer_name}: {str(e)}")
         return 0, 0
 
-def preprocess_compact_csv(file_path):
+def open_statement(source):
+    """Opens a statement source as a seekable stream
+    
+    Args:
+        source: Path, bytes, bytearray, memoryview or file-like object
+        
+    Returns:
+        Context manager yielding a seekable stream. Caller-owned file
+        objects are not closed on exit.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, 'rb')
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # BytesIO shares a bytes buffer until written to; bytearray and
+        # memoryview contents are copied once (a Streamlit upload's
+        # getvalue() is bytes, so the common path doesn't copy)
+        return io.BytesIO(source)
+    if hasattr(source, 'read'):
+        if getattr(source, 'seekable', lambda: False)():
+            return nullcontext(source)
+        return io.BytesIO(source.read())
+    raise ValueError(f"Unsupported statement source: {type(source).__name__}")
+
+
+def preprocess_compact_csv(source):
     """Preprocesses compact CSV bank statements to clean and standardize the data.
-    d
+    
+    The bank layout is detected from the first few KB (see app.FORMATS),
+    then only its mapped columns are read and cleaned with that layout's
+    vectorized plan.
+    
     Args:
-        file_path (str): Path to the CSV file
+        source: Path to the CSV file, its raw bytes (bytes, bytearray or
+            memoryview) or a file-like object such as a Streamlit upload
         
     Returns:
-        pd.DataFrame: Cleaned dataframe with standardized columns
+        pd.DataFrame: Cleaned dataframe with standardized columns;
+            df.attrs["format"] names the detected layout and
+            df.attrs["integrity"] holds the validate_statement() report
     """
     try:
-        # Load the full CSV file to find the start of transaction section
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Locate the transaction table header
-        start_idx = None
-        for i, line in enumerate(lines):
-            if "Txn Date" in line and "Description" in line:
-                start_idx = i
-                break
-
-        if start_idx is None:
-            raise ValueError("Transaction table header not found in the CSV file.")
+        with open_statement(source) as f:
+            # Locate the transaction table header, reading only the preamble
+            bank_format, offset = sniff_format(f)
+            if bank_format is None:
+                raise ValueError("Transaction table header not found in the CSV file.")
 
-        # Read from transaction table onward
-        df = pd.read_csv(file_path, skiprows=start_idx)
-
-        # Clean dates and remove ='...'
-        df['Txn Date'] = pd.to_datetime(
-            df['Txn Date'].astype(str).str.replace('="', '').str.replace('"', ''),
-            dayfirst=True,
-            errors='coerce'
-        )
-        df['Value Date'] = pd.to_datetime(
-            df['Value Date'].astype(str).str.replace('="', '').str.replace('"', ''),
-            dayfirst=True,
-            errors='coerce'
-        )
-        
-        # Remove extra formatting from cheque numbers
-        if 'Cheque No.' in df.columns:
-            df['Cheque No.'] = df['Cheque No.'].astype(str).str.replace('="', '').str.replace('"', '')
-
-        # Remove unwanted columns if exists
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-
-        # Clean monetary columns
-        def clean_money(val):
-            if pd.isna(val) or str(val).strip() in ['', 'NaN', 'nan', 'None']:
-                return 0.0
-            return float(re.sub(r'[^\d.-]', '', str(val)))
-        
-        monetary_cols = ['Debit', 'Credit', 'Balance']
-        for col in monetary_cols:
-            if col in df.columns:
-                df[col] = df[col].apply(clean_money)
-
-        # Keep only relevant columns and rename for compactness
-        required_cols = ['Txn Date', 'Description', 'Debit', 'Credit', 'Balance']
-        available_cols = [col for col in required_cols if col in df.columns]
-        
-        df = df[available_cols]
-        df.rename(columns={
-            'Txn Date': 'date',
-            'Description': 'desc',
-            'Debit': 'dr',
-            'Credit': 'cr',
-            'Balance': 'bal'
-        }, inplace=True)
+            # Read from transaction table onward in the same pass
+            f.seek(offset)
+            raw = bank_format.read(f)
+
+        df = bank_format.clean(raw)
 
         # Drop rows with null dates
         df = df.dropna(subset=['date'])
-        
-        return df
+
+        # Intern reference-free description keys and counterparties as integer codes
+        df['desc_key'], df['counterparty'] = normalize_descriptions(df['desc'])
+        df.attrs["format"] = bank_format.name
+
+        # Balance-chain check; rows exported twice are dropped
+        return validate_statement(df)
 
     except Exception as e:
         raise ValueError(f"Error processing CSV file: {str(e)}")
 
 
-def process_csv_file(file_path):
+# Counterparty extractors, applied to uppercase descriptions with digit runs as '#'
+COUNTERPARTY_PATTERNS = [
+    re.compile(r'^UPI/(?:DR|CR)/[^/]*/([^/]+)/'),
+    re.compile(r'^(?:NEFT|RTGS)[^-]*-[A-Z#]*-([^-]+)'),
+    re.compile(r'^IMPS/[^/]*/[^/]*/([^/]+)'),
+    re.compile(r'^CHQ[^-]*-(?:MICR )?(?:CLG|INWARD|OUTWARD)?-?(.+)$'),
+    re.compile(r'^(ATM|POS|ECOM)\b'),
+]
+
+
+def normalize_descriptions(desc):
+    """Maps raw descriptions to reference-free keys and canonical counterparties
+    
+    Digit runs (UPI refs, IFSC branch digits, cheque and account numbers)
+    are collapsed to '#', which turns near-unique descriptions into a small
+    set of keys. The payee is then pulled out of the known UPI/NEFT/IMPS/
+    cheque layouts. Both are interned as categoricals: an integer code per
+    row plus one dictionary of distinct values. Only distinct strings are
+    processed, so cost scales with unique descriptions, not rows.
+    
+    Args:
+        desc (pd.Series): Raw transaction descriptions
+        
+    Returns:
+        tuple: (desc_key, counterparty) as pd.Categorical
+    """
+    raw_codes, raw_uniques = pd.factorize(desc.astype(str), sort=False)
+    stripped = pd.Series(raw_uniques).str.upper().str.replace(r'\d+', '#', regex=True)
+    key_codes, keys = pd.factorize(stripped, sort=False)
+
+    keys = pd.Series(keys)
+    counterparty = pd.Series(np.nan, index=keys.index, dtype=object)
+    for pattern in COUNTERPARTY_PATTERNS:
+        counterparty = counterparty.fillna(keys.str.extract(pattern, expand=False))
+    counterparty = (counterparty.fillna(keys)
+                    .str.replace(r'[^A-Z&]+', ' ', regex=True)
+                    .str.strip()
+                    .replace('', 'UNKNOWN'))
+
+    codes = np.where(raw_codes == -1, -1, key_codes[raw_codes])
+    desc_key = pd.Categorical.from_codes(codes, categories=pd.Index(keys))
+
+    # Several keys can share a counterparty; re-intern so codes are unique per name
+    cp_of_key, cp_names = pd.factorize(counterparty.to_numpy())
+    cp_codes = np.where(codes == -1, -1, cp_of_key[codes]) if len(cp_of_key) else codes
+    return desc_key, pd.Categorical.from_codes(cp_codes, categories=pd.Index(cp_names))
+
+
+def description_key_codes(df):
+    """Returns (codes, keys) for the reference-free description keys of a frame"""
+    if 'desc_key' in df.columns:
+        desc_key = df['desc_key'].cat
+    else:
+        desc_key = pd.Series(normalize_descriptions(df['desc'])[0]).cat
+    return desc_key.codes.to_numpy(), pd.Series(desc_key.categories)
+
+
+def search_transactions(df, term):
+    """Case-insensitive substring search over descriptions
+    
+    Matches each distinct description once and maps the hits back through
+    integer codes, instead of scanning every row's string.
+    
+    Args:
+        df (pd.DataFrame): Processed transaction data
+        term (str): Text to look for
+        
+    Returns:
+        np.ndarray: Boolean mask of matching rows
+    """
+    codes, uniques = pd.factorize(df['desc'].astype(str), sort=False)
+    hits = pd.Series(uniques).str.contains(term, case=False, regex=False).to_numpy()
+    return np.where(codes == -1, False, hits[codes])
+
+
+def _issue_rows(df, positions, max_issues, **columns):
+    """Report records for the first `max_issues` flagged row positions"""
+    positions = positions[:max_issues]
+    records = []
+    for i, pos in enumerate(positions):
+        record = {"row": int(df.index[pos]), "date": df['date'].iloc[pos].strftime('%d-%b-%Y')}
+        for name, values in columns.items():
+            record[name] = round(float(values[i]), 2)
+        records.append(record)
+    return records
+
+
+@traced("validate")
+def validate_statement(df, tolerance=0.01, dedupe=True, max_issues=20):
+    """Checks the running balance and drops duplicated rows in one vectorized pass
+
+    Every row must satisfy bal[i] = bal[i-1] - dr[i] + cr[i]. Amounts are
+    compared as integer paise on whole columns, so millions of rows cost a
+    few array operations. Breaks in the chain are classified as:
+
+    - duplicates: rows repeating an earlier row's date, description,
+      amounts and balance (overlapping exports); removed when dedupe is set
+    - reorderings: adjacent rows whose balances chain once swapped, plus
+      dates going backwards
+    - gaps: the remaining breaks; missing_net is the unrecorded flow
+      (positive: missing credits, negative: missing debits)
+
+    Newest-first statements are recognized and checked in their own order.
+
+    Args:
+        df (pd.DataFrame): Processed transaction data, in statement order
+        tolerance (float): Largest balance mismatch accepted, in rupees
+        dedupe (bool): Drop the duplicated rows from the returned frame
+        max_issues (int): Sample rows kept per issue type in the report
+
+    Returns:
+        pd.DataFrame: The frame (deduplicated if asked), with the report in
+            df.attrs["integrity"]
+    """
+    report = {"checked": False, "rows": len(df), "duplicates": 0}
+    if 'bal' not in df.columns or len(df) < 2:
+        # Without balances identical rows may be genuine repeats; leave them
+        df.attrs["integrity"] = report
+        return df
+
+    dr, cr, bal = to_paise(df['dr']), to_paise(df['cr']), to_paise(df['bal'])
+    # Same day, text, amounts and resulting balance: the row was exported twice.
+    # A copy must repeat its balance, so hashing that one integer column
+    # leaves only a few candidates whose other fields need comparing
+    candidates = pd.Series(bal).duplicated(keep=False).to_numpy() & ((dr > 0) | (cr > 0))
+    duplicated = np.zeros(len(df), dtype=bool)
+    if candidates.any():
+        duplicated[candidates] = df[candidates].duplicated(subset=['date', 'desc', 'dr', 'cr', 'bal']).to_numpy()
+    report["duplicates"] = int(duplicated.sum())
+    report["duplicate_rows"] = _issue_rows(df, np.flatnonzero(duplicated), max_issues)
+    if duplicated.any():
+        keep = ~duplicated
+        dr, cr, bal = dr[keep], cr[keep], bal[keep]
+        checked = df[keep].copy()
+        if dedupe:
+            df = checked
+    else:
+        checked = df
+
+    # One diff over the balance column; flow[i] is what row i adds
+    flow = cr - dr
+    step = np.diff(bal)
+    forward = step - flow[1:]      # oldest first: bal[i] - bal[i-1] == flow[i]
+    backward = step + flow[:-1]    # newest first: bal[i-1] - bal[i] == flow[i-1]
+    limit = int(round(tolerance * 100))
+    newest_first = (np.abs(backward) > limit).sum() < (np.abs(forward) > limit).sum()
+    # Signed as the flow missing from the chain, whichever the order
+    mismatch = -backward if newest_first else forward
+    breaks = np.abs(mismatch) > limit
+
+    # Swapped neighbours: rows b, c out of order chain as a, c, b
+    a, b, c = bal[:-2], bal[1:-1], bal[2:]
+    fa, fb, fc = flow[:-2], flow[1:-1], flow[2:]
+    if newest_first:
+        swapped = (np.abs(a - c - fa) <= limit) & (np.abs(c - b - fc) <= limit)
+    else:
+        swapped = (np.abs(c - a - fc) <= limit) & (np.abs(b - c - fb) <= limit)
+    swapped &= breaks[:-1] & breaks[1:]
+    # Step i-1 (into row b), step i (into row c) and step i+1 (out of c) are
+    # explained by the swap; only steps that are breaks are cleared
+    explained = np.zeros(len(breaks) + 1, dtype=bool)
+    pairs = np.flatnonzero(swapped)
+    for shift in (0, 1, 2):
+        explained[pairs + shift] = True
+    explained = explained[:len(breaks)] & breaks
+
+    dates = checked['date'].to_numpy()
+    regressions = (dates[1:] > dates[:-1]) if newest_first else (dates[1:] < dates[:-1])
+    gaps = np.flatnonzero(breaks & ~explained)
+
+    report.update({
+        "checked": True,
+        "order": "newest_first" if newest_first else "oldest_first",
+        "breaks": int(breaks.sum()),
+        "gaps": len(gaps),
+        "gap_rows": _issue_rows(checked, gaps + 1, max_issues, missing_net=mismatch[gaps[:max_issues]] / 100),
+        "reordered": len(pairs),
+        "reordered_rows": _issue_rows(checked, pairs + 1, max_issues),
+        "date_regressions": int(regressions.sum()),
+        # Total flow the statement can't account for (reconstructed vs reported balance)
+        "unexplained_amount": round(float(mismatch[breaks & ~explained].sum()) / 100, 2)
+    })
+    report["ok"] = not (report["breaks"] or report["date_regressions"] or (report["duplicates"] and not dedupe))
+    df.attrs["integrity"] = report
+    return df
+
+
+def combine_statements(frames, tolerance=0.01):
+    """Merges processed exports of one account that may overlap in time
+
+    Frames are put oldest first, stacked in date order (stable, so each
+    export keeps its own row order) and the rows present in more than one
+    export are dropped by validate_statement() in the same pass that
+    checks the merged balance chain.
+
+    Args:
+        frames (list): Processed transaction frames
+
+    Returns:
+        pd.DataFrame: One deduplicated frame, with df.attrs["integrity"]
+    """
+    ordered = []
+    for frame in frames:
+        dates = frame['date']
+        if dates.is_monotonic_decreasing and not dates.is_monotonic_increasing:
+            frame = frame.iloc[::-1]
+        ordered.append(frame.drop(columns=['desc_key', 'counterparty'], errors='ignore'))
+    ordered.sort(key=lambda frame: frame['date'].min() if len(frame) else pd.Timestamp.max)
+    df = pd.concat(ordered, ignore_index=True).sort_values('date', kind='mergesort').reset_index(drop=True)
+    df['desc_key'], df['counterparty'] = normalize_descriptions(df['desc'])
+    return validate_statement(df, tolerance=tolerance)
+
+
+@traced("parse")
+def process_csv_file(source):
     """Process CSV file and return cleaned transaction data
     
     Args:
-        file_path (str): Path to the CSV file
+        source: Path to the CSV file, its raw bytes or a file-like object
         
     Returns:
         pd.DataFrame: Processed transaction data
     """
     try:
-        transactions_df = preprocess_compact_csv(file_path)
+        transactions_df = preprocess_compact_csv(source)
         return transactions_df
     except Exception as e:
         raise ValueError(f"Failed to process CSV file: {str(e)}")
 
 
-def analyze_bank_transactions(df):
+def process_statement_file(source, pdf_workers=None):
+    """Process a CSV or PDF statement into the same transaction schema
+    
+    Args:
+        source: Path, raw bytes or file-like object of the statement
+        pdf_workers (int): Page extraction processes for PDFs
+        
+    Returns:
+        pd.DataFrame: Processed transaction data
+    """
+    # Imported here: app.PDFPROCESS builds on this module
+    from app.PDFPROCESS import is_pdf, preprocess_pdf
+    if is_pdf(source):
+        return preprocess_pdf(source, workers=pdf_workers)
+    return process_csv_file(source)
+
+
+def iter_statement_chunks(source, chunksize=250_000):
+    """Reads a CSV statement as processed frames of at most `chunksize` rows
+    
+    Each chunk is cleaned like preprocess_compact_csv(), so the statement
+    never has to fit in memory at once. Rows repeating an earlier row
+    (see validate_statement()) are dropped, including copies in a later
+    chunk: a 64-bit hash of every row with an amount is kept across
+    chunks, 8 bytes per row instead of the rows themselves.
+    
+    Args:
+        source: Path, raw bytes or file-like object of the CSV statement
+        chunksize (int): Rows per chunk
+        
+    Yields:
+        pd.DataFrame: Processed chunk, in statement order
+    """
+    with open_statement(source) as f:
+        bank_format, offset = sniff_format(f)
+        if bank_format is None:
+            raise ValueError("Transaction table header not found in the CSV file.")
+        f.seek(offset)
+        seen = np.array([], dtype=np.uint64)
+        for raw in bank_format.read(f, chunksize=chunksize):
+            df = bank_format.clean(raw).dropna(subset=['date'])
+            df, seen = _drop_seen_rows(df, seen)
+            df['desc_key'], df['counterparty'] = normalize_descriptions(df['desc'])
+            yield df
+
+
+def _drop_seen_rows(df, seen):
+    """Drops the rows of a chunk that validate_statement() would count as duplicates
+
+    Args:
+        df (pd.DataFrame): Cleaned chunk
+        seen (np.ndarray): Sorted hashes of the earlier chunks' rows with an amount
+
+    Returns:
+        tuple: (chunk without repeated rows, hashes including this chunk's)
+    """
+    if 'bal' not in df.columns:
+        # Same rule as validate_statement(): without balances repeats may be genuine
+        return df, seen
+    moving = (to_paise(df['dr']) > 0) | (to_paise(df['cr']) > 0)
+    hashes = pd.util.hash_pandas_object(df.loc[moving, ['date', 'desc', 'dr', 'cr', 'bal']], index=False).to_numpy()
+    repeated = pd.Series(hashes).duplicated().to_numpy(copy=True)
+    # Sorted lookups and a run-merging sort keep this linear in the chunk
+    # rather than re-sorting every hash seen so far
+    order = np.argsort(hashes)
+    ordered = hashes[order]
+    if len(seen):
+        found = seen[np.minimum(np.searchsorted(seen, ordered), len(seen) - 1)] == ordered
+        repeated[order[found]] = True
+    drop = np.zeros(len(df), dtype=bool)
+    drop[np.flatnonzero(moving)[repeated]] = True
+    if drop.any():
+        df = df[~drop]
+    return df, np.sort(np.concatenate([seen, ordered]), kind="stable")
+
+
+@traced("analyze")
+def analyze_statement_chunked(source, chunksize=250_000):
+    """Analyzes a CSV statement chunk by chunk, for statements bigger than RAM
+    
+    Args:
+        source: Path, raw bytes or file-like object of the CSV statement
+        chunksize (int): Rows held in memory at a time
+        
+    Returns:
+        dict: Same results as analyze_bank_transactions() on the whole file
+    """
+    try:
+        return analyze_chunks(iter_statement_chunks(source, chunksize))
+    except Exception as e:
+        raise ValueError(f"Error analyzing transactions: {str(e)}")
+
+
+@traced("analyze")
+def analyze_bank_transactions(df, workers=1):
     """Analyzes bank transaction data and computes key metrics
     
     Args:
         df (pd.DataFrame): Processed transaction data
+        workers (int): Processes to shard large frames across (None: CPU
+            count); the result is identical to the serial path
         
     Returns:
         dict: Dictionary containing analysis results
@@ -138,100 +449,26 @@ def analyze_bank_transactions(df):
             df['date'] = pd.to_datetime(df['date'], errors='coerce')
             df = df.dropna(subset=['date'])
 
-        # Basic Metrics
-        total_txns = len(df)
-        start_date = df['date'].min()
-        end_date = df['date'].max()
-        period_days = (end_date - start_date).days + 1
-        
-        total_debit = df['dr'].sum()
-        total_credit = df['cr'].sum()
-        
-        # Balance calculations if balance column exists
-        balance_info = {}
-        if 'bal' in df.columns:
-            opening_balance = df.iloc[0]['bal']
-            closing_balance = df.iloc[-1]['bal']
-            net_savings = closing_balance - opening_balance
-            balance_info = {
-                "opening_balance": round(opening_balance, 2),
-                "closing_balance": round(closing_balance, 2),
-                "net_savings": round(net_savings, 2)
-            }
-        
-        # Daily aggregates
-        daily = df.groupby(df['date'].dt.date).agg({'dr': 'sum', 'cr': 'sum'}).reset_index()
-        top_debit_days = daily.nlargest(3, 'dr')
-        top_credit_days = daily.nlargest(3, 'cr')
+        if workers != 1:
+            # Imported here: only multi-core runs need the process pool machinery
+            from app.PARALLEL import analyze_parallel
+            return analyze_parallel(df, workers=workers)
 
-        # Low-spending days (bottom 10% of spending days)
-        low_spend_days = daily[daily['dr'] < daily['dr'].quantile(0.1)].nsmallest(2, 'dr')
+        # Every path (one frame, chunks, shards) goes through the same mergeable partial
+        return AnalysisPartial.from_frame(df).finalize()
 
-        # Monthly aggregates
-        monthly = df.groupby(df['date'].dt.to_period('M')).agg({'dr': 'sum', 'cr': 'sum'}).reset_index()
-        monthly['date'] = monthly['date'].dt.to_timestamp()
-        
-        # Frequent keywords (merchant analysis)
-        common_keywords = ['amazon', 'zomato', 'blinkit', 'dmrc', 'razorpay', 'swiggy', 
-                          'uber', 'ola', 'paytm', 'google', 'lic', 'airtel', 'jio']
-        freq_dict = {}
-        desc_text = ' '.join(df['desc'].astype(str).str.lower())
-        
-        for keyword in common_keywords:
-            freq_dict[keyword] = desc_text.count(keyword)
-        
-        frequent_merchants = {k: v for k, v in sorted(freq_dict.items(), key=lambda item: item[1], reverse=True) if v > 0}
-
-        # Transaction frequency analysis
-        debit_txns = len(df[df['dr'] > 0])
-        credit_txns = len(df[df['cr'] > 0])
-        
-        # Average transaction amounts
-        avg_debit = df['dr'].mean() if debit_txns > 0 else 0
-        avg_credit = df['cr'].mean() if credit_txns > 0 else 0
-
-        return {
-            "total_transactions": total_txns,
-            "debit_transactions": debit_txns,
-            "credit_transactions": credit_txns,
-            "time_period": {
-                "start_date": start_date.strftime('%d-%b-%Y'),
-                "end_date": end_date.strftime('%d-%b-%Y'),
-                "days": period_days
-            },
-            "amounts": {
-                "total_debit": round(total_debit, 2),
-                "total_credit": round(total_credit, 2),
-                "avg_debit": round(avg_debit, 2),
-                "avg_credit": round(avg_credit, 2)
-            },
-            **balance_info,
-            "daily_analysis": {
-                "top_debit_days": top_debit_days.to_dict(orient='records'),
-                "top_credit_days": top_credit_days.to_dict(orient='records'),
-                "low_spend_days": low_spend_days.to_dict(orient='records')
-            },
-            "monthly_trends": monthly.to_dict(orient='records'),
-            "merchant_analysis": frequent_merchants,
-            "analysis_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            
-            # ✅ NEW: Full raw data for plotting full graphs
-            "raw_data": {
-                "daily": daily.to_dict(orient='records'),
-                "monthly": monthly.to_dict(orient='records')
-            }
-        }
-
-        
     except Exception as e:
         raise ValueError(f"Error analyzing transactions: {str(e)}")
 
 
-def format_analysis_for_prompt(analysis_dict,df):
+@traced("format")
+def format_analysis_for_prompt(analysis_dict,df=None,compact=False):
     """Formats the analysis dictionary into a readable prompt string
     
     Args:
         analysis_dict (dict): Analysis results from analyze_bank_transactions()
+        df (pd.DataFrame): Transactions to list after the summary; omitted when None
+        compact (bool): List transactions with format_transactions_compact()
         
     Returns:
         str: Formatted string ready for LLM prompt
@@ -286,6 +523,48 @@ def format_analysis_for_prompt(analysis_dict,df):
             for merchant, count in analysis_dict['merchant_analysis'].items():
                 lines.append(f"  • {merchant.title()}: {count} mentions")
         
+        # Category Breakdown
+        if analysis_dict.get('category_analysis'):
+            lines.append("\n🏷️ Category Breakdown:")
+            for category, totals in analysis_dict['category_analysis'].items():
+                lines.append(f"  • {category.replace('_', ' ').title()}: Spent ₹{totals['debit']}, "
+                             f"Received ₹{totals['credit']} ({totals['count']} txns)")
+        
+        # Recurring Payments
+        if analysis_dict.get('recurring_payments'):
+            lines.append("\n🔁 Recurring Payments & Income:")
+            for item in analysis_dict['recurring_payments']:
+                sign = "-" if item['direction'] == "debit" else "+"
+                lines.append(f"  • {item['description'][:40]}: {sign}₹{item['avg_amount']} {item['period']} "
+                             f"({item['occurrences']}x, ~₹{item['annual_amount']}/yr, next {item['next_expected']})")
+        
+        # Rolling Cash Flow
+        if analysis_dict.get('rolling_metrics'):
+            lines.append("\n📉 Rolling Cash Flow:")
+            for label, window in analysis_dict['rolling_metrics'].items():
+                latest = window['latest']
+                lines.append(f"  • Last {label}: Spent ₹{latest['debit']} (₹{latest['avg_daily_burn']}/day), "
+                             f"Received ₹{latest['credit']}, Net ₹{latest['net']}")
+                line = (f"    Typical {label}: Spent ₹{window['avg_debit']}, Received ₹{window['avg_credit']}; "
+                        f"peak spend ₹{window['peak_burn']['debit']} (to {window['peak_burn']['end_date']}), "
+                        f"worst net ₹{window['worst_net']['net']} (to {window['worst_net']['end_date']})")
+                if 'lowest_balance' in window:
+                    line += (f"; lowest balance ₹{window['lowest_balance']['min_balance']} "
+                             f"(to {window['lowest_balance']['end_date']})")
+                lines.append(line)
+
+        # Forecast
+        if analysis_dict.get('forecast'):
+            forecast = analysis_dict['forecast']
+            annual = forecast['projected_annual']
+            lines.append(f"\n🔮 Forecast ({forecast['method'].replace('_', ' ')}, "
+                         f"from {forecast['basis_months']} months):")
+            lines.append(f"• Next 12 Months: Spend ₹{annual['debit']}, Receive ₹{annual['credit']}, "
+                         f"Projected Savings ₹{annual['savings']}")
+            for month in forecast['months'][:3]:
+                lines.append(f"  • {pd.to_datetime(month['date']).strftime('%b %Y')}: Spend ₹{month['dr']} "
+                             f"(₹{month['dr_low']}-₹{month['dr_high']}), Receive ₹{month['cr']}")
+
         # Monthly Trends
         if 'monthly_trends' in analysis_dict and analysis_dict['monthly_trends']:
             lines.append("\n📅 Monthly Trends:")
@@ -294,7 +573,10 @@ def format_analysis_for_prompt(analysis_dict,df):
                 lines.append(f"  • {month_date}: Spent ₹{month['dr']}, Received ₹{month['cr']}")
         lines.append("\n" + "="*50)
         lines.append(f"\nAnalysis performed on: {analysis_dict['analysis_date']}")
-        for _, row in df.iterrows():
+        if compact and df is not None:
+            lines.append(format_transactions_compact(df))
+            return "\n".join(lines)
+        for _, row in (df.iterrows() if df is not None else []):
             line = f"{row['date'].strftime('%d-%m-%Y')} | {row['desc'][:40]}... | -{row['dr'] if row['dr'] > 0 else ''} +{row['cr'] if row['cr'] > 0 else ''} = {row['bal']}"
             lines.append(line)
         return "\n".join(lines)
@@ -303,6 +585,92 @@ def format_analysis_for_prompt(analysis_dict,df):
         raise ValueError(f"Error formatting analysis: {str(e)}")
 
 
+def _compact_amounts(values):
+    """Formats amounts without trailing zeros (1250.00 -> 1250, 10.50 -> 10.5)"""
+    return pd.Series(values).map('{:.2f}'.format).str.rstrip('0').str.rstrip('.')
+
+
+def format_transactions_compact(df, min_repeats=2, name_width=24):
+    """Encodes transactions in a token-lean layout for LLM prompts
+    
+    Rows are grouped by day, and each day line starts with the gap in days
+    from the previous listed day instead of a full date. Counterparties seen
+    at least `min_repeats` times go into a dictionary and are referenced as
+    #id. Each row is "counterparty -debit" or "+credit" with no empty
+    fields, and the day line ends with the closing balance.
+    
+    Args:
+        df (pd.DataFrame): Processed transaction data
+        min_repeats (int): Occurrences needed to get a dictionary entry
+        name_width (int): Characters kept of counterparties shown inline
+        
+    Returns:
+        str: Legend, counterparty dictionary and one line per day
+    """
+    if df is None or df.empty:
+        return ""
+    df = df.sort_values('date', kind='mergesort')
+    if 'counterparty' in df.columns:
+        names = df['counterparty'].astype(str)
+    else:
+        names = pd.Series(normalize_descriptions(df['desc'])[1], index=df.index).astype(str)
+
+    counts = names.value_counts()
+    repeated = counts[counts >= min_repeats].index
+    ids = pd.Series(np.arange(len(repeated)), index=repeated)
+    ref = names.map(ids)
+    label = ("#" + ref.astype('Int64').astype(str)).where(ref.notna(), names.str[:name_width])
+
+    dr = df['dr'].to_numpy()
+    cr = df['cr'].to_numpy()
+    amount = np.where(dr > 0, "-" + _compact_amounts(dr).to_numpy(dtype=object),
+                      "+" + _compact_amounts(cr).to_numpy(dtype=object))
+    tokens = pd.Series(label.to_numpy(dtype=object) + " " + amount, index=df.index)
+
+    day = df['date'].dt.normalize()
+    per_day = tokens.groupby(day.to_numpy(), sort=True).agg("; ".join)
+    days = per_day.index
+    gaps = np.diff(days.to_numpy().astype('datetime64[D]').astype(np.int64), prepend=0)
+
+    lines = []
+    lines.append("\n🗜️ Transactions (compact):")
+    lines.append(f"Format: +N = N days after previous line (first line: {days[0].strftime('%d-%m-%Y')}); "
+                 "#id = counterparty below; -debit, +credit; '| bal' = closing balance that day")
+    if len(repeated):
+        lines.append("Counterparties: " + ", ".join(f"#{i}={name}" for i, name in enumerate(repeated)))
+
+    if 'bal' in df.columns:
+        closing = df['bal'].groupby(day.to_numpy(), sort=True).last()
+        tails = " | bal " + _compact_amounts(closing.to_numpy())
+    else:
+        tails = pd.Series([""] * len(days))
+    prefixes = ["+0"] + [f"+{g}" for g in gaps[1:]]
+    lines.extend(p + ": " + t + tail for p, t, tail in zip(prefixes, per_day.to_numpy(), tails))
+    return "\n".join(lines)
+
+
+def compare_prompt_encodings(analysis_dict, df, tokenizer_name="t5-base"):
+    """Measures the token cost of the full vs compact transaction listing
+    
+    Args:
+        analysis_dict (dict): Analysis results from analyze_bank_transactions()
+        df (pd.DataFrame): Processed transaction data
+        tokenizer_name (str): Tokenizer passed to count_tokens()
+        
+    Returns:
+        dict: Tokens and characters per encoding, and the relative savings
+    """
+    full_tokens, full_chars = count_tokens(format_analysis_for_prompt(analysis_dict, df), tokenizer_name)
+    compact_tokens, compact_chars = count_tokens(
+        format_analysis_for_prompt(analysis_dict, df, compact=True), tokenizer_name)
+    return {
+        "full": {"tokens": full_tokens, "chars": full_chars},
+        "compact": {"tokens": compact_tokens, "chars": compact_chars},
+        "token_savings": round(1 - compact_tokens / full_tokens, 4) if full_tokens else 0.0,
+        "char_savings": round(1 - compact_chars / full_chars, 4) if full_chars else 0.0
+    }
+
+
 
 def main_dprocess():
     """Main function to execute the bank statement analysis"""
@@ -331,6 +699,11 @@ def main_dprocess():
         
         print("Tokens-:")
         print(count_tokens(new))
+
+        print("\nCompact encoding:")
+        comparison = compare_prompt_encodings(analysis, df)
+        print(f"Full: {comparison['full']['tokens']} tokens, Compact: {comparison['compact']['tokens']} tokens "
+              f"({comparison['token_savings']:.1%} fewer)")
         
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
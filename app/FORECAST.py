@@ -0,0 +1,229 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+SEASON_LENGTH = 12
+DAMPING = 0.9
+HORIZON = 12
+# Smoothing parameters searched per series: level, trend, season
+ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.05, 0.2)
+GAMMAS = (0.1, 0.3)
+# Normal quantile of the 80% prediction band
+BAND_Z = 1.2816
+
+
+def _parameter_grid():
+    alpha, beta, gamma = np.meshgrid(ALPHAS, BETAS, GAMMAS, indexing="ij")
+    return alpha.ravel(), beta.ravel(), gamma.ravel()
+
+
+def _initial_state(values, start, observed, season_length):
+    """Level, trend and seasonal offsets of each series from its first observations"""
+    accounts, steps = values.shape
+    rows = np.arange(accounts)[:, None]
+
+    def take(offsets):
+        return values[rows, np.minimum(start[:, None] + offsets, steps - 1)]
+
+    seasonal = observed >= 2 * season_length
+    trended = observed >= 3
+    with warnings.catch_warnings():
+        # Series shorter than two seasons average empty slices; they don't use the result
+        warnings.simplefilter("ignore", RuntimeWarning)
+        first = take(np.arange(season_length))
+        first_mean = np.nanmean(first, axis=1)
+        second_mean = np.nanmean(take(np.arange(season_length, 2 * season_length)), axis=1)
+    start_value = np.nan_to_num(values[np.arange(accounts), start])
+    level = np.where(seasonal, first_mean, start_value)
+    slope = np.nan_to_num(take(np.array([1]))[:, 0] - start_value)
+    trend = np.where(seasonal, (second_mean - first_mean) / season_length, np.where(trended, slope, 0.0))
+
+    season = np.zeros((accounts, season_length))
+    # Offsets are indexed by column position modulo the season
+    positions = (start[:, None] + np.arange(season_length)) % season_length
+    season[rows, positions] = np.where(seasonal[:, None], np.nan_to_num(first - level[:, None]), 0.0)
+    return np.nan_to_num(level), np.nan_to_num(trend), season, seasonal, trended
+
+
+def forecast_batch(values, horizon=HORIZON, season_length=SEASON_LENGTH, damping=DAMPING, floor=None):
+    """Exponential smoothing forecasts for many series at once
+
+    Each row is one series over the same number of steps (NaN where it
+    has no data; leading NaNs mark a later start). The model is additive
+    Holt-Winters with a damped trend: rows with two full seasons get the
+    seasonal model, rows with at least three points a damped trend, the
+    rest simple smoothing. Every row is fitted on a grid of smoothing
+    parameters at once, so the only Python loop is over time steps, and
+    the parameters with the lowest one-step-ahead squared error win.
+
+    Args:
+        values (np.ndarray): (series, steps) observations
+        horizon (int): Steps to forecast after the last column
+        season_length (int): Steps per season (12 for monthly data)
+        damping (float): Trend damping factor (1 keeps the trend linear)
+        floor (float): Lower bound applied to forecasts and bands
+
+    Returns:
+        dict: forecast, lower and upper (series, horizon) arrays with an
+            approximate 80% band; method, alpha, beta, gamma, sigma and
+            observations per series
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    accounts, steps = values.shape
+    present = ~np.isnan(values)
+    observed = present.sum(axis=1)
+    start = np.where(observed > 0, present.argmax(axis=1), steps)
+
+    level, trend, season, seasonal, trended = _initial_state(values, np.minimum(start, steps - 1),
+                                                             observed, season_length)
+    alpha, beta, gamma = _parameter_grid()
+    combos = len(alpha)
+    # Series without enough history have their trend/season updates switched off
+    alpha = np.broadcast_to(alpha, (accounts, combos))
+    beta = beta[None, :] * trended[:, None]
+    gamma = gamma[None, :] * seasonal[:, None]
+    level = np.repeat(level[:, None], combos, axis=1)
+    trend = np.repeat(trend[:, None], combos, axis=1)
+    season = np.repeat(season[:, None, :], combos, axis=1)
+    sse = np.zeros((accounts, combos))
+
+    for t in range(steps):
+        active = (t >= start)[:, None]
+        y = values[:, t][:, None]
+        position = t % season_length
+        offset = season[:, :, position]
+        predicted = level + damping * trend + offset
+        # Error-correction form; a missing value leaves err at 0, so the
+        # level just follows the damped trend
+        err = np.where(active & ~np.isnan(y), y - predicted, 0.0)
+        sse += err ** 2
+        level = np.where(active, level + damping * trend + alpha * err, level)
+        trend = np.where(active, damping * trend + alpha * beta * err, trend)
+        season[:, :, position] = offset + gamma * (1 - alpha) * err
+
+    best = sse.argmin(axis=1)
+    rows = np.arange(accounts)
+    level, trend = level[rows, best], trend[rows, best]
+    season = season[rows, best]
+    sigma = np.sqrt(sse[rows, best] / np.maximum(observed - 1, 1))
+
+    steps_ahead = np.arange(1, horizon + 1)
+    damped = np.cumsum(damping ** steps_ahead)
+    positions = (steps - 1 + steps_ahead) % season_length
+    forecast = level[:, None] + damped[None, :] * trend[:, None] + season[:, positions]
+    spread = BAND_Z * sigma[:, None] * np.sqrt(steps_ahead)[None, :]
+    lower, upper = forecast - spread, forecast + spread
+    if floor is not None:
+        forecast, lower, upper = (np.maximum(a, floor) for a in (forecast, lower, upper))
+    empty = observed == 0
+    forecast[empty] = lower[empty] = upper[empty] = np.nan
+
+    method = np.where(seasonal, "holt_winters", np.where(trended, "damped_trend", "simple"))
+    return {
+        "forecast": forecast,
+        "lower": lower,
+        "upper": upper,
+        "method": method,
+        "alpha": alpha[rows, best],
+        "beta": beta[rows, best],
+        "gamma": gamma[rows, best],
+        "sigma": sigma,
+        "observations": observed
+    }
+
+
+def _month_numbers(dates):
+    """Months since 1970-01 of dates given as timestamps, dates or strings"""
+    return np.asarray(dates, dtype="datetime64[M]").astype(np.int64)
+
+
+def _complete_months(months, start=None, end=None):
+    """Mask dropping a partial first/last month so it doesn't read as a dip"""
+    keep = np.ones(len(months), dtype=bool)
+    if start is not None and pd.Timestamp(start).day != 1:
+        keep &= months != _month_numbers([start])[0]
+    if end is not None and not pd.Timestamp(end).is_month_end:
+        keep &= months != _month_numbers([end])[0]
+    return keep if keep.any() else np.ones(len(months), dtype=bool)
+
+
+def forecast_accounts(accounts, horizon=HORIZON):
+    """Forecasts monthly debits and credits of many statements in one batch
+
+    Args:
+        accounts (dict): Name -> (monthly, start, end), where monthly is a
+            frame (or records) of month start dates with dr/cr totals, like
+            the "monthly_trends" of an analysis, and start/end (or None)
+            bound the statement, so a partial first or last month is left out
+        horizon (int): Months to forecast
+
+    Returns:
+        dict: Name -> forecast section (see forecast_monthly())
+    """
+    names, months, debits, credits = [], [], [], []
+    for name, (monthly, start, end) in accounts.items():
+        if not isinstance(monthly, pd.DataFrame):
+            monthly = pd.DataFrame(list(monthly), columns=["date", "dr", "cr"])
+        if monthly.empty:
+            continue
+        numbers = _month_numbers(monthly['date'])
+        keep = _complete_months(numbers, start, end)
+        names.append(name)
+        months.append(numbers[keep])
+        debits.append(monthly['dr'].to_numpy(dtype=float)[keep])
+        credits.append(monthly['cr'].to_numpy(dtype=float)[keep])
+    if not names:
+        return {}
+
+    # Rows are right-aligned (each statement's last month is the last column,
+    # missing months are NaN), so every forecast starts after its own last
+    # month; seasonal offsets are per row, so the shift doesn't matter
+    lengths = np.array([len(m) for m in months])
+    flat = np.concatenate(months)
+    last = np.array([m.max() for m in months])
+    width = int((last - np.array([m.min() for m in months])).max()) + 1
+    account = np.repeat(np.arange(len(names)), lengths)
+    columns = width - 1 - (last[account] - flat)
+    values = np.full((2 * len(names), width), np.nan)
+    values[2 * account, columns] = np.concatenate(debits)
+    values[2 * account + 1, columns] = np.concatenate(credits)
+    result = forecast_batch(values, horizon=horizon, floor=0.0)
+
+    # Sections are assembled from whole-batch arrays; only the dicts are per account
+    rounded = {key: np.round(result[key], 2) for key in ("forecast", "lower", "upper")}
+    debit, credit = result["forecast"][0::2], result["forecast"][1::2]
+    net = np.round(credit - debit, 2)
+    annual = slice(0, min(horizon, 12))
+    projected = np.round(np.stack([debit[:, annual].sum(axis=1), credit[:, annual].sum(axis=1),
+                                   (credit - debit)[:, annual].sum(axis=1)], axis=1), 2).tolist()
+    future = last[:, None] + 1 + np.arange(horizon)
+    unique, inverse = np.unique(future, return_inverse=True)
+    stamps = np.array(pd.to_datetime(unique.astype("datetime64[M]")).tolist(), dtype=object)[inverse.reshape(future.shape)]
+    keys = ("date", "dr", "cr", "net", "dr_low", "dr_high", "cr_low", "cr_high")
+
+    sections = {}
+    for i, name in enumerate(names):
+        dr, cr = 2 * i, 2 * i + 1
+        rows = zip(stamps[i], rounded["forecast"][dr].tolist(), rounded["forecast"][cr].tolist(), net[i].tolist(),
+                   rounded["lower"][dr].tolist(), rounded["upper"][dr].tolist(),
+                   rounded["lower"][cr].tolist(), rounded["upper"][cr].tolist())
+        sections[name] = {
+            "method": str(result["method"][dr]),
+            "basis_months": int(result["observations"][dr]),
+            "months": [dict(zip(keys, row)) for row in rows],
+            "projected_annual": dict(zip(("debit", "credit", "savings"), projected[i]))
+        }
+    return sections
+
+
+def forecast_monthly(monthly, start=None, end=None, horizon=HORIZON):
+    """Forecast section for one statement's monthly debits and credits
+
+    Returns:
+        dict: method, basis_months, months (date, dr, cr, net and 80%
+            bands per future month) and projected_annual debit, credit
+            and savings over the next 12 months; empty without data
+    """
+    return forecast_accounts({"statement": (monthly, start, end)}, horizon).get("statement", {})
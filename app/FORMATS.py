@@ -0,0 +1,170 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+SNIFF_BYTES = 64 * 1024
+MONEY_JUNK = re.compile(r"[^\d.\-]")
+
+
+class BankFormat:
+    """One bank's CSV export layout, with its cleaning plan compiled up front
+
+    Args:
+        name (str): Registry name
+        markers (tuple): Strings that must all appear on the header line
+        columns (dict): Output column -> header name. Uses date, desc and
+            bal plus either dr/cr (split amounts), amount (signed, negative
+            is a debit) or amount + indicator (Dr/Cr flag column)
+        date_format (str): strptime format of the date column
+        excel_quoted (bool): Dates are exported as ="dd-mm-yyyy" formulas
+        debit_flags (tuple): Indicator values meaning debit
+    """
+
+    def __init__(self, name, markers, columns, date_format, excel_quoted=False, debit_flags=("DR", "D")):
+        self.name = name
+        self.markers = tuple(markers)
+        self.columns = dict(columns)
+        self.debit_flags = tuple(debit_flags)
+        if "dr" in columns:
+            self.amount_style = "split"
+        elif "indicator" in columns:
+            self.amount_style = "indicator"
+        else:
+            self.amount_style = "signed"
+
+        # Cleaning plan: literal quotes go into the date format so parsing
+        # needs no string surgery, and only the mapped columns are read
+        self.date_format = f'="{date_format}"' if excel_quoted else date_format
+        wanted = {header.strip(): target for target, header in columns.items()}
+        text_columns = {columns["date"].strip(), columns["desc"].strip(), columns.get("indicator", "").strip()}
+        self.read_kwargs = {
+            "usecols": lambda header: header.strip() in wanted,
+            "thousands": ",",
+            "dtype": {header: str for header in wanted if header in text_columns}
+        }
+        self.rename = wanted
+
+    def matches(self, line):
+        return all(marker in line for marker in self.markers)
+
+    def read(self, stream, chunksize=None):
+        """Reads the transaction table from a stream positioned at its header
+
+        Returns one frame, or an iterator of frames when chunksize is set
+        """
+        if chunksize:
+            return (self._rename(raw) for raw in pd.read_csv(stream, chunksize=chunksize, **self.read_kwargs))
+        return self._rename(pd.read_csv(stream, **self.read_kwargs))
+
+    def _rename(self, raw):
+        raw.columns = [self.rename[c.strip()] for c in raw.columns]
+        return raw
+
+    def _parse_dates(self, values):
+        # Statements repeat each date many times: parse the distinct values once
+        codes, uniques = pd.factorize(values, sort=False)
+        uniques = pd.Series(uniques, dtype=object)
+        parsed = pd.to_datetime(uniques, format=self.date_format, errors="coerce")
+        failed = parsed.isna() & uniques.notna()
+        if failed.any():
+            # Rows off the registered format fall back to flexible day-first parsing
+            retry = uniques[failed].astype(str).str.replace('="', '', regex=False).str.replace('"', '', regex=False)
+            parsed[failed] = pd.to_datetime(retry, dayfirst=True, errors="coerce")
+        return pd.Series(np.where(codes == -1, np.datetime64("NaT"), parsed.to_numpy()[codes]),
+                         index=values.index, dtype=parsed.dtype)
+
+    @staticmethod
+    def _money(values):
+        if pd.api.types.is_numeric_dtype(values):
+            return values.fillna(0.0).astype(float)
+        cleaned = values.astype(str).str.replace(MONEY_JUNK, "", regex=True)
+        return pd.to_numeric(cleaned, errors="coerce").fillna(0.0)
+
+    def clean(self, raw):
+        """Applies the plan: returns date/desc/dr/cr/bal like the original layout"""
+        df = pd.DataFrame(index=raw.index)
+        df['date'] = self._parse_dates(raw['date'])
+        df['desc'] = raw['desc']
+        if self.amount_style == "split":
+            df['dr'] = self._money(raw['dr'])
+            df['cr'] = self._money(raw['cr'])
+        else:
+            amount = self._money(raw['amount'])
+            if self.amount_style == "indicator":
+                is_debit = raw['indicator'].astype(str).str.strip().str.upper().isin(self.debit_flags).to_numpy()
+                amount = amount.abs()
+            else:
+                is_debit = (amount < 0).to_numpy()
+                amount = amount.abs()
+            df['dr'] = np.where(is_debit, amount, 0.0)
+            df['cr'] = np.where(is_debit, 0.0, amount)
+        if 'bal' in raw.columns:
+            df['bal'] = self._money(raw['bal'])
+        return df
+
+
+# Most specific first: the last entry is the original layout, matched on
+# the same "Txn Date" + "Description" header the parser always used
+BANK_FORMATS = [
+    BankFormat("sbi", ("Txn Date", "Value Date", "Description", "Ref No./Cheque No."),
+               {"date": "Txn Date", "desc": "Description", "dr": "Debit", "cr": "Credit", "bal": "Balance"},
+               "%d %b %Y"),
+    BankFormat("hdfc", ("Narration", "Withdrawal Amt", "Deposit Amt"),
+               {"date": "Date", "desc": "Narration", "dr": "Withdrawal Amt.", "cr": "Deposit Amt.",
+                "bal": "Closing Balance"},
+               "%d/%m/%y"),
+    BankFormat("icici", ("Transaction Remarks", "Withdrawal Amount", "Deposit Amount"),
+               {"date": "Transaction Date", "desc": "Transaction Remarks", "dr": "Withdrawal Amount (INR )",
+                "cr": "Deposit Amount (INR )", "bal": "Balance (INR )"},
+               "%d/%m/%Y"),
+    BankFormat("axis", ("Tran Date", "CHQNO", "PARTICULARS"),
+               {"date": "Tran Date", "desc": "PARTICULARS", "dr": "DR", "cr": "CR", "bal": "BAL"},
+               "%d-%m-%Y"),
+    BankFormat("kotak", ("Transaction Date", "Description", "Amount", "Dr / Cr"),
+               {"date": "Transaction Date", "desc": "Description", "amount": "Amount", "indicator": "Dr / Cr",
+                "bal": "Balance"},
+               "%d-%m-%Y"),
+    BankFormat("canara", ("Txn Date", "Description"),
+               {"date": "Txn Date", "desc": "Description", "dr": "Debit", "cr": "Credit", "bal": "Balance"},
+               "%d-%m-%Y", excel_quoted=True),
+]
+
+
+def register_format(bank_format, first=True):
+    """Adds a layout to the registry, ahead of the built-ins by default"""
+    if first:
+        BANK_FORMATS.insert(0, bank_format)
+    else:
+        BANK_FORMATS.append(bank_format)
+
+
+def sniff_format(stream, sniff_bytes=SNIFF_BYTES):
+    """Finds the statement layout from the first few KB of a stream
+
+    Args:
+        stream: Seekable text or binary stream, at the start of the file
+        sniff_bytes (int): How much to read looking for the header line
+
+    Returns:
+        tuple: (BankFormat, offset of its header line), or (None, None);
+            the stream is left at its starting position
+    """
+    start = stream.tell()
+    offset, read = start, 0
+    try:
+        # Offsets come from tell(), not summed line lengths: in a text
+        # stream characters and bytes differ once the preamble has non-ASCII
+        while read < sniff_bytes:
+            raw_line = stream.readline(sniff_bytes - read)
+            if not raw_line:
+                break
+            line = raw_line.decode("utf-8", errors="ignore") if isinstance(raw_line, bytes) else raw_line
+            for bank_format in BANK_FORMATS:
+                if bank_format.matches(line):
+                    return bank_format, offset
+            read += len(raw_line)
+            offset = stream.tell()
+        return None, None
+    finally:
+        stream.seek(start)
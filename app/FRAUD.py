@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from app.RECURRING import description_keys
+
+FLAG_WEIGHTS = {
+    "outlier": 2,
+    "duplicate": 2,
+    "rapid_sequence": 1,
+    "round_amount": 1
+}
+
+
+def screen_transactions(df, z_threshold=3.0, window=30, min_periods=10,
+                        rapid_count=3, round_unit=1000, round_min=10000):
+    """Flags suspicious transactions locally before anything goes to the LLM
+
+    Runs the statistical checks the fraud_check prompt used to ask the LLM
+    for, as vectorized passes over the frame:
+
+    - outlier: more than z_threshold standard deviations from the mean,
+      either over the whole statement or over the previous `window`
+      transactions in the same direction (rolling z-score)
+    - duplicate: same day, counterparty, direction and amount more than once
+    - rapid_sequence: `rapid_count` or more debits to one counterparty on one
+      day (statements carry dates only, so same-day bursts stand in for the
+      "<5 min apart" check)
+    - round_amount: multiples of `round_unit` of at least `round_min`
+
+    Args:
+        df (pd.DataFrame): Processed transaction data
+
+    Returns:
+        tuple: (flagged rows sorted by risk, summary dict of counts per check)
+    """
+    try:
+        columns = [c for c in ['date', 'desc', 'dr', 'cr', 'bal'] if c in df.columns]
+        if df.empty:
+            return df[columns].assign(flags="", risk_score=0), {"screened": 0, "flagged": 0}
+
+        dr = df['dr'].to_numpy(dtype=float)
+        cr = df['cr'].to_numpy(dtype=float)
+        is_debit = dr > 0
+        amount = pd.Series(np.where(is_debit, dr, cr), index=df.index)
+        direction = pd.Series(np.where(is_debit, "debit", "credit"), index=df.index)
+        keys = description_keys(df) if 'desc' in df.columns else np.zeros(len(df), dtype=np.int64)
+
+        # Global and rolling z-scores, per direction, excluding the row itself
+        z_global = pd.Series(0.0, index=df.index)
+        z_rolling = pd.Series(0.0, index=df.index)
+        for dir_mask in (direction == "debit", direction == "credit"):
+            values = amount[dir_mask & (amount > 0)]
+            if len(values) < 2:
+                continue
+            std = values.std()
+            if std > 0:
+                z_global[values.index] = (values - values.mean()) / std
+            prior = values.shift(1).rolling(window, min_periods=min_periods)
+            rolling_std = prior.std()
+            z = (values - prior.mean()) / rolling_std.where(rolling_std > 0)
+            z_rolling[values.index] = z.fillna(0.0)
+        z_score = np.maximum(z_global, z_rolling)
+        outlier = (z_score > z_threshold).to_numpy()
+
+        frame = pd.DataFrame({
+            "day": df['date'].dt.normalize().to_numpy(),
+            "key": keys,
+            "direction": direction.to_numpy(),
+            "amount": amount.to_numpy()
+        })
+        duplicate = (frame.duplicated(subset=["day", "key", "direction", "amount"], keep=False)
+                     & (frame['amount'] > 0)).to_numpy()
+        burst = frame[is_debit].groupby(["day", "key"])['amount'].transform("size")
+        rapid = np.zeros(len(df), dtype=bool)
+        rapid[np.flatnonzero(is_debit)] = burst.to_numpy() >= rapid_count
+        round_amount = ((frame['amount'] >= round_min)
+                        & (np.mod(frame['amount'], round_unit) == 0)).to_numpy()
+
+        checks = {
+            "outlier": outlier,
+            "duplicate": duplicate,
+            "rapid_sequence": rapid,
+            "round_amount": round_amount
+        }
+        score = sum(FLAG_WEIGHTS[name] * mask.astype(int) for name, mask in checks.items())
+        flagged_mask = score > 0
+
+        flag_names = np.array(list(checks))
+        flag_matrix = np.column_stack(list(checks.values()))[flagged_mask]
+        flags = [", ".join(flag_names[row]) for row in flag_matrix]
+
+        flagged = df.loc[flagged_mask, columns].copy()
+        flagged['flags'] = flags
+        flagged['z_score'] = np.round(z_score[flagged_mask].to_numpy(), 2)
+        flagged['risk_score'] = np.clip(score[flagged_mask], 1, 5)
+        flagged = flagged.sort_values(['risk_score', 'z_score'], ascending=False)
+
+        summary = {
+            "screened": len(df),
+            "flagged": int(flagged_mask.sum()),
+            **{name: int(mask.sum()) for name, mask in checks.items()}
+        }
+        return flagged, summary
+
+    except Exception as e:
+        raise ValueError(f"Error screening transactions: {str(e)}")
+
+
+def format_screen_for_prompt(flagged, summary, max_rows=200):
+    """Formats the pre-screen results as the transaction block of the fraud prompt
+
+    Args:
+        flagged (pd.DataFrame): Flagged rows from screen_transactions()
+        summary (dict): Check counts from screen_transactions()
+        max_rows (int): Highest-risk rows to include
+
+    Returns:
+        str: Screening summary followed by the flagged rows only
+    """
+    lines = []
+    lines.append("\n🚨 Local Fraud Pre-Screen:")
+    lines.append(f"• Transactions screened: {summary['screened']}")
+    lines.append(f"• Transactions flagged: {summary['flagged']}")
+    for name in FLAG_WEIGHTS:
+        if name in summary:
+            lines.append(f"  → {name.replace('_', ' ').title()}: {summary[name]}")
+    if flagged.empty:
+        lines.append("\nNo transactions were flagged by the statistical checks.")
+        return "\n".join(lines)
+
+    shown = flagged.head(max_rows)
+    lines.append(f"\nFlagged transactions (top {len(shown)} by risk, risk 1-5):")
+    for row in shown.itertuples(index=False):
+        amount = f"-{row.dr}" if row.dr > 0 else f"+{row.cr}"
+        lines.append(f"{row.date.strftime('%d-%m-%Y')} | {str(row.desc)[:40]} | {amount} | "
+                     f"risk {row.risk_score} | z={row.z_score} | {row.flags}")
+    return "\n".join(lines)
@@ -1,15 +1,236 @@
-from docx import Document
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
 from io import BytesIO
 
-def generate_docx(question, response):
+from docx import Document
+from docx.shared import Inches, Pt
+
+REPORT_TEMPLATE = os.getenv("REPORT_TEMPLATE")
+CACHE_SIZE = 32
+
+_REPORT_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+BOLD_SPAN = re.compile(r"\*\*(.+?)\*\*")
+BULLET = re.compile(r"^\s*(?:[-*•→]|\d+[.)])\s+")
+
+
+@lru_cache(maxsize=1)
+def _template_bytes():
+    """Loads the report template once per process
+
+    Uses the .docx at REPORT_TEMPLATE when set (corporate styles, header
+    and footer), otherwise python-docx's default with the body font set.
+    Every report then opens this in-memory copy instead of re-reading and
+    re-styling the template from disk.
+    """
+    if REPORT_TEMPLATE and os.path.isfile(REPORT_TEMPLATE):
+        with open(REPORT_TEMPLATE, "rb") as f:
+            return f.read()
     doc = Document()
+    normal = doc.styles['Normal']
+    normal.font.name = 'Calibri'
+    normal.font.size = Pt(11)
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def report_key(question, response, analysis=None):
+    """Cache key for a report: the question, the answer and the statement it describes"""
+    statement = ""
+    if analysis:
+        period = analysis.get("time_period", {})
+        amounts = analysis.get("amounts", {})
+        statement = (f"{analysis.get('total_transactions')}|{period.get('start_date')}|{period.get('end_date')}|"
+                     f"{amounts.get('total_debit')}|{amounts.get('total_credit')}")
+    text = f"{question or ''}\x00{response or ''}\x00{statement}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def cached_report(key):
+    """Returns the cached report bytes for a key, or None"""
+    with _CACHE_LOCK:
+        if key in _REPORT_CACHE:
+            _REPORT_CACHE.move_to_end(key)
+            return _REPORT_CACHE[key]
+    return None
+
+
+def _add_runs(paragraph, text):
+    """Adds text to a paragraph, rendering **bold** spans"""
+    parts = BOLD_SPAN.split(text)
+    for i, part in enumerate(parts):
+        if part:
+            paragraph.add_run(part).bold = i % 2 == 1
+
+
+def _add_markdown(doc, text):
+    """Adds an LLM answer as headings, bullet lists and paragraphs"""
+    for line in str(text).splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith("#"):
+            level = min(len(stripped) - len(stripped.lstrip("#")) + 1, 4)
+            doc.add_heading(stripped.lstrip("#").strip(), level=level)
+        elif BULLET.match(stripped):
+            numbered = stripped[0].isdigit()
+            style = 'List Number' if numbered else 'List Bullet'
+            _add_runs(doc.add_paragraph(style=style), BULLET.sub("", stripped, count=1))
+        else:
+            _add_runs(doc.add_paragraph(), stripped)
+
+
+def _add_table(doc, header, rows):
+    """Adds a table with a bold header row"""
+    table = doc.add_table(rows=len(rows) + 1, cols=len(header))
+    try:
+        table.style = doc.styles['Light Grid Accent 1']
+    except KeyError:
+        table.style = doc.styles['Table Grid']
+    cells = table._cells
+    for j, title in enumerate(header):
+        cells[j].text = str(title)
+        for run in cells[j].paragraphs[0].runs:
+            run.bold = True
+    width = len(header)
+    for i, row in enumerate(rows, 1):
+        for j, value in enumerate(row):
+            cells[i * width + j].text = str(value)
+    return table
+
+
+def _money(value):
+    return f"₹{value:,.2f}"
+
+
+def _add_analysis(doc, analysis):
+    """Adds the metric, category, monthly and recurring tables"""
+    doc.add_heading('Key Metrics', level=1)
+    period = analysis.get("time_period", {})
+    amounts = analysis.get("amounts", {})
+    metrics = [
+        ("Period", f"{period.get('start_date')} to {period.get('end_date')} ({period.get('days')} days)"),
+        ("Transactions", f"{analysis.get('total_transactions', 0):,} "
+                         f"({analysis.get('debit_transactions', 0):,} debits, "
+                         f"{analysis.get('credit_transactions', 0):,} credits)"),
+        ("Total Debited", _money(amounts.get("total_debit", 0))),
+        ("Total Credited", _money(amounts.get("total_credit", 0))),
+        ("Average Debit", _money(amounts.get("avg_debit", 0))),
+        ("Average Credit", _money(amounts.get("avg_credit", 0)))
+    ]
+    if "opening_balance" in analysis:
+        metrics += [
+            ("Opening Balance", _money(analysis["opening_balance"])),
+            ("Closing Balance", _money(analysis["closing_balance"])),
+            ("Net Change", _money(analysis["net_savings"]))
+        ]
+    _add_table(doc, ["Metric", "Value"], metrics)
+
+    categories = analysis.get("category_analysis") or {}
+    if categories:
+        doc.add_heading('Spending by Category', level=1)
+        _add_table(doc, ["Category", "Debited", "Credited", "Transactions"], [
+            (name.replace('_', ' ').title(), _money(c["debit"]), _money(c["credit"]), f"{c['count']:,}")
+            for name, c in categories.items()
+        ])
+
+    monthly = analysis.get("raw_data", {}).get("monthly") or []
+    if monthly:
+        doc.add_heading('Monthly Trends', level=1)
+        _add_table(doc, ["Month", "Debited", "Credited", "Net"], [
+            (m["date"].strftime('%b %Y') if hasattr(m["date"], "strftime") else str(m["date"])[:7],
+             _money(m["dr"]), _money(m["cr"]), _money(m["cr"] - m["dr"]))
+            for m in monthly
+        ])
+
+    recurring = analysis.get("recurring_payments") or []
+    if recurring:
+        doc.add_heading('Recurring Payments & Income', level=1)
+        _add_table(doc, ["Description", "Direction", "Period", "Avg Amount", "Next Expected"], [
+            (r["description"][:40], r["direction"], r["period"], _money(r["avg_amount"]), r["next_expected"])
+            for r in recurring[:15]
+        ])
+
+
+def _chart_images(analysis):
+    """Renders the monthly and category charts to PNG
+
+    Needs kaleido for plotly's static export; returns no images without it.
+    """
+    try:
+        import plotly.graph_objects as go
+        images = []
+        monthly = analysis.get("raw_data", {}).get("monthly") or []
+        if monthly:
+            months = [m["date"] for m in monthly]
+            fig = go.Figure([
+                go.Bar(x=months, y=[m["dr"] for m in monthly], name="Debited", marker_color="#f5576c"),
+                go.Bar(x=months, y=[m["cr"] for m in monthly], name="Credited", marker_color="#4facfe")
+            ])
+            fig.update_layout(title="Monthly Debits vs Credits", barmode="group", template="plotly_white",
+                              width=900, height=400)
+            images.append(("Monthly Debits vs Credits", fig.to_image(format="png")))
+        categories = {k: v["debit"] for k, v in (analysis.get("category_analysis") or {}).items() if v["debit"] > 0}
+        if categories:
+            fig = go.Figure(go.Pie(labels=[k.replace('_', ' ').title() for k in categories],
+                                   values=list(categories.values()), hole=0.4))
+            fig.update_layout(title="Spending by Category", template="plotly_white", width=700, height=450)
+            images.append(("Spending by Category", fig.to_image(format="png")))
+        return images
+    except (ImportError, ValueError, RuntimeError):
+        return []
+
+
+def generate_docx(question, response, analysis=None, charts=True):
+    """Builds the DOCX report for an AI answer
+
+    Reports are built from the preloaded template and cached per
+    question/answer/statement, so preparing the same report again only
+    copies bytes.
+
+    Args:
+        question (str): Question asked (or analysis style)
+        response (str): LLM answer; markdown headings, bullets and **bold** are kept
+        analysis (dict): Results from analyze_bank_transactions(); adds
+            metric tables and charts when given
+        charts (bool): Embed chart images (requires kaleido)
+
+    Returns:
+        BytesIO: The .docx file
+    """
+    key = report_key(question, response, analysis)
+    cached = cached_report(key)
+    if cached is not None:
+        return BytesIO(cached)
+
+    doc = Document(BytesIO(_template_bytes()))
     doc.add_heading('AI Financial Analysis Report', 0)
-    doc.add_heading('Question:', level=1)
-    doc.add_paragraph(question)
-    doc.add_heading('Response:', level=1)
-    doc.add_paragraph(response)
+    doc.add_paragraph().add_run(f"Generated {datetime.now().strftime('%d-%b-%Y %H:%M')}").italic = True
+    doc.add_heading('Question', level=1)
+    doc.add_paragraph(question or "General analysis")
+    doc.add_heading('Response', level=1)
+    _add_markdown(doc, response)
+
+    if analysis:
+        _add_analysis(doc, analysis)
+        images = _chart_images(analysis) if charts else []
+        if images:
+            doc.add_heading('Charts', level=1)
+            for title, png in images:
+                doc.add_picture(BytesIO(png), width=Inches(6))
+                doc.add_paragraph(title).alignment = 1
 
     buffer = BytesIO()
     doc.save(buffer)
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+    data = buffer.getvalue()
+    with _CACHE_LOCK:
+        _REPORT_CACHE[key] = data
+        while len(_REPORT_CACHE) > CACHE_SIZE:
+            _REPORT_CACHE.popitem(last=False)
+    return BytesIO(data)
@@ -0,0 +1,221 @@
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+DEFAULT_DB = os.getenv("BANK_JOBS_DB", os.path.join("jobs", "jobs.db"))
+# Seconds a finished job (and its result) is kept
+DEFAULT_TTL = float(os.getenv("BANK_JOBS_TTL", 3600))
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED = ("done", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT,
+    status TEXT NOT NULL,
+    params TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+)
+"""
+
+
+class JobQueue:
+    """Runs LLM and report jobs in the background with a persistent job table
+
+    Jobs execute on a thread pool (LLM calls and DOCX builds spend their
+    time waiting on the network or disk, not the GIL) and every state
+    change is written to a SQLite table, so status survives Streamlit
+    reruns and is shared between sessions. Jobs left queued or running by
+    a previous process are marked failed on startup.
+
+    Results hold statement data (answers, prompts with the transaction
+    listing, DOCX reports), so they are kept in this process's memory
+    only, never in the table. Finished jobs and their results are deleted
+    once older than `ttl`.
+
+    Args:
+        db_path (str): SQLite file holding the job table
+        workers (int): Jobs run concurrently
+        ttl (float): Seconds finished jobs are kept
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, workers=4, ttl=DEFAULT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._results = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bank-job")
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by restart', finished = ? "
+                "WHERE status IN ('queued', 'running')", (time.time(),)
+            )
+            legacy = "result" in [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if legacy:
+                # Tables from older versions stored results; wipe them
+                conn.execute("UPDATE jobs SET result = NULL")
+        if legacy:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+        self.purge()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id, when=(), **fields):
+        """Updates a job row, only from the given statuses when `when` is set
+
+        Returns:
+            bool: Whether the row changed
+        """
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        query = f"UPDATE jobs SET {columns} WHERE id = ?"
+        if when:
+            query += f" AND status IN ({', '.join('?' * len(when))})"
+        with self._lock, self._connect() as conn:
+            return conn.execute(query, (*fields.values(), job_id, *when)).rowcount > 0
+
+    def submit(self, kind, fn, *args, owner=None, params=None, **kwargs):
+        """Queues fn(*args, **kwargs) and returns its job id
+
+        Args:
+            kind (str): Job type shown in the UI ("analysis", "report", ...)
+            fn (callable): Work to run; returns bytes or a JSON-serializable value
+            owner (str): Session that submitted the job, for filtering
+            params (dict): JSON-serializable description of the job
+        """
+        self.purge()
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, owner, status, params, created) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, owner, json.dumps(params or {}, default=str), time.time())
+            )
+        future = self._executor.submit(self._run, job_id, fn, args, kwargs)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._futures.pop(job_id, None))
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        if not self._update(job_id, when=("queued",), status="running", started=time.time()):
+            return
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, io.BytesIO):
+                result = result.getvalue()
+            # A job cancelled while running still finishes, but its result is dropped
+            self._results[job_id] = result
+            if not self._update(job_id, when=("running",), status="done", finished=time.time()):
+                self._results.pop(job_id, None)
+        except Exception as e:
+            self._update(job_id, when=("running",), status="failed", error=str(e), finished=time.time())
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job
+
+        Queued jobs never start. A running LLM call can't be interrupted,
+        so it's marked cancelled and its result is discarded when it returns.
+
+        Returns:
+            bool: Whether the job was still pending
+        """
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return self._update(job_id, when=("queued", "running"), status="cancelled", finished=time.time())
+
+    def status(self, job_id):
+        """Returns the job row (without its result) as a dict, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, kind, owner, status, params, error, created, started, finished FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"] or "{}")
+        end = job["finished"] or time.time()
+        job["elapsed"] = round(end - (job["started"] or job["created"]), 2)
+        return job
+
+    def result(self, job_id):
+        """Returns the result of a finished job, or None (unknown, failed or purged)"""
+        return self._results.get(job_id)
+
+    def purge(self, older_than=None):
+        """Deletes finished jobs, and their results, finished over `older_than` seconds ago
+
+        Args:
+            older_than (float): Age limit in seconds (default: the queue's ttl)
+
+        Returns:
+            int: Jobs deleted
+        """
+        cutoff = time.time() - (self.ttl if older_than is None else older_than)
+        statuses = ", ".join("?" * len(FINISHED))
+        with self._lock, self._connect() as conn:
+            expired = [row[0] for row in conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({statuses}) AND finished < ?", (*FINISHED, cutoff))]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+        for job_id in expired:
+            self._results.pop(job_id, None)
+        return len(expired)
+
+    def list_jobs(self, owner=None, limit=20):
+        """Returns the most recent jobs, newest first"""
+        query = "SELECT id FROM jobs"
+        args = ()
+        if owner is not None:
+            query += " WHERE owner = ?"
+            args = (owner,)
+        with self._connect() as conn:
+            ids = [row[0] for row in conn.execute(query + " ORDER BY created DESC LIMIT ?", (*args, limit))]
+        return [self.status(job_id) for job_id in ids]
+
+    def wait(self, job_id, timeout=None):
+        """Blocks until a job leaves the queued/running states; returns its row"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+        return self.status(job_id)
+
+
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_job_queue(db_path=DEFAULT_DB, workers=4, ttl=DEFAULT_TTL):
+    """Returns the process-wide job queue, shared by every dashboard session"""
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = JobQueue(db_path, workers, ttl)
+        return _QUEUE
@@ -0,0 +1,159 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    """Behaviour and counters shared by the stub's request handlers
+
+    Args:
+        latency (float): Seconds each completion takes
+        fail_first (int): Requests answered with 429 before any succeed
+        fail_rate (float): Probability of a 429 after that
+        retry_after (float): Retry-After header value sent with 429s
+        rpm (int): Server-side requests-per-minute limit (0 = unlimited)
+        seed (int): Seed for fail_rate draws
+    """
+
+    def __init__(self, latency=0.2, fail_first=0, fail_rate=0.0, retry_after=1.0, rpm=0, seed=0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_rate = fail_rate
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.completed = 0
+        self.recent = []
+
+    def admit(self):
+        """Counts a request; returns False when it should be throttled"""
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            self.recent = [t for t in self.recent if now - t < 60]
+            throttled = (self.requests <= self.fail_first
+                         or self.random.random() < self.fail_rate
+                         or (self.rpm and len(self.recent) >= self.rpm))
+            if throttled:
+                self.throttled += 1
+            else:
+                self.recent.append(now)
+            return not throttled
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        """OpenAI-compatible /chat/completions endpoint returning canned text"""
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send(200, {"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not state.admit():
+                self._send(429, {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_exceeded"}},
+                           {"Retry-After": str(state.retry_after)})
+                return
+
+            time.sleep(state.latency)
+            messages = request.get("messages", [])
+            prompt = " ".join(str(m.get("content", "")) for m in messages)
+            prompt_tokens = len(prompt) // 4
+            text = (f"Stub analysis of a {prompt_tokens}-token prompt. "
+                    f"Total spending and income figures are as listed in the summary.")
+            with state.lock:
+                state.completed += 1
+            self._send(200, {
+                "id": f"chatcmpl-stub-{state.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub-model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(text) // 4,
+                          "total_tokens": prompt_tokens + len(text) // 4}
+            })
+
+    return StubHandler
+
+
+class StubServer:
+    """Local OpenAI-compatible LLM server for exercising the rate limiter
+
+    Usable as a context manager; serves on a background thread.
+
+        with StubServer(fail_first=2) as stub:
+            ...  # point the client at stub.url
+            print(stub.state.requests, stub.state.throttled)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, **behaviour):
+        self.state = StubState(**behaviour)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main_stub(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per completion")
+    parser.add_argument("--fail-first", type=int, default=0, help="Answer the first N requests with 429")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Probability of a 429 afterwards")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429")
+    parser.add_argument("--rpm", type=int, default=0, help="Server-side requests per minute (0 = unlimited)")
+    args = parser.parse_args(argv)
+
+    server = StubServer(args.host, args.port, latency=args.latency, fail_first=args.fail_first,
+                        fail_rate=args.fail_rate, retry_after=args.retry_after, rpm=args.rpm)
+    print(f"🧪 Stub LLM listening on {server.url} (OpenAI-compatible /v1/chat/completions)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main_stub()
@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from app.AGGREGATE import AnalysisPartial, merge_partials
+
+NUMERIC_COLUMNS = ("dr", "cr", "bal")
+CODE_COLUMNS = ("desc_key", "counterparty")
+MIN_SHARD_ROWS = 50_000
+
+# Worker-side state: attached blocks and the column views built on them
+_WORKER = {}
+
+
+def shard_bounds(df, shards, by="month"):
+    """Splits a frame into contiguous row ranges
+
+    With by="month" each cut is moved to the nearest month change in row
+    order, so a month-sorted statement puts each month in one shard and
+    the day buckets don't overlap. Shards stay contiguous either way:
+    balances and recurring order need statement order.
+
+    Returns:
+        list: (start, stop) row ranges, in order
+    """
+    n = len(df)
+    cuts = np.linspace(0, n, shards + 1).round().astype(np.int64)[1:-1]
+    if by == "month" and len(cuts):
+        months = df['date'].to_numpy().astype("datetime64[M]")
+        changes = np.flatnonzero(months[1:] != months[:-1]) + 1
+        if len(changes):
+            nearest = np.searchsorted(changes, cuts).clip(0, len(changes) - 1)
+            previous = (nearest - 1).clip(0)
+            closer = np.abs(changes[previous] - cuts) < np.abs(changes[nearest] - cuts)
+            cuts = changes[np.where(closer, previous, nearest)]
+    elif by != "month" and by != "rows":
+        raise ValueError(f"Unknown shard mode: {by}")
+    edges = np.unique(np.concatenate([[0], cuts, [n]]))
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+
+def _share(array, blocks):
+    """Copies an array into a new shared memory block; returns its spec"""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block.name, array.dtype.str, len(array)
+
+
+def _init_worker(spec):
+    """Pool initializer: maps the shared columns once per worker process"""
+    _WORKER.clear()
+    _WORKER["blocks"] = []
+    columns = {}
+    for column, (name, dtype, length) in spec["arrays"].items():
+        # Pool workers share the parent's resource tracker; the parent unlinks
+        block = shared_memory.SharedMemory(name=name)
+        _WORKER["blocks"].append(block)
+        columns[column] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)
+    _WORKER["columns"] = columns
+    _WORKER["categories"] = spec["categories"]
+
+
+def _shard_frame(columns, categories, start, stop):
+    """Zero-copy frame over rows [start, stop) of the shared columns"""
+    data = {}
+    for column, values in columns.items():
+        part = values[start:stop]
+        if column in categories:
+            part = pd.Categorical.from_codes(part, categories=categories[column])
+        data[column] = part
+    return pd.DataFrame(data, copy=False)
+
+
+def _analyze_shard(start, stop, amount_tolerance):
+    """Builds the partial of one shard (runs in a worker process)"""
+    df = _shard_frame(_WORKER["columns"], _WORKER["categories"], start, stop)
+    return AnalysisPartial.from_frame(df, amount_tolerance)
+
+
+def analyze_parallel(df, workers=None, by="month", amount_tolerance=0.15, min_regularity=0.75,
+                     min_shard_rows=MIN_SHARD_ROWS):
+    """Analyzes a large frame across a process pool
+
+    The numeric columns (dates, amounts, balances and the interned
+    description/counterparty codes) are copied once into shared memory;
+    workers map them instead of receiving pickled slices. Each worker
+    builds the AnalysisPartial of its shard and the partials are merged
+    in shard order, so the result is identical to the serial path.
+    Descriptions never leave the parent: the few each recurring series
+    reports are looked up by row position after the merge.
+
+    Args:
+        df (pd.DataFrame): Processed transaction data
+        workers (int): Processes (default: CPU count)
+        by (str): "month" (cuts snapped to month changes) or "rows"
+        min_shard_rows (int): Frames smaller than workers x this run serially
+
+    Returns:
+        dict: Same results as analyze_bank_transactions()
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(df) // max(min_shard_rows, 1)))
+    if workers == 1:
+        return AnalysisPartial.from_frame(df, amount_tolerance).finalize(min_regularity)
+
+    if 'desc' in df.columns and ('desc_key' not in df.columns or 'counterparty' not in df.columns):
+        # Imported here: app.DPROCESS builds on this module
+        from app.DPROCESS import normalize_descriptions
+        df = df.copy()
+        df['desc_key'], df['counterparty'] = normalize_descriptions(df['desc'])
+
+    blocks = []
+    try:
+        arrays, categories = {}, {}
+        arrays["date"] = _share(df['date'].to_numpy(), blocks)
+        for column in NUMERIC_COLUMNS:
+            if column in df.columns:
+                arrays[column] = _share(df[column].to_numpy(dtype=np.float64), blocks)
+        for column in CODE_COLUMNS:
+            if column in df.columns:
+                arrays[column] = _share(df[column].cat.codes.to_numpy(), blocks)
+                categories[column] = df[column].cat.categories
+        spec = {"arrays": arrays, "categories": categories}
+
+        bounds = shard_bounds(df, workers, by)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec,)) as pool:
+            futures = [pool.submit(_analyze_shard, start, stop, amount_tolerance) for start, stop in bounds]
+            parts = [future.result() for future in futures]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    merged = merge_partials(parts)
+    if merged.has_desc and 'desc' in df.columns and not merged.firsts.empty:
+        merged.firsts['desc'] = df['desc'].to_numpy()[merged.firsts['seq'].to_numpy(dtype=np.int64)]
+    return merged.finalize(min_regularity)
@@ -0,0 +1,254 @@
+import os
+import re
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from app.DPROCESS import normalize_descriptions, validate_statement
+from app.TRACE import traced
+
+try:
+    import pdfplumber
+except ImportError:  # optional: only needed for PDF statements
+    pdfplumber = None
+
+# Header cell texts per output column, most specific first
+COLUMN_SYNONYMS = {
+    "date": ("txn date", "transaction date", "tran date", "trans date", "posting date", "date", "value date"),
+    "desc": ("description", "narration", "particulars", "transaction details", "details", "remarks"),
+    "dr": ("debit", "withdrawal", "withdrawals", "withdrawal amt", "debit amount", "dr"),
+    "cr": ("credit", "deposit", "deposits", "deposit amt", "credit amount", "cr"),
+    "bal": ("balance", "closing balance", "running balance")
+}
+TEXT_TABLE_SETTINGS = {"vertical_strategy": "text", "horizontal_strategy": "text"}
+CODE_BREAK = re.compile(r"[/\-@]$")
+
+
+def _normalize_cell(cell):
+    return re.sub(r"\s+", " ", str(cell or "")).strip().lower().rstrip(".:").replace("(inr)", "").strip()
+
+
+def match_header(row):
+    """Maps output columns to cell positions if a table row is a header
+
+    Args:
+        row (list): Cell texts of one extracted table row
+
+    Returns:
+        dict | None: {"date": i, "desc": j, ...}, or None when the row is
+            not a transaction table header
+    """
+    cells = [_normalize_cell(c) for c in row]
+    mapping = {}
+    for column, synonyms in COLUMN_SYNONYMS.items():
+        for synonym in synonyms:
+            hits = [i for i, cell in enumerate(cells)
+                    if (cell == synonym or cell.startswith(synonym + " ")) and i not in mapping.values()]
+            if hits:
+                mapping[column] = hits[0]
+                break
+    if {"date", "desc", "dr", "cr"}.issubset(mapping):
+        return mapping
+    return None
+
+
+def _extract_pages(path, page_numbers):
+    """Extracts table rows from a few pages (runs in a worker process)
+
+    Returns:
+        list: Rows (lists of cell strings) in page order
+    """
+    rows = []
+    with pdfplumber.open(path, pages=list(page_numbers)) as pdf:
+        for page in pdf.pages:
+            tables = page.extract_tables() or page.extract_tables(TEXT_TABLE_SETTINGS)
+            for table in tables:
+                rows.extend([["" if cell is None else str(cell) for cell in row] for row in table])
+            # Drop parsed layout objects so long statements don't accumulate them
+            page.close()
+    return rows
+
+
+def pdf_page_count(path):
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pdf_rows(path, workers=None, chunk_pages=4):
+    """Yields (pages done, total pages, rows) chunk by chunk, in page order
+
+    Chunks of `chunk_pages` pages are extracted in a process pool, with at
+    most two chunks per worker in flight, so memory stays bounded no
+    matter how long the statement is.
+    """
+    total = pdf_page_count(path)
+    chunks = [range(start + 1, min(start + chunk_pages, total) + 1) for start in range(0, total, chunk_pages)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks)) if chunks else 1
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk[-1], total, _extract_pages(path, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        remaining = iter(chunks)
+        for chunk in remaining:
+            pending.append((chunk, executor.submit(_extract_pages, path, chunk)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            chunk, future = pending.popleft()
+            rows = future.result()
+            next_chunk = next(remaining, None)
+            if next_chunk is not None:
+                pending.append((next_chunk, executor.submit(_extract_pages, path, next_chunk)))
+            yield chunk[-1], total, rows
+
+
+def _rows_to_records(rows, mapping):
+    """Picks the mapped columns out of raw rows; returns (records, mapping)
+
+    Header rows (repeated on every page by most banks) switch the mapping;
+    rows before the first header are preamble and are skipped.
+    """
+    records = []
+    for row in rows:
+        header = match_header(row)
+        if header is not None:
+            mapping = header
+            continue
+        if mapping is None or len(row) <= max(mapping.values()):
+            continue
+        records.append([row[mapping[c]] if c in mapping else "" for c in COLUMN_SYNONYMS])
+    return records, mapping
+
+
+def _join_wrapped(parts):
+    """Rejoins a description wrapped over several lines
+
+    Reference strings (UPI/NEFT/IMPS codes) wrap mid-token, so lines are
+    glued without a space when the break sits next to a / - @ delimiter or
+    both sides are slash-delimited codes; plain text gets a space.
+    """
+    text = ""
+    for part in (p.strip() for p in parts):
+        if not part:
+            continue
+        if text and not (CODE_BREAK.search(text) or CODE_BREAK.search(part[0])
+                         or ("/" in text and "/" in part)):
+            text += " "
+        text += part
+    return text
+
+
+def _clean_money(values):
+    """Vectorized amount parsing: strips currency, commas and Cr/Dr markers"""
+    cleaned = values.str.replace(r"[^\d.\-]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0.0)
+
+
+@traced("parse")
+def preprocess_pdf(source, workers=None, chunk_pages=4, on_progress=None):
+    """Extracts transactions from a PDF statement into the CSV schema
+
+    Pages are read in parallel chunks and only the five mapped columns of
+    each table row are kept, so no worker holds more than its chunk's
+    parsed pages. Bytes or streams are spilled to a temporary file first,
+    so those are in memory once, as raw PDF. Descriptions wrapped onto
+    continuation rows (no date and no amounts) are joined back onto their
+    transaction.
+
+    Args:
+        source: Path, raw bytes or file-like object of the PDF
+        workers (int): Extraction processes (default: CPU count)
+        chunk_pages (int): Pages per task
+        on_progress (callable): Called as on_progress(pages_done, total_pages, seconds)
+
+    Returns:
+        pd.DataFrame: date/desc/dr/cr/bal (+ desc_key/counterparty), like
+            preprocess_compact_csv(). df.attrs["ingest"] holds pages,
+            seconds and pages_per_sec; df.attrs["integrity"] the balance check.
+    """
+    if pdfplumber is None:
+        raise ValueError("PDF statements need pdfplumber. Install it with: pip install pdfplumber")
+
+    temp_path = None
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+        else:
+            data = source.read() if hasattr(source, "read") else bytes(source)
+            # Workers open the file by path instead of each receiving a copy of the bytes
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+                tmp.write(data)
+                temp_path = path = tmp.name
+
+        started = time.perf_counter()
+        records, mapping, total = [], None, 0
+        for done, total, rows in iter_pdf_rows(path, workers=workers, chunk_pages=chunk_pages):
+            chunk_records, mapping = _rows_to_records(rows, mapping)
+            records.extend(chunk_records)
+            if on_progress is not None:
+                on_progress(done, total, time.perf_counter() - started)
+
+        if mapping is None:
+            raise ValueError("Transaction table header not found in the PDF file.")
+
+        raw = pd.DataFrame(records, columns=list(COLUMN_SYNONYMS)).apply(lambda s: s.str.strip())
+        # Wrapped descriptions: no date and no amounts, only text
+        continuation = ((raw['date'] == "") & (raw['dr'] == "") & (raw['cr'] == "")
+                        & (raw['bal'] == "") & (raw['desc'] != ""))
+        if continuation.any():
+            group = (~continuation).cumsum()
+            affected = group.isin(group[continuation].unique())
+            joined = raw.loc[affected, 'desc'].groupby(group[affected]).agg(_join_wrapped)
+            heads = affected & ~continuation
+            raw.loc[heads, 'desc'] = joined.loc[group[heads]].to_numpy()
+        raw = raw[~continuation]
+
+        df = pd.DataFrame({
+            "date": pd.to_datetime(raw['date'].str.replace("\n", " "), dayfirst=True, errors='coerce'),
+            "desc": raw['desc'].where(~raw['desc'].str.contains("\n", regex=False),
+                                      raw['desc'].str.split("\n").map(_join_wrapped)),
+            "dr": _clean_money(raw['dr']),
+            "cr": _clean_money(raw['cr']),
+            "bal": _clean_money(raw['bal'])
+        })
+        if (raw['bal'] == "").all():
+            df = df.drop(columns='bal')
+        df = df.dropna(subset=['date']).reset_index(drop=True)
+        df['desc_key'], df['counterparty'] = normalize_descriptions(df['desc'])
+
+        df = validate_statement(df)
+
+        seconds = time.perf_counter() - started
+        df.attrs["ingest"] = {
+            "pages": total,
+            "seconds": round(seconds, 3),
+            "pages_per_sec": round(total / seconds, 2) if seconds > 0 else None
+        }
+        return df
+
+    except Exception as e:
+        raise ValueError(f"Error processing PDF file: {str(e)}")
+    finally:
+        if temp_path is not None:
+            os.unlink(temp_path)
+
+
+def is_pdf(source):
+    """Sniffs the %PDF magic bytes (or the extension, for paths)"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source).lower().endswith(".pdf")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:5]) == b"%PDF-"
+    if hasattr(source, "read") and getattr(source, "seekable", lambda: False)():
+        pos = source.tell()
+        head = source.read(5)
+        source.seek(pos)
+        return head == b"%PDF-"
+    return False
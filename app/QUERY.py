@@ -0,0 +1,250 @@
+import re
+
+import pandas as pd
+
+from app.DPROCESS import normalize_descriptions
+from app.RETRIEVAL import TransactionIndex, parse_question_filters
+
+TOP_PATTERN = re.compile(
+    r"\b(?:top|largest|biggest|highest)\s*(\d+)?\s*(?:spending\s+|expense\s+)?"
+    r"(categor\w*|merchants?|payees?|counterpart\w*|vendors?|transactions?|expenses?|debits?|payments?|"
+    r"credits?|deposits?|income\s+sources?|sources?)"
+)
+MONTHLY_PATTERN = re.compile(r"\b(?:by|per|each|every)\s+month\b|\bmonthly\b|\bmonth[- ]?wise\b|\bmonth by month\b")
+RANGE_PATTERN = re.compile(r"\b(?:between|from)\s+(.+?)\s+(?:and|to|till|until)\s+(.+?)\s*[?.!]*$")
+TOTAL_PATTERN = re.compile(r"\b(?:how much|how many|total|sum|count)\b")
+MONTH_YEAR_ONLY = re.compile(r"[a-z]+\.?\s*,?\s*\d{4}")
+# Questions asking for judgement or prediction always go to the LLM
+REASONING_PATTERN = re.compile(
+    r"\b(?:why|should|could|can i|save|saving|predict|forecast|future|suggest|recommend|advice|advise|"
+    r"plan|budget|improve|reduce|afford|goal|analy[sz]e|identify|unusual|suspicious|explain)\w*"
+)
+
+
+def _money(value):
+    return f"₹{value:,.2f}"
+
+
+def _period_label(filters):
+    """Suffix like ' in March, 2024' for the month/year filters of a question; empty without them"""
+    if not (filters["months"] or filters["years"]):
+        return ""
+    return " in " + ", ".join([pd.Timestamp(2000, m, 1).strftime('%B') for m in filters["months"]]
+                              + [str(y) for y in filters["years"]])
+
+
+def _parse_date(text, end=False):
+    """Parses a date mentioned in a question; month-only ends roll to month end"""
+    text = text.strip(" ,.?")
+    ts = pd.to_datetime(text, dayfirst=True, errors="coerce")
+    if pd.isna(ts):
+        return None
+    if end:
+        if MONTH_YEAR_ONLY.fullmatch(text):
+            ts = ts + pd.offsets.MonthEnd(0)
+        ts = ts + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    return ts
+
+
+class QueryEngine:
+    """Answers aggregation questions locally, without an LLM round trip
+
+    Questions are matched against a fixed set of templates (top-N,
+    monthly breakdown, date range totals and totals for a merchant,
+    month or direction). Aggregates are computed once per statement and
+    cached, so repeated questions cost a lookup. Anything that doesn't
+    fit a template returns None and goes to run_analysis() as before.
+
+    Args:
+        df (pd.DataFrame): Processed transaction data
+        analysis (dict): Results from analyze_bank_transactions()
+        index (TransactionIndex): Retrieval index to reuse; built when None
+    """
+
+    def __init__(self, df, analysis, index=None):
+        self.df = df
+        self.analysis = analysis
+        self.index = index or TransactionIndex(df)
+        self._cache = {}
+        self.templates = [
+            ("top_n", self._top_n),
+            ("monthly", self._monthly),
+            ("date_range", self._date_range),
+            ("total", self._total)
+        ]
+
+    def _cached(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    def counterparty_totals(self):
+        """Debit/credit sums and counts per counterparty"""
+        return self._cached("counterparty", lambda: self._counterparty_totals(self.df))
+
+    @staticmethod
+    def _counterparty_totals(df):
+        if 'counterparty' in df.columns:
+            names = df['counterparty']
+        else:
+            names = pd.Series(normalize_descriptions(df['desc'])[1], index=df.index)
+        return (df[['dr', 'cr']].groupby(names.astype(str).to_numpy())
+                .agg(debit=('dr', 'sum'), credit=('cr', 'sum'), count=('dr', 'size')))
+
+    def monthly_totals(self):
+        """Debit/credit/net per calendar month"""
+        def build():
+            monthly = pd.DataFrame(self.analysis["raw_data"]["monthly"])
+            monthly['month'] = pd.to_datetime(monthly['date']).dt.strftime('%b %Y')
+            monthly['net'] = monthly['cr'] - monthly['dr']
+            return monthly[['month', 'dr', 'cr', 'net']].rename(columns={'dr': 'debit', 'cr': 'credit'})
+        return self._cached("monthly", build)
+
+    def answer(self, question):
+        """Answers a question from cached aggregates when a template matches
+
+        Args:
+            question (str): Natural-language question
+
+        Returns:
+            dict | None: {"template", "answer" (markdown text), "table"
+                (pd.DataFrame or None)}, or None when no template matches
+        """
+        if not question or self.df.empty:
+            return None
+        text = question.lower().strip()
+        if REASONING_PATTERN.search(text):
+            return None
+        # "last month", "this year": the templates only apply calendar dates
+        if parse_question_filters(text)["relative"]:
+            return None
+        for name, handler in self.templates:
+            result = handler(text)
+            if result is not None:
+                answer, table = result
+                return {"template": name, "answer": answer, "table": table}
+        return None
+
+    def _top_n(self, text):
+        match = TOP_PATTERN.search(text)
+        if not match:
+            return None
+        subject = match.group(2)
+        # "biggest expense" asks for one row, "biggest expenses" for a few
+        n = int(match.group(1) or (5 if subject.endswith("s") else 1))
+        wants_credit = bool(re.search(r"credit|deposit|income|source", subject + " " + text))
+        filters = parse_question_filters(text)
+        # Month/year and amount bounds; the direction comes from the subject
+        mask = self.index.filter_mask({**filters, "direction": None})
+        period = _period_label(filters)
+
+        if subject.startswith("categor"):
+            if not mask.all():
+                # Category totals are only kept for the whole statement
+                return None
+            column = "credit" if wants_credit else "debit"
+            table = (pd.DataFrame.from_dict(self.analysis.get("category_analysis", {}), orient="index")
+                     .rename_axis("category").reset_index())
+            if table.empty:
+                return None
+            table = table[table[column] > 0].nlargest(n, column)
+            title = f"Top {len(table)} {'income' if wants_credit else 'spending'} categories"
+            lines = [f"**{title}:**"]
+            lines += [f"{i}. {row.category.replace('_', ' ').title()}: {_money(row[column])} ({row['count']} txns)"
+                      for i, (_, row) in enumerate(table.iterrows(), 1)]
+            return "\n".join(lines), table
+
+        if re.match(r"merchant|payee|counterpart|vendor|source|income", subject):
+            column = "credit" if wants_credit else "debit"
+            totals = self.counterparty_totals() if mask.all() else self._counterparty_totals(self.df[mask])
+            table = totals[totals[column] > 0].nlargest(n, column).rename_axis("counterparty").reset_index()
+            title = f"Top {len(table)} {'sources of income' if wants_credit else 'merchants by spending'}{period}"
+            lines = [f"**{title}:**"]
+            lines += [f"{i}. {row.counterparty}: {_money(row[column])} ({row['count']} txns)"
+                      for i, (_, row) in enumerate(table.iterrows(), 1)]
+            return "\n".join(lines), table
+
+        column = "cr" if wants_credit else "dr"
+        columns = [c for c in ['date', 'desc', 'dr', 'cr', 'bal'] if c in self.df.columns]
+        table = self.df[mask].nlargest(n, column)[columns]
+        table = table[table[column] > 0]
+        kind = "credit" if wants_credit else "debit"
+        title = (f"Largest {kind}" if n == 1 else f"Largest {len(table)} {kind}s") + period
+        lines = [f"**{title}:**"]
+        lines += [f"{i}. {row.date.strftime('%d-%b-%Y')} | {row.desc} | {_money(getattr(row, column))}"
+                  for i, row in enumerate(table.itertuples(index=False), 1)]
+        return "\n".join(lines), table
+
+    def _monthly(self, text):
+        if not MONTHLY_PATTERN.search(text):
+            return None
+        table = self.monthly_totals()
+        lines = ["**Monthly breakdown:**"]
+        lines += [f"• {row.month}: spent {_money(row.debit)}, received {_money(row.credit)}, net {_money(row.net)}"
+                  for row in table.itertuples(index=False)]
+        busiest = table.loc[table['debit'].idxmax()]
+        lines.append(f"\nHighest spending month: {busiest['month']} ({_money(busiest['debit'])})")
+        return "\n".join(lines), table
+
+    def _date_range(self, text):
+        match = RANGE_PATTERN.search(text)
+        if not match:
+            return None
+        start = _parse_date(match.group(1))
+        end = _parse_date(match.group(2), end=True)
+        if start is None or end is None or end < start:
+            return None
+        dates = self.df['date']
+        mask = ((dates >= start) & (dates <= end)).to_numpy()
+        selected = self.df[mask]
+        debit, credit = float(selected['dr'].sum()), float(selected['cr'].sum())
+        lines = [
+            f"**{start.strftime('%d-%b-%Y')} to {end.strftime('%d-%b-%Y')}:**",
+            f"• Transactions: {len(selected)}",
+            f"• Total spent: {_money(debit)} ({int((selected['dr'] > 0).sum())} debits)",
+            f"• Total received: {_money(credit)} ({int((selected['cr'] > 0).sum())} credits)",
+            f"• Net: {_money(credit - debit)}"
+        ]
+        table = pd.DataFrame([{"start": start.date(), "end": end.date(), "transactions": len(selected),
+                               "debit": round(debit, 2), "credit": round(credit, 2)}])
+        return "\n".join(lines), table
+
+    def _total(self, text):
+        if not TOTAL_PATTERN.search(text):
+            return None
+        filters = parse_question_filters(text)
+        # Words the index doesn't know ("save", "afford") mean the question
+        # needs reasoning, not a sum
+        unmatched = [t for t in filters["terms"] if not self.index.expand_term(t)]
+        if unmatched:
+            return None
+        rows, info = self.index.search(text, max_rows=0)
+        if rows is None:
+            if filters["direction"] is None:
+                return None
+            amounts = self.analysis["amounts"]
+            debit, credit = amounts["total_debit"], amounts["total_credit"]
+            count = self.analysis[f"{filters['direction']}_transactions"]
+            scope = "the whole statement"
+        else:
+            debit, credit, count = info["total_debit"], info["total_credit"], info["matched"]
+            parts = []
+            if info["matched_terms"]:
+                parts.append("matching " + ", ".join(info["matched_terms"]))
+            if filters["months"] or filters["years"]:
+                parts.append(_period_label(filters).strip())
+            if filters["min_amount"] is not None:
+                parts.append(f"of at least {_money(filters['min_amount'])}")
+            if filters["max_amount"] is not None:
+                parts.append(f"of at most {_money(filters['max_amount'])}")
+            scope = "transactions " + " ".join(parts) if parts else "the whole statement"
+
+        lines = [f"**Totals for {scope}:**"]
+        if filters["direction"] != "credit":
+            lines.append(f"• Total spent: {_money(debit)}")
+        if filters["direction"] != "debit":
+            lines.append(f"• Total received: {_money(credit)}")
+        lines.append(f"• Transactions: {count}")
+        table = pd.DataFrame([{"scope": scope, "transactions": count,
+                               "debit": round(float(debit), 2), "credit": round(float(credit), 2)}])
+        return "\n".join(lines), table
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` per second
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Bucket size, i.e. the largest allowed burst
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Takes `amount` tokens now, going into debt if needed
+
+        Returns:
+            float: Seconds the caller must wait before the tokens are really
+                available (0 when the bucket had enough)
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def penalize(self, seconds):
+        """Drains the bucket so the next callers wait `seconds` (server said back off)"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class RateLimiter:
+    """Client-side request and token budgets with retries and coalescing
+
+    Every call reserves one request and its estimated tokens from two
+    shared buckets and sleeps off any debt, so concurrent sessions queue
+    up instead of bursting into the provider's limits. Retryable failures
+    (429, 5xx, connection errors) are retried with exponential backoff
+    and full jitter, honoring Retry-After when the error carries one; a
+    429 also drains the buckets so other callers back off too. Identical
+    calls already in flight share one upstream request.
+
+    Args:
+        requests_per_minute (float): Request budget
+        tokens_per_minute (float): Prompt + completion token budget
+        max_retries (int): Retries after the first attempt
+        base_delay (float): First backoff delay in seconds
+        max_delay (float): Backoff ceiling in seconds
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=30000,
+                 max_retries=5, base_delay=1.0, max_delay=30.0):
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "upstream": 0, "coalesced": 0, "retries": 0, "throttled_s": 0.0, "failures": 0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def acquire(self, tokens):
+        """Blocks until one request and `tokens` tokens fit the budgets"""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            self._count("throttled_s", wait)
+            time.sleep(wait)
+
+    def call(self, fn, tokens=1, key=None):
+        """Runs fn() under the budgets, retrying and coalescing as configured
+
+        Args:
+            fn (callable): Upstream call, e.g. the LLM request
+            tokens (int): Estimated tokens the call consumes
+            key (str): Identity of the request; concurrent calls with the
+                same key wait for the first one instead of calling again
+
+        Returns:
+            The result of fn()
+        """
+        self._count("calls")
+        if key is None:
+            return self._call_with_retries(fn, tokens)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._call_with_retries(fn, tokens)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _call_with_retries(self, fn, tokens):
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            self._count("upstream")
+            try:
+                return fn()
+            except Exception as e:
+                status = error_status(e)
+                if not is_retryable(e) or attempt == self.max_retries:
+                    self._count("failures")
+                    raise ValueError(f"LLM request failed after {attempt + 1} attempt(s): {str(e)}") from e
+                delay = retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if status == 429:
+                    # Other callers back off too, whichever budget they'd hit
+                    self.requests.penalize(delay)
+                    self.tokens.penalize(delay)
+                self._count("retries")
+                time.sleep(delay)
+
+
+def error_status(error):
+    """HTTP status carried by an SDK or urllib error, if any"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error):
+    """Whether an upstream error is worth retrying (throttling, 5xx, network)"""
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(error).__name__.lower()
+    return (isinstance(error, (ConnectionError, TimeoutError))
+            or any(word in name for word in ("connection", "timeout", "ratelimit")))
+
+
+def retry_after(error):
+    """Seconds from a Retry-After header on the error's response, if present"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def prompt_key(model, prompt):
+    """Coalescing key for a model/prompt pair"""
+    return hashlib.sha1(f"{model}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text, completion_tokens=1024):
+    """Cheap token estimate (~4 characters per token) plus the completion reserve"""
+    return len(text) // 4 + completion_tokens
+
+
+_LIMITER = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def get_rate_limiter():
+    """Returns the process-wide limiter shared by every session
+
+    Budgets come from GROQ_RPM and GROQ_TPM (requests and tokens per minute).
+    """
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            _LIMITER = RateLimiter(
+                requests_per_minute=float(os.getenv("GROQ_RPM", 30)),
+                tokens_per_minute=float(os.getenv("GROQ_TPM", 30000))
+            )
+        return _LIMITER
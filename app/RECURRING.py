@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+
+# name: (period in days, allowed deviation in days, minimum occurrences)
+PERIODS = {
+    "weekly": (7, 2, 4),
+    "monthly": (30.44, 4, 3),
+    "quarterly": (91.31, 7, 3),
+    "yearly": (365.25, 15, 3)
+}
+
+
+def description_keys(df):
+    """Reduces descriptions to integer grouping keys
+
+    Uses the counterparty codes interned at ingestion when present.
+    Otherwise lowercases and strips digits and punctuation so UPI refs,
+    cheque numbers and dates don't make each occurrence unique; only the
+    unique strings are normalized, then mapped back through their codes.
+
+    Args:
+        df (pd.DataFrame): Transaction data with desc (and maybe counterparty)
+
+    Returns:
+        np.ndarray: Integer key per row
+    """
+    if 'counterparty' in df.columns:
+        return df['counterparty'].cat.codes.to_numpy()
+    codes, uniques = pd.factorize(df['desc'].astype(str), sort=False)
+    normalized = (pd.Series(uniques).str.lower()
+                  .str.replace(r'[^a-z]+', ' ', regex=True)
+                  .str.strip())
+    key_codes, _ = pd.factorize(normalized)
+    return key_codes[codes]
+
+
+def recurring_rows(df, amount_tolerance=0.15):
+    """Reduces transactions to the columns recurring detection groups on
+
+    Args:
+        df (pd.DataFrame): Processed transaction data with date/desc/dr/cr
+        amount_tolerance (float): Relative width of an amount band
+
+    Returns:
+        pd.DataFrame: key, direction, band, date, amount and desc (None
+            without a desc column) for rows with an amount, indexed by
+            their position in df
+    """
+    amount = np.where(df['dr'].to_numpy() > 0, df['dr'].to_numpy(), df['cr'].to_numpy())
+    valid = amount > 0
+    return pd.DataFrame({
+        "key": description_keys(df)[valid],
+        "direction": np.where(df['dr'].to_numpy() > 0, "debit", "credit")[valid],
+        "band": np.floor(np.log(amount[valid]) / np.log1p(amount_tolerance)).astype(np.int64),
+        "date": df['date'].to_numpy()[valid],
+        "amount": amount[valid],
+        "desc": df['desc'].to_numpy()[valid] if 'desc' in df.columns else None
+    }, index=np.flatnonzero(valid))
+
+
+def detect_recurring_transactions(df, amount_tolerance=0.15, min_regularity=0.75):
+    """Finds recurring payments and income (subscriptions, EMIs, salary)
+
+    Transactions are grouped by normalized description, direction and a
+    logarithmic amount band, then each group's day gaps are matched against
+    weekly, monthly, quarterly and yearly periods. Everything is sorts and
+    groupbys, so the cost is O(n log n) in the number of transactions.
+
+    Args:
+        df (pd.DataFrame): Processed transaction data with date/desc/dr/cr
+        amount_tolerance (float): Relative width of an amount band
+        min_regularity (float): Share of gaps that must fit the period
+
+    Returns:
+        list: One dict per recurring series, largest annual amount first
+    """
+    try:
+        if df.empty or 'desc' not in df.columns:
+            return []
+        return find_recurring(recurring_rows(df, amount_tolerance), min_regularity)
+
+    except Exception as e:
+        raise ValueError(f"Error detecting recurring transactions: {str(e)}")
+
+
+def find_recurring(frame, min_regularity=0.75):
+    """Runs the period matching on rows from recurring_rows()
+
+    Each group's description is its first non-null desc in date order.
+
+    Args:
+        frame (pd.DataFrame): key, direction, band, date, amount and desc
+        min_regularity (float): Share of gaps that must fit the period
+
+    Returns:
+        list: One dict per recurring series, largest annual amount first
+    """
+    if frame.empty:
+        return []
+
+    # Stable integer lexsort by key, direction, band, date ("credit" < "debit"),
+    # so no object column is factorized for the sort or the grouping
+    key, band = frame['key'].to_numpy(), frame['band'].to_numpy()
+    is_debit = frame['direction'].to_numpy() == "debit"
+    order = np.lexsort((frame['date'].to_numpy(), band, is_debit, key))
+    frame = frame.iloc[order].reset_index(drop=True)
+    key, band, is_debit = key[order], band[order], is_debit[order]
+    same_group = np.r_[False, (key[1:] == key[:-1]) & (is_debit[1:] == is_debit[:-1]) & (band[1:] == band[:-1])]
+    group_id = np.cumsum(~same_group) - 1
+    gaps = np.diff(frame['date'].to_numpy().astype("datetime64[D]").astype(np.int64), prepend=0)
+    frame['gap'] = np.where(same_group, gaps, np.nan)
+    frame['group'] = group_id
+
+    # Groups are contiguous and date-sorted: counts, first/last dates and
+    # direction come straight from the group boundaries
+    starts = np.flatnonzero(~same_group)
+    ends = np.r_[starts[1:], len(frame)]
+    dates = frame['date'].to_numpy()
+    grouped = frame.groupby("group", sort=False)
+    stats = pd.DataFrame({
+        "occurrences": ends - starts,
+        "median_gap": grouped['gap'].median().to_numpy(),
+        "avg_amount": grouped['amount'].mean().to_numpy(),
+        "first_date": dates[starts],
+        "last_date": dates[ends - 1],
+        "direction": np.where(is_debit[starts], "debit", "credit"),
+        "desc": grouped['desc'].first().to_numpy()
+    })
+
+    # Assign each group the closest period to its median gap
+    names = list(PERIODS)
+    period_days = np.array([PERIODS[n][0] for n in names])
+    median_gap = stats['median_gap'].to_numpy()
+    nearest = np.abs(median_gap[:, None] - period_days[None, :]).argmin(axis=1)
+    stats['period'] = np.array(names)[nearest]
+    stats['period_days'] = period_days[nearest]
+    stats['tolerance'] = np.array([PERIODS[n][1] for n in names])[nearest]
+    stats['min_occurrences'] = np.array([PERIODS[n][2] for n in names])[nearest]
+
+    # Share of gaps within tolerance of the group's period
+    row_period = stats['period_days'].to_numpy()[frame['group'].to_numpy()]
+    row_tolerance = stats['tolerance'].to_numpy()[frame['group'].to_numpy()]
+    frame['fits'] = np.abs(frame['gap'] - row_period) <= row_tolerance
+    has_gap = frame['gap'].notna()
+    stats['regularity'] = frame[has_gap].groupby("group")['fits'].mean()
+    stats['regularity'] = stats['regularity'].fillna(0.0)
+
+    recurring = stats[
+        (stats['occurrences'] >= stats['min_occurrences'])
+        & (stats['regularity'] >= min_regularity)
+        & (np.abs(stats['median_gap'] - stats['period_days']) <= stats['tolerance'])
+    ].copy()
+    if recurring.empty:
+        return []
+
+    recurring['annual_amount'] = recurring['avg_amount'] * (365.25 / recurring['period_days'])
+    recurring['next_expected'] = (pd.to_datetime(recurring['last_date'])
+                                  + pd.to_timedelta(recurring['period_days'].round(), unit="D"))
+    recurring = recurring.sort_values("annual_amount", ascending=False)
+
+    return [
+        {
+            "description": str(row.desc),
+            "direction": row.direction,
+            "period": row.period,
+            "occurrences": int(row.occurrences),
+            "avg_amount": round(float(row.avg_amount), 2),
+            "annual_amount": round(float(row.annual_amount), 2),
+            "regularity": round(float(row.regularity), 2),
+            "first_date": pd.Timestamp(row.first_date).strftime('%d-%b-%Y'),
+            "last_date": pd.Timestamp(row.last_date).strftime('%d-%b-%Y'),
+            "next_expected": pd.Timestamp(row.next_expected).strftime('%d-%b-%Y')
+        }
+        for row in recurring.itertuples()
+    ]
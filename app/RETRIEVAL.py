@@ -0,0 +1,255 @@
+import re
+
+import numpy as np
+
+from app.DPROCESS import description_key_codes, format_analysis_for_prompt, format_transactions_compact
+from app.CATEGORIZE import categorize_transactions
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3, "apr": 4, "april": 4,
+    "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7, "aug": 8, "august": 8, "sep": 9, "sept": 9,
+    "september": 9, "oct": 10, "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12
+}
+DEBIT_WORDS = {"spend", "spent", "spending", "paid", "pay", "payment", "payments", "debit", "debits",
+               "debited", "expense", "expenses", "bought", "purchase", "purchases", "cost", "outgoing"}
+CREDIT_WORDS = {"receive", "received", "income", "credit", "credits", "credited", "earned", "earn",
+                "incoming", "deposit", "deposits", "refund", "refunds"}
+STOPWORDS = {"a", "an", "the", "i", "me", "my", "we", "our", "you", "your", "how", "much", "many", "what",
+             "which", "when", "where", "who", "why", "did", "do", "does", "is", "are", "was", "were", "be",
+             "on", "in", "at", "to", "for", "from", "of", "by", "with", "and", "or", "all", "any", "total",
+             "show", "list", "tell", "give", "transactions", "transaction", "money", "amount", "amounts",
+             "rs", "inr", "than", "more", "less", "over", "under", "above", "below", "between", "this",
+             "that", "last", "month", "months", "year", "years", "week", "day", "days", "there", "have",
+             "has", "it", "its", "get", "got", "so", "far", "per", "each", "every", "can", "could", "please",
+             "orders", "order", "rides", "ride", "trips", "trip", "bills", "bill", "txns", "txn", "times"}
+AMOUNT_PATTERN = re.compile(
+    r"(over|above|more than|greater than|at least|>|under|below|less than|at most|<)\s*(?:rs\.?|₹|inr)?\s*"
+    r"([\d,]+(?:\.\d+)?)",
+    re.IGNORECASE
+)
+YEAR_PATTERN = re.compile(r"\b(19\d{2}|20\d{2})\b")
+# Periods relative to today; the stopwords drop these words, so they are flagged up front
+RELATIVE_PATTERN = re.compile(
+    r"\b(?:last|this|past|previous|current|recent|next|coming)\s+(?:\d+\s+|few\s+|couple of\s+)?"
+    r"(?:days?|weeks?|fortnights?|months?|quarters?|years?)\b|\b(?:yesterday|today|tonight|lately|recently|ytd|mtd)\b"
+)
+TERM_PATTERN = re.compile(r"[a-z]+")
+
+
+def parse_question_filters(question):
+    """Extracts structured filters (months, years, amounts, direction) from a question
+
+    Args:
+        question (str): Natural-language question
+
+    Returns:
+        dict: months, years, min_amount, max_amount, direction, relative
+            (the question names a period like "last month" that isn't a
+            calendar date) and remaining terms
+    """
+    text = question.lower()
+    words = TERM_PATTERN.findall(text)
+
+    filters = {
+        "months": sorted({MONTHS[w] for w in words if w in MONTHS}),
+        "years": sorted({int(y) for y in YEAR_PATTERN.findall(text)}),
+        "min_amount": None,
+        "max_amount": None,
+        "direction": None,
+        "relative": bool(RELATIVE_PATTERN.search(text))
+    }
+    for op, value in AMOUNT_PATTERN.findall(text):
+        amount = float(value.replace(",", ""))
+        if op in ("over", "above", "more than", "greater than", "at least", ">"):
+            filters["min_amount"] = amount
+        else:
+            filters["max_amount"] = amount
+
+    has_debit = any(w in DEBIT_WORDS for w in words)
+    has_credit = any(w in CREDIT_WORDS for w in words)
+    if has_debit != has_credit:
+        filters["direction"] = "debit" if has_debit else "credit"
+
+    filters["terms"] = [w for w in words
+                        if w not in STOPWORDS and w not in MONTHS and w not in DEBIT_WORDS
+                        and w not in CREDIT_WORDS and len(w) > 1]
+    return filters
+
+
+class TransactionIndex:
+    """BM25 index over a statement, built once and reused for every question
+
+    Documents are transactions, but all rows sharing a description key
+    (desc_key from ingestion) have identical text. Term statistics are
+    therefore kept per key and weighted by row counts. A query scores the
+    keys and maps the scores back to rows through the integer codes.
+
+    Args:
+        df (pd.DataFrame): Processed transaction data
+        k1 (float): BM25 term-frequency saturation
+        b (float): BM25 length normalization
+    """
+
+    def __init__(self, df, k1=1.2, b=0.75):
+        self.df = df
+        self.k1 = k1
+        self.b = b
+        self.codes, keys = description_key_codes(df)
+
+        # Category names become searchable terms ("food", "travel", ...)
+        key_categories = categorize_transactions(keys)
+        texts = (keys.str.lower() + " " + key_categories.str.replace("_", " ")).to_numpy()
+        self.rows_per_key = np.bincount(self.codes[self.codes >= 0], minlength=len(keys)).astype(float)
+
+        self.postings = {}
+        lengths = np.zeros(len(keys))
+        for key_id, text in enumerate(texts):
+            terms = TERM_PATTERN.findall(text)
+            lengths[key_id] = len(terms)
+            for term in set(terms):
+                self.postings.setdefault(term, []).append((key_id, terms.count(term)))
+        self.postings = {
+            term: (np.array([k for k, _ in items]), np.array([tf for _, tf in items], dtype=float))
+            for term, items in self.postings.items()
+        }
+
+        total_rows = self.rows_per_key.sum()
+        self.total_rows = max(total_rows, 1.0)
+        self.lengths = lengths
+        self.avg_length = (lengths @ self.rows_per_key) / self.total_rows if total_rows else 1.0
+
+    def expand_term(self, term):
+        """Exact vocabulary match, or prefix matches for longer partial words"""
+        if term in self.postings:
+            return [term]
+        if len(term) >= 4:
+            return [t for t in self.postings if t.startswith(term)]
+        return []
+
+    def score_keys(self, terms):
+        """Returns BM25 scores per description key for the query terms"""
+        scores = np.zeros(len(self.lengths))
+        for query_term in terms:
+            for term in self.expand_term(query_term):
+                key_ids, tf = self.postings[term]
+                doc_freq = self.rows_per_key[key_ids].sum()
+                idf = np.log(1 + (self.total_rows - doc_freq + 0.5) / (doc_freq + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[key_ids] / self.avg_length)
+                scores[key_ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def filter_mask(self, filters):
+        """Boolean row mask for the structured part of a question"""
+        df = self.df
+        mask = np.ones(len(df), dtype=bool)
+        if filters["months"]:
+            mask &= df['date'].dt.month.isin(filters["months"]).to_numpy()
+        if filters["years"]:
+            mask &= df['date'].dt.year.isin(filters["years"]).to_numpy()
+        if filters["direction"] == "debit":
+            mask &= df['dr'].to_numpy() > 0
+        elif filters["direction"] == "credit":
+            mask &= df['cr'].to_numpy() > 0
+        amount = np.maximum(df['dr'].to_numpy(), df['cr'].to_numpy())
+        if filters["min_amount"] is not None:
+            mask &= amount >= filters["min_amount"]
+        if filters["max_amount"] is not None:
+            mask &= amount <= filters["max_amount"]
+        return mask
+
+    def search(self, question, max_rows=200):
+        """Selects the rows relevant to a question
+
+        Args:
+            question (str): Natural-language question
+            max_rows (int): Most rows to return, highest scores (then newest) first
+
+        Returns:
+            tuple: (matched rows, capped to max_rows, in date order; info dict
+                with the parsed filters and totals over all matches), or
+                (None, info) when the question can't be narrowed down
+        """
+        filters = parse_question_filters(question)
+        mask = self.filter_mask(filters)
+        # Direction alone keeps most of the statement; it only narrows
+        # alongside a date, amount or term match
+        selective = any(filters[k] for k in ("months", "years")) or \
+            filters["min_amount"] is not None or filters["max_amount"] is not None
+        structured = selective and mask.size and not mask.all()
+
+        row_scores = np.zeros(len(self.df))
+        lexical = False
+        if filters["terms"]:
+            key_scores = self.score_keys(filters["terms"])
+            if key_scores.any():
+                lexical = True
+                row_scores = np.where(self.codes >= 0, key_scores[self.codes], 0.0)
+                mask &= row_scores > 0
+
+        info = {
+            "filters": filters,
+            "lexical": lexical,
+            "structured": bool(structured),
+            "matched_terms": [t for t in filters["terms"] if self.expand_term(t)]
+        }
+        # Relative periods can't be resolved against the statement's dates
+        # here, so those questions get the full listing
+        if filters["relative"] or (not lexical and not structured):
+            return None, info
+
+        matched = self.df[mask]
+        info.update({
+            "matched": len(matched),
+            "total_debit": round(float(matched['dr'].sum()), 2),
+            "total_credit": round(float(matched['cr'].sum()), 2)
+        })
+        if len(matched) > max_rows:
+            # Equal scores keep the newest rows
+            newest_first = -matched['date'].to_numpy().astype("datetime64[ns]").astype(np.int64)
+            order = np.lexsort((newest_first, -row_scores[mask]))[:max_rows]
+            matched = matched.iloc[np.sort(order)]
+        return matched, info
+
+
+def format_retrieval_for_prompt(analysis, index, question, max_rows=200):
+    """Builds the {data} block for the default style from retrieved rows only
+
+    Args:
+        analysis (dict): Results from analyze_bank_transactions()
+        index (TransactionIndex): Index over the statement
+        question (str): User question
+        max_rows (int): Most transactions to list
+
+    Returns:
+        str | None: Summary plus relevant transactions, or None when the
+            question matched nothing specific (callers send the full listing)
+    """
+    rows, info = index.search(question, max_rows=max_rows)
+    if rows is None:
+        return None
+
+    filters = info["filters"]
+    lines = [format_analysis_for_prompt(analysis)]
+    lines.append("\n🔎 Transactions Relevant to the Question:")
+    criteria = []
+    if info["lexical"]:
+        criteria.append("matching " + ", ".join(info["matched_terms"]))
+    if filters["months"]:
+        criteria.append("months " + ", ".join(str(m) for m in filters["months"]))
+    if filters["years"]:
+        criteria.append("years " + ", ".join(str(y) for y in filters["years"]))
+    if filters["direction"]:
+        criteria.append(f"{filters['direction']}s only")
+    if filters["min_amount"] is not None:
+        criteria.append(f"≥ ₹{filters['min_amount']}")
+    if filters["max_amount"] is not None:
+        criteria.append(f"≤ ₹{filters['max_amount']}")
+    lines.append(f"• Selection: {'; '.join(criteria)}")
+    lines.append(f"• Matched: {info['matched']} of {len(index.df)} transactions")
+    lines.append(f"• Matched Total Debited: ₹{info['total_debit']}")
+    lines.append(f"• Matched Total Credited: ₹{info['total_credit']}")
+    if info["matched"] > len(rows):
+        lines.append(f"• Listing the {len(rows)} most relevant; totals above cover all matches")
+    if len(rows):
+        lines.append(format_transactions_compact(rows))
+    return "\n".join(lines)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+WINDOWS = (7, 30, 90)
+
+
+def _window_sums(values, window):
+    """Trailing `window`-day sums of a dense daily array from its prefix sums"""
+    prefix = np.concatenate([[0], np.cumsum(values)])
+    ends = np.arange(1, len(values) + 1)
+    return prefix[ends] - prefix[np.maximum(ends - window, 0)]
+
+
+def _at(dates, values, i, name):
+    return {"end_date": dates[i].strftime('%d-%b-%Y'), name: round(float(values[i]), 2)}
+
+
+def rolling_cash_flow(days, dr, cr, close=None, low=None, windows=WINDOWS):
+    """Trailing-window burn, income, net flow and balance lows
+
+    Daily totals are spread over a dense calendar (days without
+    transactions count as zero flow and keep the previous closing
+    balance), so every window covers exactly N calendar days. Each window
+    sum is a difference of two prefix sums, making the whole pass O(days)
+    regardless of the window length; balance lows use pandas' O(n)
+    rolling minimum.
+
+    Args:
+        days (np.ndarray): Sorted days since 1970-01-01 that have transactions
+        dr, cr (np.ndarray): Debit/credit paise per day
+        close, low (np.ndarray): Closing and lowest balance per day, or None
+        windows (tuple): Window lengths in days
+
+    Returns:
+        tuple: (summary, series). summary maps "7d"... to the latest
+            window and the extremes over complete windows (windows longer
+            than the statement are left out); series is one row per
+            calendar day with debit/credit/net (and min_balance) per window
+    """
+    if not len(days):
+        return {}, pd.DataFrame()
+
+    positions = days - days[0]
+    length = int(positions[-1]) + 1
+    dense_dr = np.zeros(length, dtype=np.int64)
+    dense_cr = np.zeros(length, dtype=np.int64)
+    dense_dr[positions] = dr
+    dense_cr[positions] = cr
+    dates = pd.to_datetime((days[0] + np.arange(length)).astype("datetime64[D]"))
+
+    dense_low = None
+    if close is not None:
+        active = np.zeros(length, dtype=bool)
+        active[positions] = True
+        # Index of the latest day with transactions, for every calendar day
+        latest = np.cumsum(active) - 1
+        dense_low = np.where(active, np.asarray(low)[latest], np.asarray(close)[latest])
+
+    series = {"date": dates}
+    summary = {}
+    for window in windows:
+        debit = _window_sums(dense_dr, window) / 100
+        credit = _window_sums(dense_cr, window) / 100
+        net = credit - debit
+        label = f"{window}d"
+        series[f"debit_{label}"] = debit
+        series[f"credit_{label}"] = credit
+        series[f"net_{label}"] = net
+        minimum = None
+        if dense_low is not None:
+            minimum = pd.Series(dense_low).rolling(window, min_periods=1).min().to_numpy()
+            series[f"min_balance_{label}"] = minimum
+
+        if length < window:
+            continue
+        complete = np.arange(window - 1, length)
+        last = length - 1
+        metrics = {
+            "latest": {
+                "end_date": dates[last].strftime('%d-%b-%Y'),
+                "debit": round(float(debit[last]), 2),
+                "credit": round(float(credit[last]), 2),
+                "net": round(float(net[last]), 2),
+                "avg_daily_burn": round(float(debit[last]) / window, 2)
+            },
+            "avg_debit": round(float(debit[complete].mean()), 2),
+            "avg_credit": round(float(credit[complete].mean()), 2),
+            "peak_burn": _at(dates, debit, complete[np.argmax(debit[complete])], "debit"),
+            "worst_net": _at(dates, net, complete[np.argmin(net[complete])], "net")
+        }
+        if minimum is not None:
+            metrics["latest"]["min_balance"] = round(float(minimum[last]), 2)
+            metrics["lowest_balance"] = _at(dates, minimum, complete[np.argmin(minimum[complete])], "min_balance")
+        summary[label] = metrics
+    return summary, pd.DataFrame(series)
@@ -0,0 +1,258 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional: SQLite from the standard library is used without it
+    duckdb = None
+
+DEFAULT_ENGINE = os.getenv("SQL_ENGINE", "duckdb" if duckdb is not None else "sqlite")
+COLUMNS = ("date", "desc", "dr", "cr", "bal", "counterparty")
+UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_]")
+
+# Grouping expressions for aggregate(); weekday is 0 = Monday like pandas
+DIMENSIONS = {
+    "duckdb": {
+        "day": "CAST(date AS DATE)",
+        "month": "strftime(date, '%Y-%m')",
+        "weekday": "(isodow(date) - 1)",
+        "counterparty": "counterparty",
+        "direction": "CASE WHEN dr > 0 THEN 'debit' ELSE 'credit' END"
+    },
+    "sqlite": {
+        "day": "substr(date, 1, 10)",
+        "month": "substr(date, 1, 7)",
+        "weekday": "((CAST(strftime('%w', date) AS INTEGER) + 6) % 7)",
+        "counterparty": "counterparty",
+        "direction": "CASE WHEN dr > 0 THEN 'debit' ELSE 'credit' END"
+    }
+}
+
+
+def available_engines():
+    """SQL engines usable in this environment, preferred first"""
+    return (["duckdb"] if duckdb is not None else []) + ["sqlite"]
+
+
+def table_name(name):
+    """Turns a statement name into a safe SQL identifier"""
+    name = UNSAFE_NAME.sub("_", str(name)).strip("_") or "statement"
+    return name if not name[0].isdigit() else f"t_{name}"
+
+
+class StatementStore:
+    """Cleaned statements registered as SQL tables for filtering and aggregation
+
+    With DuckDB each statement is copied once into an in-memory columnar
+    table, so queries scan it on all cores and only their results come
+    back to pandas; nothing is written to disk. With SQLite (always
+    available) rows are loaded into an indexed table. Filters use the same
+    semantics as the Explorer's pandas masks.
+
+    Args:
+        engine (str): "duckdb" or "sqlite" (default: DuckDB when installed)
+        path (str): Database file; in memory by default
+    """
+
+    def __init__(self, engine=None, path=None):
+        self.engine = engine or DEFAULT_ENGINE
+        if self.engine == "duckdb" and duckdb is None:
+            raise ValueError("The duckdb engine needs duckdb. Install it with: pip install duckdb")
+        if self.engine not in DIMENSIONS:
+            raise ValueError(f"Unknown SQL engine: {self.engine}")
+        self.tables = {}
+        self._lock = threading.Lock()
+        if self.engine == "duckdb":
+            self.conn = duckdb.connect(path or ":memory:")
+        else:
+            # Streamlit reruns on different threads; access is serialized by the lock
+            self.conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            if self.engine == "duckdb":
+                return self.conn.execute(sql, list(params)).df()
+            return pd.read_sql_query(sql, self.conn, params=list(params))
+
+    def register(self, name, df):
+        """Registers a processed statement as a table
+
+        Args:
+            name (str): Table name (sanitized)
+            df (pd.DataFrame): Output of process_csv_file()
+
+        Returns:
+            str: The table name to query
+        """
+        name = table_name(name)
+        frame = pd.DataFrame({c: df[c] for c in COLUMNS if c in df.columns})
+        if 'counterparty' in frame.columns:
+            frame['counterparty'] = frame['counterparty'].astype(object)
+        frame['desc'] = frame['desc'].astype(object)
+
+        with self._lock:
+            if self.engine == "duckdb":
+                # DuckDB scans the frame into its own compressed columnar table
+                self.conn.register("_incoming", frame)
+                self.conn.execute(f"CREATE OR REPLACE TABLE {name} AS SELECT * FROM _incoming")
+                self.conn.unregister("_incoming")
+            else:
+                frame['date'] = frame['date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+                self.conn.execute(f"DROP TABLE IF EXISTS {name}")
+                frame.to_sql(name, self.conn, index=False, chunksize=50_000)
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_date ON {name} (date)")
+                self.conn.commit()
+        self.tables[name] = list(frame.columns)
+        return name
+
+    def _date(self, value):
+        value = pd.Timestamp(value)
+        return value.to_pydatetime() if self.engine == "duckdb" else value.strftime('%Y-%m-%d %H:%M:%S')
+
+    def where(self, filters=None):
+        """Builds a WHERE clause and its parameters from Explorer filters
+
+        Args:
+            filters (dict): search (case-insensitive substring of desc),
+                direction ("all", "debit" or "credit"), min_amount and
+                max_amount (ignored when 0), start and end (inclusive)
+
+        Returns:
+            tuple: (sql, params); sql is empty when nothing filters
+        """
+        filters = filters or {}
+        clauses, params = [], []
+        if filters.get("search"):
+            term = filters["search"].lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("lower(\"desc\") LIKE ? ESCAPE '\\'")
+            params.append(f"%{term}%")
+        direction = filters.get("direction", "all")
+        if direction == "debit":
+            clauses.append("dr > 0")
+        elif direction == "credit":
+            clauses.append("cr > 0")
+        if filters.get("min_amount"):
+            clauses.append("(dr >= ? OR cr >= ?)")
+            params += [filters["min_amount"]] * 2
+        if filters.get("max_amount"):
+            clauses.append("(dr <= ? OR cr <= ?)")
+            params += [filters["max_amount"]] * 2
+        if filters.get("start") is not None:
+            clauses.append("date >= ?")
+            params.append(self._date(filters["start"]))
+        if filters.get("end") is not None:
+            clauses.append("date <= ?")
+            params.append(self._date(filters["end"]))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _as_frame(self, df):
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    def filter_rows(self, name, filters=None, limit=None):
+        """Matching transactions, newest first (at most `limit`)"""
+        where, params = self.where(filters)
+        columns = ", ".join(f'"{c}"' for c in self.tables[name])
+        sql = f"SELECT {columns} FROM {name}{where} ORDER BY date DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._as_frame(self._execute(sql, params))
+
+    def _quantile(self, name, column, where, params, count, q):
+        """Linear-interpolated quantile (pandas' default) over the filtered rows"""
+        if self.engine == "duckdb":
+            return float(self._execute(f"SELECT quantile_cont({column}, {q}) AS v FROM {name}{where}", params)["v"][0])
+        position = q * (count - 1)
+        low = math.floor(position)
+        values = self._execute(f"SELECT {column} AS v FROM {name}{where} ORDER BY {column} LIMIT 2 OFFSET {low}",
+                               params)["v"].tolist()
+        if len(values) == 1 or position == low:
+            return float(values[0])
+        return float(values[0] + (values[1] - values[0]) * (position - low))
+
+    def quick_stats(self, name, filters=None, quantile=0.9):
+        """Count, debit/credit totals and the `quantile` of each amount column
+
+        Returns:
+            dict: count, total_debit, total_credit, dr_quantile, cr_quantile
+        """
+        where, params = self.where(filters)
+        row = self._execute(
+            f"SELECT COUNT(*) AS n, COALESCE(SUM(dr), 0) AS dr, COALESCE(SUM(cr), 0) AS cr FROM {name}{where}",
+            params
+        ).iloc[0]
+        count = int(row['n'])
+        stats = {"count": count, "total_debit": float(row['dr']), "total_credit": float(row['cr']),
+                 "dr_quantile": 0.0, "cr_quantile": 0.0}
+        if count:
+            stats["dr_quantile"] = self._quantile(name, "dr", where, params, count, quantile)
+            stats["cr_quantile"] = self._quantile(name, "cr", where, params, count, quantile)
+        return stats
+
+    def aggregate(self, name, by, filters=None):
+        """Debit/credit totals and counts of the filtered rows per dimension
+
+        Args:
+            by (str | list): Any of day, month, weekday, counterparty, direction
+
+        Returns:
+            pd.DataFrame: One row per group with debit, credit and count
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        unknown = set(by) - set(DIMENSIONS[self.engine])
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {', '.join(sorted(unknown))}")
+        where, params = self.where(filters)
+        keys = ", ".join(f"{DIMENSIONS[self.engine][d]} AS {d}" for d in by)
+        groups = ", ".join(str(i + 1) for i in range(len(by)))
+        return self._execute(
+            f"SELECT {keys}, SUM(dr) AS debit, SUM(cr) AS credit, COUNT(*) AS count "
+            f"FROM {name}{where} GROUP BY {groups} ORDER BY {groups}",
+            params
+        )
+
+    def query(self, sql, params=()):
+        """Runs a single SELECT against the registered tables
+
+        Statements that write, attach databases, copy to files or change
+        settings are refused. This is for trusted callers (notebooks,
+        scripts); the dashboard doesn't expose it.
+
+        Raises:
+            ValueError: For several statements or anything but a SELECT
+        """
+        if self.engine == "duckdb":
+            with self._lock:
+                statements = self.conn.extract_statements(sql)
+            if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+                raise ValueError("Only a single SELECT statement can be run")
+            return self._execute(sql, params)
+        # sqlite3 already refuses several statements; the authorizer refuses
+        # writes, ATTACH, PRAGMA and extension loading while the query runs
+        with self._lock:
+            self.conn.set_authorizer(_read_only)
+            try:
+                return pd.read_sql_query(sql, self.conn, params=list(params))
+            except pd.errors.DatabaseError as e:
+                raise ValueError(f"Only a single SELECT statement can be run ({e})")
+            finally:
+                self.conn.set_authorizer(None)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _read_only(action, arg1, arg2, database, trigger):
+    """SQLite authorizer allowing reads only"""
+    if action in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_RECURSIVE):
+        return sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_FUNCTION and arg2 != "load_extension":
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
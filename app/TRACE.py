@@ -0,0 +1,248 @@
+import cProfile
+import functools
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger("bank_dashboard.trace")
+
+_state = threading.local()
+# tracemalloc is process-wide: one tracer at a time may start, reset and stop it
+_memory_lock = threading.Lock()
+_memory_owner = None
+
+
+class Span:
+    """Timing record for one pipeline stage"""
+
+    def __init__(self, name, rows=None, depth=0):
+        self.name = name
+        self.rows = rows
+        self.depth = depth
+        self.started = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_mem = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "wall_s": round(self.wall, 6),
+            "cpu_s": round(self.cpu, 6),
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows / self.wall, 1) if self.rows and self.wall > 0 else None,
+            "peak_mem_mb": round(self.peak_mem / 1_048_576, 3) if self.peak_mem is not None else None,
+            "error": self.error
+        }
+
+
+class Tracer:
+    """Collects spans for one run of the pipeline
+
+    Args:
+        memory (bool): Track peak Python memory per span with tracemalloc.
+            Costs noticeable overhead, so batch jobs usually leave it off.
+        log (bool): Emit one structured JSON log line per finished span
+    """
+
+    def __init__(self, memory=True, log=True):
+        self.memory = memory
+        self.log = log
+        self.spans = []
+        self._stack = []
+        self._peaks = []
+
+    @contextmanager
+    def span(self, name, rows=None):
+        span = Span(name, rows=rows, depth=len(self._stack))
+        if self.memory:
+            # Fold the running peak into the parent before resetting it for the child
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            self._peaks.append(0)
+        self._stack.append(span)
+        wall_start = span.started = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            span.wall = time.perf_counter() - wall_start
+            span.cpu = time.process_time() - cpu_start
+            self._stack.pop()
+            if self.memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                span.peak_mem = max(peak - base, 0)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+            self.spans.append(span)
+            if self.log:
+                logger.info(json.dumps({"event": "span", **span.to_dict()}))
+
+    def stage_totals(self):
+        """Returns total wall seconds per span name"""
+        totals = {}
+        for span in self.spans:
+            totals[span.name] = totals.get(span.name, 0.0) + span.wall
+        return totals
+
+    def to_records(self):
+        """Returns spans in start order as a list of dicts"""
+        return [span.to_dict() for span in sorted(self.spans, key=lambda s: s.started)]
+
+
+def get_tracer():
+    """Returns the tracer active on this thread, or None"""
+    return getattr(_state, "tracer", None)
+
+
+def _claim_memory(tracer):
+    """Makes `tracer` the only one measuring memory; False if another one is
+
+    Returns:
+        tuple: (claimed, whether tracemalloc was started for it)
+    """
+    global _memory_owner
+    with _memory_lock:
+        if _memory_owner is not None:
+            return False, False
+        _memory_owner = tracer
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        return True, started
+
+
+def _release_memory(started):
+    global _memory_owner
+    with _memory_lock:
+        if started:
+            tracemalloc.stop()
+        _memory_owner = None
+
+
+@contextmanager
+def tracing(memory=True, log=True):
+    """Activates a tracer for the current thread
+
+    Every @traced function called inside the block records a span on it.
+    Peak memory is measured by one tracer at a time: while another thread
+    (another dashboard session) is measuring, this tracer records timings
+    only, since resetting the shared peak would corrupt both. Allocations
+    made by other threads still count towards the peaks.
+
+    Yields:
+        Tracer: The active tracer; tracer.memory says whether memory is measured
+    """
+    tracer = Tracer(memory=memory, log=log)
+    claimed = started = False
+    if memory:
+        claimed, started = _claim_memory(tracer)
+        tracer.memory = claimed
+    previous = get_tracer()
+    _state.tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _state.tracer = previous
+        if claimed:
+            _release_memory(started)
+
+
+@contextmanager
+def span(name, rows=None):
+    """Records a span on the active tracer; a no-op when tracing is off"""
+    tracer = get_tracer()
+    if tracer is None:
+        yield Span(name, rows=rows)
+        return
+    with tracer.span(name, rows=rows) as s:
+        yield s
+
+
+def _count_rows(args, result):
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    for arg in args:
+        if isinstance(arg, pd.DataFrame):
+            return len(arg)
+    return None
+
+
+def traced(name):
+    """Decorator that wraps a pipeline stage in a span
+
+    Rows are taken from the returned DataFrame, or else the first DataFrame
+    argument. Calls outside a tracing() block go straight through.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = get_tracer()
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.span(name) as s:
+                result = func(*args, **kwargs)
+                s.rows = _count_rows(args, result)
+                return result
+        return wrapper
+    return decorator
+
+
+class ProfileCapture:
+    """Holds the report produced by profiled()"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.report = ""
+
+
+@contextmanager
+def profiled(engine="cprofile", top=30):
+    """Profiles the enclosed block once
+
+    Args:
+        engine (str): "cprofile" or "pyinstrument" (if installed)
+        top (int): Number of cProfile entries to keep, sorted by cumulative time
+
+    Yields:
+        ProfileCapture: Its report attribute is filled in when the block exits
+    """
+    capture = ProfileCapture(engine)
+    if engine == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ValueError("pyinstrument is not installed (pip install pyinstrument)")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield capture
+        finally:
+            profiler.stop()
+            capture.report = profiler.output_text(unicode=True, color=False)
+    elif engine == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield capture
+        finally:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            capture.report = out.getvalue()
+    else:
+        raise ValueError(f"Unknown profiler engine: {engine}")
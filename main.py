@@ -2,18 +2,32 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from app.BANK_LLM import run_analysis,load_llm
+from app.BANK_LLM import analysis_job, LLM_BACKENDS, DEFAULT_BACKEND, BACKEND_METRICS
+from app.JOBS import get_job_queue
+from app.RETRIEVAL import TransactionIndex
+from app.QUERY import QueryEngine
 from plotly.subplots import make_subplots
-from app.GENPDF import generate_docx
-import tempfile
+from app.GENPDF import generate_docx, report_key, cached_report
 import os
+import uuid
+from contextlib import nullcontext
 from datetime import datetime
 from app.DPROCESS import (
     process_csv_file,
     analyze_bank_transactions,
-    format_analysis_for_prompt,
-    count_tokens
+    count_tokens,
+    compare_prompt_encodings,
+    search_transactions,
+    combine_statements
 )
+from app.TRACE import tracing, profiled
+from app.PDFPROCESS import is_pdf, preprocess_pdf
+from app.SQLSTORE import StatementStore, available_engines, table_name
+from app.CUBE import build_cube, WEEKDAY_NAMES
+from app.COMPARE import build_period_totals, merchant_movers
+
+# Rows the SQL-backed Explorer pulls back for display (stats cover every match)
+EXPLORER_ROW_LIMIT = 5000
 
 # ========== Streamlit App Configuration ========== #
 st.set_page_config(
@@ -38,10 +52,11 @@ with st.sidebar:
     st.markdown("---")
     
     # Enhanced File uploader
-    uploaded_file = st.file_uploader(
-        "📁 Upload your bank statement CSV", 
-        type=["csv"],
-        help="Drag and drop your CSV file here or click to browse"
+    uploaded_files = st.file_uploader(
+        "📁 Upload your bank statement (CSV or PDF)", 
+        type=["csv", "pdf"],
+        accept_multiple_files=True,
+        help="Drag and drop your CSV or PDF statement here or click to browse. Overlapping exports of one account are merged and deduplicated"
     )
     
     st.markdown("---")
@@ -56,6 +71,20 @@ with st.sidebar:
     with col2:
         show_token_count = st.checkbox("🔢 Token Count", value=True)
         show_animations = st.checkbox("✨ Animations", value=True)
+        show_performance = st.checkbox("⏱️ Performance", value=True)
+        track_memory = st.checkbox("💾 Track Memory", value=False, disabled=not show_performance,
+                                   help="Peak memory per stage via tracemalloc; makes processing about 2x slower")
+        compact_prompt = st.checkbox("🗜️ Compact Prompt", value=True,
+                                     help="Group rows by day and reference repeated counterparties by id")
+
+    profile_run = st.checkbox("🧪 Profile this run", value=False,
+                              help="Capture a profiler report for the processing stages")
+    profile_engine = st.selectbox("Profiler", ["cprofile", "pyinstrument"], disabled=not profile_run)
+    llm_backend = st.selectbox("🧠 LLM Backend", list(LLM_BACKENDS),
+                               index=list(LLM_BACKENDS).index(DEFAULT_BACKEND) if DEFAULT_BACKEND in LLM_BACKENDS else 0,
+                               help="groq: hosted API · openai: local OpenAI-compatible server (LLM_BASE_URL) · fake: deterministic offline answers")
+    explorer_engine = st.selectbox("🗄️ Explorer Engine", ["pandas"] + available_engines(),
+                                   help="pandas: in-memory masks · duckdb/sqlite: filters and stats pushed down as SQL")
     
     st.markdown("---")
     
@@ -87,7 +116,7 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-if not uploaded_file:
+if not uploaded_files:
     # Enhanced empty state
     st.markdown("""
     <div class="glass-card" style="text-align: center; padding: 48px;">
@@ -135,33 +164,75 @@ if not uploaded_file:
 
 else:
     try:
-        # Enhanced file processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-            tmp.write(uploaded_file.read())
-            temp_path = tmp.name
-
-        # Processing with enhanced feedback
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        statement_id = tuple((f.name, f.size) for f in uploaded_files)
+
+        # Widget changes rerun the script; parse and analyze once per upload
+        # (a profiled run always reprocesses, so there is something to profile)
+        if profile_run or st.session_state.get('processed_statement') != statement_id:
+            # Processing with enhanced feedback
+            progress_bar = st.progress(0)
+            status_text = st.empty()
         
-        with st.spinner("🔄 Processing your file..."):
-            status_text.text("Reading CSV file...")
-            progress_bar.progress(25)
-            df = process_csv_file(temp_path)
-            os.remove(temp_path)
-            
-            status_text.text("Analyzing transactions...")
-            progress_bar.progress(75)
-            analysis = analyze_bank_transactions(df)
-            progress_bar.progress(100)
+            profile_ctx = profiled(profile_engine) if profile_run else nullcontext()
+            with tracing(memory=show_performance and track_memory) as tracer, profile_ctx as capture:
+                with st.spinner("🔄 Processing your file..."):
+                    progress_bar.progress(10)
+                    frames = []
+                    for uploaded_file in uploaded_files:
+                        if is_pdf(uploaded_file.getvalue()):
+                            def pdf_progress(done, total, seconds):
+                                status_text.text(f"Reading PDF page {done}/{total} ({done / seconds:.1f} pages/s)...")
+                                progress_bar.progress(10 + int(55 * done / total))
+                            frames.append(preprocess_pdf(uploaded_file.getvalue(), on_progress=pdf_progress))
+                        else:
+                            status_text.text(f"Reading {uploaded_file.name}...")
+                            progress_bar.progress(25)
+                            # Parsed straight from the upload buffer, no temp file on disk
+                            frames.append(process_csv_file(uploaded_file.getvalue()))
+                    # Several exports of one account: stacked by date, overlapping rows dropped
+                    df = frames[0] if len(frames) == 1 else combine_statements(frames)
+                
+                    status_text.text(f"Analyzing {len(df):,} transactions...")
+                    progress_bar.progress(75)
+                    analysis = analyze_bank_transactions(df)
+                    # Drill-downs below read this instead of regrouping df
+                    cube = build_cube(df)
+                    # Any two date ranges compare in constant time from these
+                    period_totals = build_period_totals(cube, analysis)
+                    progress_bar.progress(100)
+
+            st.session_state.perf_spans = tracer.to_records()
+            if capture is not None:
+                st.session_state.perf_profile = capture.report
             
-        status_text.empty()
-        progress_bar.empty()
+            status_text.empty()
+            progress_bar.empty()
         
+            st.session_state.statement_data = (df, analysis, cube, period_totals)
+            st.session_state.processed_statement = statement_id
+        df, analysis, cube, period_totals = st.session_state.statement_data
+
         st.success("✅ Analysis complete! Your financial insights are ready.")
+        if "ingest" in df.attrs:
+            ingest = df.attrs["ingest"]
+            st.caption(f"📄 Read {ingest['pages']} PDF pages in {ingest['seconds']}s ({ingest['pages_per_sec']} pages/s)")
+
+        integrity = df.attrs.get("integrity", {})
+        if integrity.get("duplicates"):
+            st.info(f"🧹 Removed {integrity['duplicates']:,} duplicated rows (overlapping exports)")
+        if integrity.get("checked") and not integrity["ok"]:
+            st.warning(f"⚠️ Balance check: {integrity['gaps']:,} gaps (₹{integrity['unexplained_amount']:,.2f} unaccounted), "
+                       f"{integrity['reordered']:,} reordered rows, {integrity['date_regressions']:,} dates out of order. "
+                       "Totals and trends may be skewed.")
+            with st.expander("🧾 Balance check details"):
+                for label, key in (("Gaps", "gap_rows"), ("Reordered rows", "reordered_rows"),
+                                   ("Removed duplicates", "duplicate_rows")):
+                    if integrity.get(key):
+                        st.markdown(f"**{label}** (first {len(integrity[key])})")
+                        st.dataframe(pd.DataFrame(integrity[key]), use_container_width=True, hide_index=True)
 
         # Enhanced Dashboard Layout with better tabs
-        tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "📈 Trends", "🔍 Explorer", "🤖 AI Analysis"])
+        tab1, tab2, tab_compare, tab3, tab4, tab5 = st.tabs(["📊 Overview", "📈 Trends", "⚖️ Compare", "🔍 Explorer", "🤖 AI Analysis", "⏱️ Performance"])
 
         with tab1:
             st.markdown('<div class="animate-fadeInUp">', unsafe_allow_html=True)
@@ -253,6 +324,55 @@ else:
                 
                 st.plotly_chart(balance_fig, use_container_width=True)
 
+            # Merchant drill-down from the precomputed cube
+            top_merchants = cube.top_merchants(20)
+            if not top_merchants.empty:
+                st.markdown("""
+                <div class="glass-card">
+                    <h3>🔎 Merchant Drill-down</h3>
+                    <p style="color: rgba(255,255,255,0.7);">Month-by-month flow with one counterparty</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+                merchant_totals = dict(zip(top_merchants["merchant"], top_merchants["amount"]))
+                merchant = st.selectbox("Counterparty", list(merchant_totals),
+                                        format_func=lambda m: f"{m} (₹{merchant_totals[m]:,.0f} spent)")
+                merchant_monthly = cube.pivot("month", "direction", merchants=[merchant]).reset_index()
+                merchant_weekday = cube.drill("weekday", merchants=[merchant], direction="debit")
+
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    fig_drill = go.Figure()
+                    for direction, color in (("debit", "#ff6b6b"), ("credit", "#4ecdc4")):
+                        if direction in merchant_monthly.columns:
+                            fig_drill.add_trace(go.Bar(x=merchant_monthly["month"], y=merchant_monthly[direction],
+                                                       name=direction.title() + "s", marker_color=color))
+                    fig_drill.update_layout(
+                        title=f"{merchant} by Month",
+                        yaxis_title="Amount (₹)",
+                        template="plotly_dark",
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='white'),
+                        height=350
+                    )
+                    st.plotly_chart(fig_drill, use_container_width=True)
+                with col2:
+                    fig_weekday = go.Figure(go.Bar(
+                        x=[WEEKDAY_NAMES[d] for d in merchant_weekday["weekday"]],
+                        y=merchant_weekday["amount"],
+                        marker_color='#667eea'
+                    ))
+                    fig_weekday.update_layout(
+                        title="Debits by Weekday",
+                        template="plotly_dark",
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='white'),
+                        height=350
+                    )
+                    st.plotly_chart(fig_weekday, use_container_width=True)
+
             # Enhanced sample data
             if show_raw_data:
                 st.markdown("""
@@ -263,7 +383,7 @@ else:
                 """, unsafe_allow_html=True)
                 
                 # Style the dataframe
-                styled_df = df.head(10).style.format({
+                styled_df = df.drop(columns=['desc_key'], errors='ignore').head(10).style.format({
                     'dr': '₹{:,.2f}',
                     'cr': '₹{:,.2f}',
                     'balance': '₹{:,.2f}'
@@ -379,6 +499,30 @@ else:
                         marker=dict(size=10)
                     ))
 
+                    # 🔮 Local forecast, with its 80% band
+                    forecast_df = pd.DataFrame(analysis.get("forecast", {}).get("months", []))
+                    if not forecast_df.empty:
+                        forecast_df["date"] = pd.to_datetime(forecast_df["date"])
+                        for column, name, color, band in (("cr", "Credits", '#4ecdc4', 'rgba(78, 205, 196, 0.15)'),
+                                                          ("dr", "Debits", '#ff6b6b', 'rgba(255, 107, 107, 0.15)')):
+                            fig_monthly.add_trace(go.Scatter(
+                                x=pd.concat([forecast_df['date'], forecast_df['date'][::-1]]),
+                                y=pd.concat([forecast_df[f'{column}_high'], forecast_df[f'{column}_low'][::-1]]),
+                                fill='toself',
+                                fillcolor=band,
+                                line=dict(width=0),
+                                hoverinfo='skip',
+                                showlegend=False
+                            ))
+                            fig_monthly.add_trace(go.Scatter(
+                                x=forecast_df['date'],
+                                y=forecast_df[column],
+                                mode='lines+markers',
+                                name=f'{name} Forecast',
+                                line=dict(color=color, width=3, dash='dash'),
+                                marker=dict(size=6)
+                            ))
+
                     fig_monthly.update_layout(
                         title="Monthly Transaction Flow",
                         xaxis_title="Month",
@@ -392,6 +536,106 @@ else:
 
                     st.plotly_chart(fig_monthly, use_container_width=True)
 
+                    if analysis.get("forecast"):
+                        forecast = analysis["forecast"]
+                        annual = forecast["projected_annual"]
+                        col1, col2, col3 = st.columns(3)
+                        col1.metric("🔮 Projected Spend (12 mo)", f"₹{annual['debit']:,.2f}")
+                        col2.metric("💵 Projected Income (12 mo)", f"₹{annual['credit']:,.2f}")
+                        col3.metric("🏦 Projected Savings (12 mo)", f"₹{annual['savings']:,.2f}")
+                        st.caption(f"Forecast: {forecast['method'].replace('_', ' ')} exponential smoothing "
+                                   f"fitted on {forecast['basis_months']} complete months; bands are 80% intervals.")
+
+                # 📉 Rolling cash flow
+                rolling_df = pd.DataFrame(analysis.get("raw_data", {}).get("rolling", []))
+                if not rolling_df.empty:
+                    st.markdown("""
+                    <div class="glass-card">
+                        <h3>📉 Rolling Cash Flow</h3>
+                        <p style="color: rgba(255,255,255,0.7);">Spending, income and balance lows over trailing windows</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                    window = st.radio("Window", ["7d", "30d", "90d"], index=1, horizontal=True)
+                    rolling_df["date"] = pd.to_datetime(rolling_df["date"], errors="coerce")
+                    has_balance = f"min_balance_{window}" in rolling_df.columns
+
+                    fig_rolling = make_subplots(
+                        rows=2 if has_balance else 1, cols=1,
+                        subplot_titles=(f"Trailing {window} Flow", f"Trailing {window} Balance Low")[:2 if has_balance else 1],
+                        vertical_spacing=0.12
+                    )
+                    for column, name, color in ((f"debit_{window}", "Burn", '#ff6b6b'),
+                                                (f"credit_{window}", "Income", '#4ecdc4'),
+                                                (f"net_{window}", "Net Flow", '#667eea')):
+                        fig_rolling.add_trace(go.Scatter(
+                            x=rolling_df['date'],
+                            y=rolling_df[column],
+                            mode='lines',
+                            name=name,
+                            line=dict(color=color, width=2)
+                        ), row=1, col=1)
+                    if has_balance:
+                        fig_rolling.add_trace(go.Scatter(
+                            x=rolling_df['date'],
+                            y=rolling_df[f"min_balance_{window}"],
+                            mode='lines',
+                            fill='tozeroy',
+                            name='Balance Low',
+                            line=dict(color='#4facfe', width=2)
+                        ), row=2, col=1)
+
+                    fig_rolling.update_layout(
+                        height=700 if has_balance else 400,
+                        template="plotly_dark",
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='white'),
+                        showlegend=True
+                    )
+                    st.plotly_chart(fig_rolling, use_container_width=True)
+
+                    metrics = analysis.get("rolling_metrics", {}).get(window)
+                    if metrics:
+                        col1, col2, col3, col4 = st.columns(4)
+                        col1.metric(f"🔥 Burn (last {window})", f"₹{metrics['latest']['debit']:,.2f}",
+                                    delta=f"₹{metrics['latest']['debit'] - metrics['avg_debit']:,.2f} vs typical",
+                                    delta_color="inverse")
+                        col2.metric(f"💵 Income (last {window})", f"₹{metrics['latest']['credit']:,.2f}")
+                        col3.metric("📈 Net Flow", f"₹{metrics['latest']['net']:,.2f}")
+                        if 'lowest_balance' in metrics:
+                            col4.metric("🏦 Lowest Balance", f"₹{metrics['lowest_balance']['min_balance']:,.2f}",
+                                        help=f"Window ending {metrics['lowest_balance']['end_date']}")
+
+                # 🗓️ Weekday x Month heatmap, rolled up from the cube
+                if len(cube):
+                    st.markdown("""
+                    <div class="glass-card">
+                        <h3>🗓️ Spending Heatmap</h3>
+                        <p style="color: rgba(255,255,255,0.7);">Which weekdays carry your spending, month by month</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                    heat_direction = st.radio("Flow", ["debit", "credit"], horizontal=True, format_func=str.title)
+                    heatmap = cube.pivot("weekday", "month", direction=heat_direction).reindex(range(7), fill_value=0)
+
+                    fig_heat = go.Figure(go.Heatmap(
+                        z=heatmap.to_numpy(),
+                        x=heatmap.columns,
+                        y=WEEKDAY_NAMES,
+                        colorscale='Reds' if heat_direction == "debit" else 'Teal',
+                        colorbar=dict(title="₹")
+                    ))
+                    fig_heat.update_layout(
+                        title=f"{heat_direction.title()}s by Weekday and Month",
+                        template="plotly_dark",
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='white'),
+                        height=400
+                    )
+                    st.plotly_chart(fig_heat, use_container_width=True)
+
                 # 🛍️ Merchant Insights
                 if "merchant_analysis" in analysis and analysis["merchant_analysis"]:
                     st.markdown("""
@@ -429,10 +673,175 @@ else:
 
                         st.plotly_chart(fig_merchant, use_container_width=True)
 
+                # 🏷️ Spending by Category
+                if analysis.get("category_analysis"):
+                    st.markdown("""
+                    <div class="glass-card">
+                        <h3>🏷️ Spending by Category</h3>
+                        <p style="color: rgba(255,255,255,0.7);">Where your money goes, grouped automatically</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                    category_df = pd.DataFrame.from_dict(analysis["category_analysis"], orient="index")
+                    category_df.index = category_df.index.str.replace("_", " ").str.title()
+                    spend_df = category_df[category_df["debit"] > 0]
+
+                    if not spend_df.empty:
+                        fig_category = go.Figure(go.Pie(
+                            labels=spend_df.index,
+                            values=spend_df["debit"],
+                            hole=0.45
+                        ))
+
+                        fig_category.update_layout(
+                            title="Debits by Category",
+                            template="plotly_dark",
+                            plot_bgcolor='rgba(0,0,0,0)',
+                            paper_bgcolor='rgba(0,0,0,0)',
+                            font=dict(color='white'),
+                            height=500
+                        )
+
+                        st.plotly_chart(fig_category, use_container_width=True)
+
+                # 🔁 Recurring Payments
+                if analysis.get("recurring_payments"):
+                    st.markdown("""
+                    <div class="glass-card">
+                        <h3>🔁 Recurring Payments & Subscriptions</h3>
+                        <p style="color: rgba(255,255,255,0.7);">Repeating charges and income detected in your statement</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                    recurring_df = pd.DataFrame(analysis["recurring_payments"])
+
+                    fig_recurring = go.Figure(go.Bar(
+                        x=recurring_df["annual_amount"],
+                        y=recurring_df["description"].str[:40],
+                        orientation='h',
+                        marker_color=recurring_df["direction"].map({"debit": "#ff6b6b", "credit": "#4ecdc4"})
+                    ))
+
+                    fig_recurring.update_layout(
+                        title="Annualized Recurring Amounts",
+                        xaxis_title="Amount per Year (₹)",
+                        yaxis_title="",
+                        template="plotly_dark",
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='white'),
+                        height=max(400, len(recurring_df) * 30)
+                    )
+
+                    st.plotly_chart(fig_recurring, use_container_width=True)
+                    st.dataframe(recurring_df, use_container_width=True)
+
                 st.markdown('</div>', unsafe_allow_html=True)
 
 
 
+        with tab_compare:
+            st.markdown('<div class="animate-fadeInUp">', unsafe_allow_html=True)
+
+            st.markdown("""
+            <div class="glass-card">
+                <h2>⚖️ Period Comparison</h2>
+                <p style="color: rgba(255,255,255,0.7);">How one stretch of the statement differs from another</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+            presets = {
+                "month": "This month vs last month",
+                "quarter": "This quarter vs last quarter",
+                "year": "This year vs last year",
+                "month_last_year": "This month vs same month last year",
+                "custom": "Custom ranges"
+            }
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                preset = st.radio("Compare", list(presets), format_func=presets.get, horizontal=True)
+            with col2:
+                like_for_like = st.checkbox("Like-for-like days", value=True,
+                                            help="When the statement ends mid-period, compare the same number of days")
+
+            if preset == "custom":
+                first_day, last_day = period_totals.start.date(), period_totals.end.date()
+                default_current, default_previous = (
+                    [min(max(d.date(), first_day), last_day) for d in r] for r in period_totals.preset_ranges("month"))
+                col1, col2 = st.columns(2)
+                with col1:
+                    current_range = st.date_input("📅 Period", value=default_current,
+                                                  min_value=first_day, max_value=last_day)
+                with col2:
+                    previous_range = st.date_input("📅 Compared with", value=default_previous,
+                                                   min_value=first_day, max_value=last_day)
+                ranges = (tuple(current_range), tuple(previous_range))
+                if any(len(r) != 2 for r in ranges):
+                    st.info("Pick a start and end date for both periods.")
+                    ranges = None
+            else:
+                ranges = period_totals.preset_ranges(preset, like_for_like=like_for_like)
+
+            if ranges is not None:
+                comparison = period_totals.compare(*ranges)
+                changes = comparison["changes"]
+                st.caption(f"{comparison['current']['start']} – {comparison['current']['end']} vs "
+                           f"{comparison['previous']['start']} – {comparison['previous']['end']}")
+
+                def delta(metric, prefix="₹"):
+                    change = changes[metric]
+                    pct = f" ({change['pct_change']:+.1f}%)" if change["pct_change"] is not None else ""
+                    return f"{prefix}{change['change']:+,.2f}{pct}" if prefix else f"{change['change']:+,}{pct}"
+
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("💸 Spent", f"₹{changes['debit']['current']:,.2f}", delta=delta("debit"), delta_color="inverse")
+                with col2:
+                    st.metric("💰 Received", f"₹{changes['credit']['current']:,.2f}", delta=delta("credit"))
+                with col3:
+                    st.metric("📊 Net Flow", f"₹{changes['net']['current']:,.2f}", delta=delta("net"))
+                with col4:
+                    st.metric("🧾 Transactions", f"{changes['transactions']['current']:,}", delta=delta("transactions", prefix=""))
+
+                labels = {
+                    "debit": "Debits (₹)", "credit": "Credits (₹)", "net": "Net flow (₹)",
+                    "debit_count": "Debit transactions", "credit_count": "Credit transactions",
+                    "avg_debit": "Average debit (₹)", "avg_credit": "Average credit (₹)",
+                    "active_days": "Days with transactions", "days": "Days covered",
+                    "opening_balance": "Opening balance (₹)", "closing_balance": "Closing balance (₹)"
+                }
+                compare_df = pd.DataFrame.from_dict(changes, orient="index").reindex(
+                    [m for m in labels if m in changes])
+                compare_df.index = compare_df.index.map(labels)
+                compare_df.columns = ["Period", "Compared With", "Change", "Change %"]
+                st.dataframe(compare_df, use_container_width=True)
+
+                # Merchant movers: a pass over the cube cells of both ranges
+                movers_direction = st.radio("Movers", ["debit", "credit"], horizontal=True, format_func=str.title)
+                movers = merchant_movers(cube, *ranges, n=15, direction=movers_direction)
+                if not movers.empty:
+                    # More spending is bad news, more income good news
+                    rising, falling = ('#ff6b6b', '#4ecdc4') if movers_direction == "debit" else ('#4ecdc4', '#ff6b6b')
+                    fig_movers = go.Figure(go.Bar(
+                        x=movers["change"],
+                        y=movers["merchant"],
+                        orientation='h',
+                        marker_color=[rising if c > 0 else falling for c in movers["change"]]
+                    ))
+                    fig_movers.update_layout(
+                        title=f"Biggest Changes in {movers_direction.title()}s by Counterparty",
+                        xaxis_title="Change (₹)",
+                        yaxis=dict(autorange="reversed"),
+                        template="plotly_dark",
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='white'),
+                        height=max(400, len(movers) * 30)
+                    )
+                    st.plotly_chart(fig_movers, use_container_width=True)
+
+            st.markdown('</div>', unsafe_allow_html=True)
+
         with tab3:
             st.markdown('<div class="animate-fadeInUp">', unsafe_allow_html=True)
             
@@ -465,47 +874,79 @@ else:
             with col2:
                 date_range = st.date_input("📅 Date Range", value=[], help="Select start and end dates")
             
-            # Apply filters
-            filtered_df = df.copy()
-            
-            if search_term:
-                filtered_df = filtered_df[filtered_df['desc'].str.contains(search_term, case=False, na=False)]
-            
-            if transaction_type == "Debits Only":
-                filtered_df = filtered_df[filtered_df['dr'] > 0]
-            elif transaction_type == "Credits Only":
-                filtered_df = filtered_df[filtered_df['cr'] > 0]
-            
-            # Amount filtering
-            if min_amount > 0:
-                filtered_df = filtered_df[(filtered_df['dr'] >= min_amount) | (filtered_df['cr'] >= min_amount)]
-            
-            if max_amount > 0:
-                filtered_df = filtered_df[(filtered_df['dr'] <= max_amount) | (filtered_df['cr'] <= max_amount)]
-            
-            # Date filtering
-            if len(date_range) == 2:
-                filtered_df['date'] = pd.to_datetime(filtered_df['date'], errors='coerce')
-                filtered_df = filtered_df[(filtered_df['date'] >= pd.to_datetime(date_range[0])) & 
-                                        (filtered_df['date'] <= pd.to_datetime(date_range[1]))]
-            
+            filters = {
+                "search": search_term,
+                "direction": {"Debits Only": "debit", "Credits Only": "credit"}.get(transaction_type, "all"),
+                "min_amount": min_amount,
+                "max_amount": max_amount,
+                "start": date_range[0] if len(date_range) == 2 else None,
+                "end": date_range[1] if len(date_range) == 2 else None
+            }
+
+            if explorer_engine == "pandas":
+                # Apply filters
+                filtered_df = df.copy()
+
+                if search_term:
+                    filtered_df = filtered_df[search_transactions(filtered_df, search_term)]
+
+                if transaction_type == "Debits Only":
+                    filtered_df = filtered_df[filtered_df['dr'] > 0]
+                elif transaction_type == "Credits Only":
+                    filtered_df = filtered_df[filtered_df['cr'] > 0]
+
+                # Amount filtering
+                if min_amount > 0:
+                    filtered_df = filtered_df[(filtered_df['dr'] >= min_amount) | (filtered_df['cr'] >= min_amount)]
+
+                if max_amount > 0:
+                    filtered_df = filtered_df[(filtered_df['dr'] <= max_amount) | (filtered_df['cr'] <= max_amount)]
+
+                # Date filtering
+                if len(date_range) == 2:
+                    filtered_df['date'] = pd.to_datetime(filtered_df['date'], errors='coerce')
+                    filtered_df = filtered_df[(filtered_df['date'] >= pd.to_datetime(date_range[0])) &
+                                            (filtered_df['date'] <= pd.to_datetime(date_range[1]))]
+
+                stats = {
+                    "count": len(filtered_df),
+                    "total_debit": filtered_df['dr'].sum(),
+                    "total_credit": filtered_df['cr'].sum(),
+                    "dr_quantile": filtered_df['dr'].quantile(0.9),
+                    "cr_quantile": filtered_df['cr'].quantile(0.9)
+                }
+                display_df = filtered_df.drop(columns=['desc_key'], errors='ignore').sort_values('date', ascending=False)
+            else:
+                # The statement is registered once per upload and engine; filters,
+                # stats and the displayed page are computed by the SQL engine
+                store_id = (statement_id, explorer_engine)
+                if st.session_state.get('sql_store_id') != store_id:
+                    if 'sql_store' in st.session_state:
+                        st.session_state.sql_store.close()
+                    st.session_state.sql_store = StatementStore(explorer_engine)
+                    st.session_state.sql_table = st.session_state.sql_store.register(
+                        table_name(os.path.splitext(uploaded_files[0].name)[0]), df)
+                    st.session_state.sql_store_id = store_id
+                store, table = st.session_state.sql_store, st.session_state.sql_table
+
+                stats = store.quick_stats(table, filters)
+                display_df = store.filter_rows(table, filters, limit=EXPLORER_ROW_LIMIT)
+
             # Display filtered results
+            shown = f" (newest {len(display_df):,} shown)" if len(display_df) < stats["count"] else ""
             st.markdown(f"""
             <div class="glass-card">
                 <h3>📋 Filtered Results</h3>
                 <p style="color: rgba(255,255,255,0.7);">
-                    Showing {len(filtered_df):,} transactions out of {len(df):,} total
+                    Showing {stats["count"]:,} transactions out of {len(df):,} total{shown}
                 </p>
             </div>
             """, unsafe_allow_html=True)
             
-            if not filtered_df.empty:
-                # Enhanced dataframe display
-                display_df = filtered_df.sort_values('date', ascending=False)
-                
+            if stats["count"]:
                 # Add some styling to highlight large transactions
                 def highlight_large_transactions(row):
-                    if row['dr'] > filtered_df['dr'].quantile(0.9) or row['cr'] > filtered_df['cr'].quantile(0.9):
+                    if row['dr'] > stats["dr_quantile"] or row['cr'] > stats["cr_quantile"]:
                         return ['background-color: rgba(255, 107, 107, 0.2)'] * len(row)
                     return [''] * len(row)
                 
@@ -522,18 +963,18 @@ else:
                 
                 with col1:
                     st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                    st.metric("📊 Filtered Count", f"{len(filtered_df):,}")
+                    st.metric("📊 Filtered Count", f"{stats['count']:,}")
                     st.markdown('</div>', unsafe_allow_html=True)
                 
                 with col2:
                     st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                    filtered_debits = filtered_df['dr'].sum()
+                    filtered_debits = stats['total_debit']
                     st.metric("💸 Total Debits", f"₹{filtered_debits:,.2f}")
                     st.markdown('</div>', unsafe_allow_html=True)
                 
                 with col3:
                     st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                    filtered_credits = filtered_df['cr'].sum()
+                    filtered_credits = stats['total_credit']
                     st.metric("💰 Total Credits", f"₹{filtered_credits:,.2f}")
                     st.markdown('</div>', unsafe_allow_html=True)
                 
@@ -542,6 +983,14 @@ else:
                     net_filtered = filtered_credits - filtered_debits
                     st.metric("📈 Net Amount", f"₹{net_filtered:,.2f}")
                     st.markdown('</div>', unsafe_allow_html=True)
+
+                if explorer_engine != "pandas":
+                    with st.expander("🧮 Group by"):
+                        dimensions = st.multiselect("Dimensions", ["month", "weekday", "day", "counterparty", "direction"],
+                                                    default=["month"])
+                        if dimensions:
+                            st.dataframe(store.aggregate(table, dimensions, filters),
+                                         use_container_width=True, hide_index=True)
             else:
                 st.info("🔍 No transactions match your filter criteria. Try adjusting your search parameters.")
             
@@ -560,7 +1009,21 @@ else:
                 </div>
                 """, unsafe_allow_html=True)
 
+                # Retrieval index and query engine are built once per uploaded statement
+                if st.session_state.get('query_statement') != statement_id:
+                    st.session_state.retrieval_index = TransactionIndex(df)
+                    st.session_state.query_engine = QueryEngine(df, analysis, st.session_state.retrieval_index)
+                    st.session_state.query_statement = statement_id
+                query_engine = st.session_state.query_engine
+
+                # LLM calls and DOCX builds run on the shared background job queue
+                job_queue = get_job_queue()
+                if 'session_id' not in st.session_state:
+                    st.session_state.session_id = uuid.uuid4().hex[:12]
+
                 sample_queries = [
+                    "What are my top 5 spending categories?",
+                    "Show my monthly spending breakdown",
                     "Analyze my spending patterns and identify areas where I can save money",
                     "Create a budget plan based on my transaction history",
                     "Identify any unusual or suspicious transactions",
@@ -577,6 +1040,12 @@ else:
                                     help=f"Click to analyze: {query}"):
                             st.session_state.llm_question = query
                             st.session_state.llm_style = "default"
+                            # Aggregation questions are answered on the spot, no LLM call
+                            local = query_engine.answer(query)
+                            if local is not None:
+                                st.session_state.llm_result = local["answer"]
+                                st.session_state.llm_table = local["table"]
+                                st.session_state.llm_prompt_text = f"Answered locally by the '{local['template']}' query template; no prompt was sent."
                             st.rerun()
 
                 st.markdown("""
@@ -616,13 +1085,46 @@ else:
 
                 # Run Analysis
                 if st.button("🚀 Run AI Analysis"):
-                    with st.spinner("🧠 Thinking..."):
-                        llm = load_llm()
-                        prompt_text = format_analysis_for_prompt(analysis, df)
-                        result = run_analysis(llm, prompt_text, question, style)
+                    local = query_engine.answer(question) if style == "default" else None
+                    if local is not None:
+                        st.session_state.llm_result = local["answer"]
+                        st.session_state.llm_table = local["table"]
+                        st.session_state.llm_prompt_text = f"Answered locally by the '{local['template']}' query template; no prompt was sent."
+                    else:
+                        st.session_state.llm_job_id = job_queue.submit(
+                            "analysis", analysis_job, analysis, df, style, question,
+                            compact=compact_prompt, index=st.session_state.retrieval_index, backend=llm_backend,
+                            owner=st.session_state.session_id,
+                            params={"style": style, "question": question, "backend": llm_backend}
+                        )
 
-                    st.session_state.llm_result = result
-                    st.session_state.llm_prompt_text = prompt_text
+                # Background analysis status
+                if 'llm_job_id' in st.session_state:
+                    job = job_queue.status(st.session_state.llm_job_id)
+                    # Finished jobs are purged after a while; the result only lives in memory
+                    payload = job_queue.result(job['id']) if job is not None and job['status'] == 'done' else None
+                    if job is None or job['status'] == 'cancelled' or (job['status'] == 'done' and payload is None):
+                        st.warning("✖️ Analysis cancelled." if job is not None and job['status'] == 'cancelled'
+                                   else "⌛ Analysis result expired. Run it again.")
+                        del st.session_state.llm_job_id
+                    elif job['status'] in ('queued', 'running'):
+                        st.info(f"🧠 Analysis {job['status']}... ({job['elapsed']}s) — the dashboard stays usable meanwhile.")
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.button("🔄 Refresh status", key="llm_job_refresh")
+                        with col2:
+                            if st.button("✖️ Cancel analysis", key="llm_job_cancel"):
+                                job_queue.cancel(st.session_state.llm_job_id)
+                                st.rerun()
+                    elif job['status'] == 'failed':
+                        st.error(f"❌ Analysis failed: {job['error']}")
+                        del st.session_state.llm_job_id
+                    else:
+                        st.session_state.llm_perf_spans = payload["spans"]
+                        st.session_state.llm_result = payload["result"]
+                        st.session_state.llm_table = None
+                        st.session_state.llm_prompt_text = payload["prompt_text"]
+                        del st.session_state.llm_job_id
 
                 # Show Result
                 if 'llm_result' in st.session_state:
@@ -632,6 +1134,8 @@ else:
                     </div>
                     """, unsafe_allow_html=True)
                     st.success(st.session_state.llm_result)
+                    if st.session_state.get('llm_table') is not None:
+                        st.dataframe(st.session_state.llm_table, use_container_width=True, hide_index=True)
 
                     # Prompt & Token Stats
                     with st.expander("📦 View Generated Prompt & Token Info"):
@@ -649,17 +1153,135 @@ else:
                                 st.metric("📝 Characters", f"{chars:,}")
                                 st.progress(min(tokens / 4096, 1.0))
                                 st.caption(f"Context usage: {tokens / 4096:.1%}")
+                                if st.button("📏 Compare encodings"):
+                                    comparison = compare_prompt_encodings(analysis, df)
+                                    st.metric("🗜️ Compact Tokens", f"{comparison['compact']['tokens']:,}",
+                                              delta=f"-{comparison['token_savings']:.1%}", delta_color="inverse")
+                                    st.caption(f"Full encoding: {comparison['full']['tokens']:,} tokens")
                             st.markdown('</div>', unsafe_allow_html=True)
 
 
-                    # 📥 DOCX Download
-                    doc_buffer = generate_docx(question, st.session_state.llm_result)
-                    st.download_button("📥 Download DOCX", data=doc_buffer,
-                                    file_name="financial_ai_report.docx",
-                                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+                    # 📥 DOCX report, prepared only on request and cached per question/answer
+                    docx_key = report_key(question, st.session_state.llm_result, analysis)
+                    docx_bytes = cached_report(docx_key)
+                    report = None
+                    if docx_bytes is None and st.session_state.get('llm_report_key') == docx_key:
+                        report = job_queue.status(st.session_state.llm_report_job_id)
+                        if report is not None and report['status'] == 'done':
+                            docx_bytes = job_queue.result(report['id'])
+
+                    if docx_bytes is not None:
+                        st.download_button("📥 Download DOCX", data=docx_bytes,
+                                        file_name="financial_ai_report.docx",
+                                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+                    elif report is not None and report['status'] in ('queued', 'running'):
+                        st.caption("📄 Preparing DOCX report...")
+                        st.button("🔄 Refresh", key="report_job_refresh")
+                    else:
+                        if report is not None and report['status'] == 'failed':
+                            st.caption(f"📄 DOCX report failed: {report['error']}")
+                        if st.button("📄 Prepare DOCX report"):
+                            st.session_state.llm_report_job_id = job_queue.submit(
+                                "report", generate_docx, question, st.session_state.llm_result, analysis,
+                                owner=st.session_state.session_id, params={"question": question}
+                            )
+                            st.session_state.llm_report_key = docx_key
+                            st.rerun()
 
                     st.markdown('</div>', unsafe_allow_html=True)
 
+                # Recent background jobs for this session
+                with st.expander("🗂️ Background Jobs"):
+                    jobs = job_queue.list_jobs(owner=st.session_state.session_id, limit=10)
+                    if jobs:
+                        st.dataframe(pd.DataFrame(jobs)[['id', 'kind', 'status', 'elapsed', 'error']],
+                                    use_container_width=True, hide_index=True)
+                        active = [job['id'] for job in jobs if job['status'] in ('queued', 'running')]
+                        if active:
+                            cancel_id = st.selectbox("Active job", active)
+                            if st.button("✖️ Cancel job"):
+                                job_queue.cancel(cancel_id)
+                                st.rerun()
+                    else:
+                        st.caption("No jobs submitted yet.")
+
+        with tab5:
+            st.markdown('<div class="animate-fadeInUp">', unsafe_allow_html=True)
+
+            st.markdown("""
+            <div class="glass-card">
+                <h2>⏱️ Pipeline Performance</h2>
+                <p style="color: rgba(255,255,255,0.7);">Wall time, CPU time, rows and peak memory for each stage</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+            perf_records = st.session_state.get('perf_spans', []) + st.session_state.get('llm_perf_spans', [])
+            perf_df = pd.DataFrame(perf_records)
+
+            if not show_performance:
+                st.info("⏱️ Enable **Performance** in the sidebar to track stage timings (and **Track Memory** for peaks).")
+            elif not perf_df.empty:
+                col1, col2, col3 = st.columns(3)
+
+                with col1:
+                    st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                    st.metric("⏱️ Total Wall Time", f"{perf_df.loc[perf_df['depth'] == 0, 'wall_s'].sum():.3f}s")
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+                with col2:
+                    st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                    st.metric("🧮 Total CPU Time", f"{perf_df.loc[perf_df['depth'] == 0, 'cpu_s'].sum():.3f}s")
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+                with col3:
+                    st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+                    peak = perf_df['peak_mem_mb'].max()
+                    st.metric("💾 Peak Memory", f"{peak:,.2f} MB" if pd.notna(peak) else "n/a",
+                              help=None if pd.notna(peak) else "Enable Track Memory in the sidebar (one session at a time)")
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+                fig_perf = go.Figure()
+                fig_perf.add_trace(go.Bar(
+                    x=perf_df['name'],
+                    y=perf_df['wall_s'],
+                    name='Wall Time',
+                    marker_color='#4facfe'
+                ))
+                fig_perf.add_trace(go.Bar(
+                    x=perf_df['name'],
+                    y=perf_df['cpu_s'],
+                    name='CPU Time',
+                    marker_color='#667eea'
+                ))
+
+                fig_perf.update_layout(
+                    title="Time per Stage",
+                    xaxis_title="Stage",
+                    yaxis_title="Seconds",
+                    barmode='group',
+                    template="plotly_dark",
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='white'),
+                    height=400
+                )
+
+                st.plotly_chart(fig_perf, use_container_width=True)
+                st.dataframe(perf_df, use_container_width=True)
+
+            backend_stats = BACKEND_METRICS.summary()
+            if backend_stats:
+                st.markdown("#### 🧠 LLM Backends")
+                st.caption("Recent calls across all sessions; tokens estimated at ~4 characters each")
+                st.dataframe(pd.DataFrame.from_dict(backend_stats, orient='index').rename_axis('backend').reset_index(),
+                             use_container_width=True, hide_index=True)
+
+            if 'perf_profile' in st.session_state:
+                with st.expander("🧪 Profiler Report"):
+                    st.code(st.session_state.perf_profile, language="text")
+
+            st.markdown('</div>', unsafe_allow_html=True)
+
     except Exception as e:
         st.error(f"""
         ❌ **Error Processing File**
@@ -691,7 +1313,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Floating stats (if data is loaded)
-if uploaded_file and 'analysis' in locals():
+if uploaded_files and 'analysis' in locals():
   st.markdown("""
 <style>
 #emoji-buddy {
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from app.CATEGORIZE import categorize_transactions
+
+
+def _categories(descriptions):
+    return categorize_transactions(pd.Series(descriptions)).tolist()
+
+
+def test_first_rule_in_priority_order_wins():
+    assert _categories([
+        "REFUND OF SALARY ADVANCE",          # salary outranks refund, though refund comes first
+        "NEFT CR-ACME CORP-SALARY",          # salary outranks bank_transfer
+        "ATM CASH WDL CHARGES",              # cash_withdrawal outranks fees_charges
+        "UPI/DR/4421/RAHUL KUMAR/HDFC/rahul@ybl/Rent",  # rent outranks upi_transfer
+        "SWIGGY INSTAMART GROCERY",          # food outranks groceries
+        "CHQ PAID-MICR CLG-1234",
+        "SOMETHING UNHEARD OF",
+    ]) == ["salary", "salary", "cash_withdrawal", "rent", "food", "cheque", "other"]
+
+
+def test_known_payee_overrides_the_rules():
+    assert _categories([
+        # The rules would say refund and utilities; the UPI payee decides
+        "UPI/CR/118822334455/UBER INDIA/UTIB/uber@axis/Refund",
+        "UPI/DR/118822334456/AIRTEL/HDFC/airtel@ybl/Bill pay",
+        # Unknown payee falls back to the rules
+        "UPI/DR/118822334457/CORNER SHOP/HDFC/shop@ybl/Refund",
+    ]) == ["travel", "telecom", "refund"]
+
+
+def test_categorical_keys_match_raw_descriptions():
+    raw = pd.Series(["UPI/DR/1/NETFLIX/HDFC/netflix@icici/Payment", "NEFT CR-ACME CORP-SALARY",
+                     "UPI/DR/2/NETFLIX/HDFC/netflix@icici/Payment", None])
+    keys = raw.str.replace(r"\d+", "#", regex=True).astype("category")
+    expected = ["entertainment", "salary", "entertainment", "other"]
+    assert categorize_transactions(raw).tolist() == expected
+    assert categorize_transactions(keys).tolist() == expected
@@ -0,0 +1,42 @@
+import numpy as np
+
+from app.BENCH import PREAMBLE, generate_statement
+from app.DPROCESS import analyze_bank_transactions, analyze_statement_chunked, process_csv_file
+
+ROWS = 5_000
+
+
+def _statement_with_duplicates(path, copies=20, seed=1):
+    """Synthetic statement where some rows were exported twice
+
+    Half the copies follow their original (overlapping exports stacked in
+    order), half are appended at the end, far from the original's chunk.
+    """
+    generate_statement(ROWS, str(path), seed=seed)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    head, rows = lines[:len(PREAMBLE) + 1], lines[len(PREAMBLE) + 1:]
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(rows), size=copies, replace=False)
+    adjacent, appended = set(picked[:copies // 2].tolist()), picked[copies // 2:]
+    out = []
+    for i, row in enumerate(rows):
+        out.append(row)
+        if i in adjacent:
+            out.append(row)
+    out += [rows[i] for i in appended]
+    path.write_text("\n".join(head + out) + "\n", encoding="utf-8")
+    return path
+
+
+def test_chunked_matches_in_memory_with_duplicates(tmp_path):
+    path = _statement_with_duplicates(tmp_path / "statement.csv")
+    df = process_csv_file(str(path))
+    assert df.attrs["integrity"]["duplicates"] == 20
+
+    in_memory = analyze_bank_transactions(df)
+    for chunksize in (700, ROWS * 2):
+        chunked = analyze_statement_chunked(str(path), chunksize=chunksize)
+        assert chunked["total_transactions"] == in_memory["total_transactions"] == ROWS
+        # Everything but the run timestamp
+        chunked.pop("analysis_date"), in_memory.pop("analysis_date", None)
+        assert chunked == in_memory
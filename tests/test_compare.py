@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from app.BENCH import generate_statement
+from app.COMPARE import PRESETS, build_period_totals
+from app.CUBE import build_cube
+from app.DPROCESS import analyze_bank_transactions, process_csv_file
+
+
+@pytest.fixture(scope="module")
+def statement(tmp_path_factory):
+    # 01-Jan-2015 to 22-Aug-2016: the last month is partial
+    path = tmp_path_factory.mktemp("compare") / "statement.csv"
+    generate_statement(3_000, str(path), seed=5)
+    df = process_csv_file(str(path))
+    return df, build_period_totals(build_cube(df), analyze_bank_transactions(df))
+
+
+def _sums(df, start, end):
+    rows = df[(df['date'] >= start) & (df['date'] <= end)]
+    return {"debit": round(rows['dr'].sum(), 2), "credit": round(rows['cr'].sum(), 2),
+            "debit_count": int((rows['dr'] > 0).sum()), "credit_count": int((rows['cr'] > 0).sum()),
+            "closing_balance": round(float(rows['bal'].iloc[-1]), 2)}
+
+
+def _check(df, side):
+    expected = _sums(df, pd.Timestamp(side["start"]), pd.Timestamp(side["end"]))
+    assert {key: side[key] for key in expected} == pytest.approx(expected, abs=0.005)
+
+
+@pytest.mark.parametrize("preset", list(PRESETS))
+@pytest.mark.parametrize("reference", [None, "2016-03-15"])
+def test_presets_equal_direct_sums(statement, preset, reference):
+    df, totals = statement
+    result = totals.compare_preset(preset, reference=reference, like_for_like=False)
+    _check(df, result["current"])
+    _check(df, result["previous"])
+    change = result["changes"]["debit"]
+    assert change["change"] == pytest.approx(result["current"]["debit"] - result["previous"]["debit"], abs=0.01)
+
+
+def test_whole_months_equal_groupby(statement):
+    df, totals = statement
+    monthly = df.groupby(df['date'].dt.to_period("M"))[['dr', 'cr']].sum()
+    for period in monthly.index[1:-1]:
+        result = totals.compare_preset("month", reference=period.start_time, like_for_like=False)
+        assert result["current"]["debit"] == pytest.approx(monthly.loc[period, 'dr'], abs=0.005)
+        assert result["previous"]["credit"] == pytest.approx(monthly.loc[period - 1, 'cr'], abs=0.005)
+
+
+def test_like_for_like_cuts_the_previous_period(statement):
+    df, totals = statement
+    result = totals.compare_preset("month")
+    assert (result["current"]["start"], result["current"]["end"]) == ("01-Aug-2016", "22-Aug-2016")
+    assert (result["previous"]["start"], result["previous"]["end"]) == ("01-Jul-2016", "22-Jul-2016")
+    _check(df, result["previous"])
+
+    result = totals.compare_preset("month_last_year")
+    assert (result["previous"]["start"], result["previous"]["end"]) == ("01-Aug-2015", "22-Aug-2015")
+    _check(df, result["previous"])
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.FORECAST import forecast_accounts, forecast_batch
+
+
+def _batch(steps=36):
+    """Rows with 36, 6, 2 and no observations (shorter rows start later)"""
+    months = np.arange(steps)
+    values = np.full((4, steps), np.nan)
+    values[0] = 1_000 + 10 * months + 200 * np.sin(2 * np.pi * months / 12)
+    values[1, -6:] = [500, 520, 540, 560, 580, 600]
+    values[2, -2:] = [300, 310]
+    return values
+
+
+@pytest.mark.parametrize("horizon", [1, 6, 12, 18])
+def test_batch_output_shapes(horizon):
+    result = forecast_batch(_batch(), horizon=horizon)
+    for key in ("forecast", "lower", "upper"):
+        assert result[key].shape == (4, horizon)
+    for key in ("method", "alpha", "beta", "gamma", "sigma", "observations"):
+        assert result[key].shape == (4,)
+    assert result["observations"].tolist() == [36, 6, 2, 0]
+    assert result["method"].tolist() == ["holt_winters", "damped_trend", "simple", "simple"]
+    # No history, no forecast
+    assert np.isnan(result["forecast"][3]).all()
+
+
+def test_bands_widen_around_the_forecast():
+    result = forecast_batch(_batch(), horizon=12, floor=0.0)
+    forecast, lower, upper = (result[key][:3] for key in ("forecast", "lower", "upper"))
+    assert (lower <= forecast).all() and (forecast <= upper).all()
+    assert (lower >= 0).all()
+    assert (np.diff(upper - lower, axis=1) >= 0).all()
+
+
+def test_flat_series_forecasts_its_level():
+    result = forecast_batch(np.full((1, 30), 250.0), horizon=4)
+    np.testing.assert_allclose(result["forecast"], 250.0)
+    np.testing.assert_allclose(result["sigma"], 0.0)
+
+
+def test_accounts_forecast_after_their_own_last_month():
+    months = pd.date_range("2023-01-01", periods=18, freq="MS")
+    short = months[-5:-2]
+    accounts = {
+        "long": (pd.DataFrame({"date": months, "dr": 1_000.0, "cr": 1_500.0}), None, None),
+        "short": (pd.DataFrame({"date": short, "dr": [100.0, 120.0, 140.0], "cr": 0.0}), None, None),
+        "empty": (pd.DataFrame(columns=["date", "dr", "cr"]), None, None),
+    }
+    sections = forecast_accounts(accounts, horizon=3)
+    assert set(sections) == {"long", "short"}
+    assert [m["date"] for m in sections["long"]["months"]] == list(pd.date_range("2024-07-01", periods=3, freq="MS"))
+    assert [m["date"] for m in sections["short"]["months"]] == list(pd.date_range("2024-05-01", periods=3, freq="MS"))
+    assert sections["short"]["basis_months"] == 3
+    assert sections["long"]["projected_annual"]["savings"] == pytest.approx(3 * 500.0)
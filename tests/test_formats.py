@@ -0,0 +1,28 @@
+import io
+
+import pytest
+
+from app.BENCH import generate_statement
+from app.FORMATS import sniff_format
+
+
+@pytest.mark.parametrize("mode", ["text", "binary", "stringio", "bytesio"])
+def test_header_offset_with_non_ascii_preamble(tmp_path, mode):
+    path = tmp_path / "statement.csv"
+    generate_statement(20, str(path), seed=1)
+    text = path.read_text(encoding="utf-8").replace("MR SYNTHETIC CUSTOMER", "SRÍ ÑÁMÉ ₹ CUSTOMER")
+    path.write_text(text, encoding="utf-8")
+    streams = {
+        "text": lambda: open(path, encoding="utf-8"),
+        "binary": lambda: open(path, "rb"),
+        "stringio": lambda: io.StringIO(text),
+        "bytesio": lambda: io.BytesIO(text.encode("utf-8")),
+    }
+    with streams[mode]() as stream:
+        bank_format, offset = sniff_format(stream)
+        assert bank_format is not None
+        assert stream.tell() == 0
+        stream.seek(offset)
+        header = stream.readline()
+    header = header.decode("utf-8") if isinstance(header, bytes) else header
+    assert header.startswith("Txn Date,Value Date")
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from app.FRAUD import screen_transactions
+
+
+def _statement():
+    """Forty ordinary debits over forty days, then one of each suspicious pattern"""
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2024-01-01", periods=40, freq="D")
+    df = pd.DataFrame({
+        "date": days,
+        "desc": [f"UPI/DR/SHOP{i % 5}/Payment" for i in range(40)],
+        "dr": np.round(rng.uniform(200, 400, size=40), 2),
+        "cr": 0.0
+    })
+    suspicious = pd.DataFrame([
+        ("2024-02-10", "UPI/DR/JEWELLER/Payment", 25_437.50, 0.0),   # outlier
+        ("2024-02-11", "UPI/DR/CAFE/Payment", 310.00, 0.0),          # duplicate pair
+        ("2024-02-11", "UPI/DR/CAFE/Payment", 310.00, 0.0),
+        ("2024-02-12", "UPI/DR/GAMES/Payment", 101.00, 0.0),         # rapid sequence
+        ("2024-02-12", "UPI/DR/GAMES/Payment", 202.00, 0.0),
+        ("2024-02-12", "UPI/DR/GAMES/Payment", 303.00, 0.0),
+        ("2024-02-13", "NEFT CR-ACME CORP", 0.0, 20_000.00),         # round amount
+    ], columns=["date", "desc", "dr", "cr"])
+    suspicious["date"] = pd.to_datetime(suspicious["date"])
+    return pd.concat([df, suspicious], ignore_index=True)
+
+
+def test_each_check_flags_its_rows():
+    df = _statement()
+    flagged, summary = screen_transactions(df)
+    flags = flagged["flags"]
+
+    assert summary == {"screened": len(df), "flagged": 7, "outlier": 1, "duplicate": 2,
+                       "rapid_sequence": 3, "round_amount": 1}
+    assert flags[40] == "outlier"
+    assert flags[41] == flags[42] == "duplicate"
+    assert flags[43] == flags[44] == flags[45] == "rapid_sequence"
+    assert flags[46] == "round_amount"
+    # Outliers and duplicates weigh double, and sort first
+    assert flagged["risk_score"].tolist() == [2, 2, 2, 1, 1, 1, 1]
+    assert flagged.index[0] == 40
+
+
+def test_ordinary_statement_flags_nothing():
+    flagged, summary = screen_transactions(_statement().iloc[:40])
+    assert flagged.empty
+    assert summary["flagged"] == 0
+
+    empty, summary = screen_transactions(_statement().iloc[:0])
+    assert empty.empty and summary == {"screened": 0, "flagged": 0}
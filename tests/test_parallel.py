@@ -0,0 +1,31 @@
+import pytest
+
+from app.BENCH import generate_statement
+from app.DPROCESS import analyze_bank_transactions, process_csv_file
+from app.PARALLEL import analyze_parallel
+
+
+@pytest.fixture(scope="module")
+def statement(tmp_path_factory):
+    path = tmp_path_factory.mktemp("parallel") / "statement.csv"
+    generate_statement(6_000, str(path), seed=11)
+    df = process_csv_file(str(path))
+    expected = analyze_bank_transactions(df)
+    expected.pop("analysis_date")
+    return df, expected
+
+
+@pytest.mark.parametrize("by", ["month", "rows"])
+def test_sharded_analysis_equals_serial(statement, by):
+    df, expected = statement
+    result = analyze_parallel(df, workers=3, by=by, min_shard_rows=100)
+    result.pop("analysis_date")
+    assert result == expected
+
+
+def test_raw_descriptions_only(statement):
+    # Without the interned columns the parent derives them before sharing
+    df, expected = statement
+    result = analyze_parallel(df.drop(columns=["desc_key", "counterparty"]), workers=2, min_shard_rows=100)
+    result.pop("analysis_date")
+    assert result == expected
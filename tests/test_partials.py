@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from app.AGGREGATE import AnalysisPartial, analyze_chunks, merge_partials
+from app.BENCH import generate_statement
+from app.DPROCESS import analyze_bank_transactions, process_csv_file
+
+
+@pytest.fixture(scope="module")
+def statement(tmp_path_factory):
+    path = tmp_path_factory.mktemp("partials") / "statement.csv"
+    generate_statement(4_000, str(path), seed=7)
+    df = process_csv_file(str(path))
+    expected = analyze_bank_transactions(df)
+    expected.pop("analysis_date")
+    return df, expected
+
+
+def _slices(df, cuts):
+    bounds = [0, *cuts, len(df)]
+    return [df.iloc[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("cuts", [
+    [2_000],
+    [1, 999, 1_000, 2_500, 2_500, 3_999],   # single rows, an empty slice, days split across slices
+])
+def test_merged_partials_equal_in_memory(statement, cuts):
+    df, expected = statement
+    parts = [AnalysisPartial.from_frame(chunk) for chunk in _slices(df, cuts)]
+    result = merge_partials(parts).finalize()
+    result.pop("analysis_date")
+    assert result == expected
+
+
+def test_analyze_chunks_equals_in_memory(statement):
+    df, expected = statement
+    chunks = (df.iloc[start:start + 333] for start in range(0, len(df), 333))
+    result = analyze_chunks(chunks)
+    result.pop("analysis_date")
+    assert result == expected
+
+
+def test_slices_follow_month_boundaries_too(statement):
+    df, expected = statement
+    months = df['date'].dt.to_period("M").to_numpy()
+    cuts = np.flatnonzero(months[1:] != months[:-1]) + 1
+    result = analyze_chunks(_slices(df, cuts.tolist()))
+    result.pop("analysis_date")
+    assert result == expected
@@ -0,0 +1,95 @@
+import pytest
+
+from app.BENCH import generate_statement
+from app.DPROCESS import analyze_bank_transactions, process_csv_file
+from app.QUERY import QueryEngine
+
+
+@pytest.fixture(scope="module")
+def statement(tmp_path_factory):
+    path = tmp_path_factory.mktemp("query") / "statement.csv"
+    generate_statement(3_000, str(path), seed=5)
+    df = process_csv_file(str(path))
+    return df, QueryEngine(df, analyze_bank_transactions(df))
+
+
+def _answer(engine, question, template):
+    result = engine.answer(question)
+    assert result is not None and result["template"] == template
+    return result["table"]
+
+
+def test_top_merchants_and_sources(statement):
+    df, engine = statement
+    names = df['counterparty'].astype(str)
+    table = _answer(engine, "top 3 merchants", "top_n")
+    expected = df.groupby(names)['dr'].sum().nlargest(3)
+    assert table['counterparty'].tolist() == expected.index.tolist()
+    assert table['debit'].tolist() == pytest.approx(expected.tolist())
+
+    table = _answer(engine, "top 2 sources of income", "top_n")
+    assert table['counterparty'].tolist() == df.groupby(names)['cr'].sum().nlargest(2).index.tolist()
+
+
+def test_top_categories(statement):
+    _, engine = statement
+    table = _answer(engine, "top 5 spending categories", "top_n")
+    categories = engine.analysis["category_analysis"]
+    expected = sorted(categories, key=lambda name: categories[name]["debit"], reverse=True)[:5]
+    assert table['category'].tolist() == expected
+
+
+def test_largest_transactions(statement):
+    df, engine = statement
+    table = _answer(engine, "largest 3 debits", "top_n")
+    assert table['dr'].tolist() == df['dr'].nlargest(3).tolist()
+    # Singular subject: one row
+    assert len(_answer(engine, "biggest expense", "top_n")) == 1
+
+
+def test_monthly_breakdown(statement):
+    df, engine = statement
+    table = _answer(engine, "spending by month", "monthly")
+    expected = df.groupby(df['date'].dt.to_period("M"))[['dr', 'cr']].sum()
+    assert len(table) == len(expected)
+    assert table['debit'].tolist() == pytest.approx(expected['dr'].tolist())
+    assert table['credit'].tolist() == pytest.approx(expected['cr'].tolist())
+
+
+def test_date_range_totals(statement):
+    df, engine = statement
+    table = _answer(engine, "how much between 01-03-2016 and 31-03-2016", "date_range")
+    march = df[(df['date'] >= "2016-03-01") & (df['date'] < "2016-04-01")]
+    row = table.iloc[0]
+    assert row['transactions'] == len(march)
+    assert row['debit'] == pytest.approx(march['dr'].sum())
+    assert row['credit'] == pytest.approx(march['cr'].sum())
+
+
+def test_filtered_totals(statement):
+    df, engine = statement
+    netflix = df[df['desc'].str.contains("netflix", case=False) & (df['dr'] > 0)]
+    row = _answer(engine, "how much did i spend on netflix", "total").iloc[0]
+    assert row['transactions'] == len(netflix)
+    assert row['debit'] == pytest.approx(netflix['dr'].sum())
+
+    swiggy = df[df['desc'].str.contains("swiggy", case=False) & (df['dr'] > 0)
+                & (df['date'].dt.year == 2016) & (df['date'].dt.month == 3)]
+    row = _answer(engine, "total spent on swiggy in march 2016", "total").iloc[0]
+    assert row['transactions'] == len(swiggy)
+    assert row['debit'] == pytest.approx(swiggy['dr'].sum())
+
+    row = _answer(engine, "how many debits", "total").iloc[0]
+    assert row['transactions'] == int((df['dr'] > 0).sum())
+
+
+@pytest.mark.parametrize("question", [
+    "why is my spending so high",       # reasoning
+    "what did i spend last month",      # relative period
+    "top 3 categories in 2016",         # category totals are whole-statement only
+    "hello there",                      # no template
+    "",
+])
+def test_unmatched_questions_fall_back(statement, question):
+    _, engine = statement
+    assert engine.answer(question) is None
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from app.LLMSTUB import StubServer
+from app.RATELIMIT import RateLimiter
+
+
+def _completion(url, prompt="How much did I spend?"):
+    """One /chat/completions request; a 429 raises urllib's HTTPError"""
+    body = json.dumps({"model": "stub-model", "messages": [{"role": "user", "content": prompt}]}).encode("utf-8")
+    request = urllib.request.Request(url + "/v1/chat/completions", data=body,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())["choices"][0]["message"]["content"]
+
+
+def _limiter(**kwargs):
+    # Budgets far above what the tests use, so only the server throttles
+    return RateLimiter(requests_per_minute=6000, tokens_per_minute=600_000, **kwargs)
+
+
+def test_retries_honor_retry_after():
+    limiter = _limiter(max_retries=3)
+    with StubServer(latency=0, fail_first=2, retry_after=0.2) as stub:
+        started = time.perf_counter()
+        answer = limiter.call(lambda: _completion(stub.url))
+        elapsed = time.perf_counter() - started
+
+    assert answer.startswith("Stub analysis")
+    assert stub.state.requests == 3 and stub.state.throttled == 2
+    assert limiter.stats["upstream"] == 3
+    assert limiter.stats["retries"] == 2
+    assert limiter.stats["failures"] == 0
+    # Two Retry-After waits, not the 1s+ exponential backoff
+    assert 0.4 <= elapsed < 1.5
+
+
+def test_429_drains_both_buckets():
+    limiter = _limiter(max_retries=1)
+    levels = {}
+
+    def sample():
+        # Halfway through the Retry-After sleep
+        time.sleep(0.15)
+        levels["requests"] = limiter.requests.tokens
+        levels["tokens"] = limiter.tokens.tokens
+
+    with StubServer(latency=0, fail_first=1, retry_after=0.3) as stub:
+        sampler = threading.Thread(target=sample)
+        sampler.start()
+        limiter.call(lambda: _completion(stub.url))
+        sampler.join()
+
+    # Both budgets are in debt, so any other caller waits out the back-off too
+    assert levels["requests"] < 0
+    assert levels["tokens"] < 0
+
+
+def test_identical_calls_share_one_request():
+    limiter = _limiter()
+    results = []
+    with StubServer(latency=0.3) as stub:
+        def ask():
+            results.append(limiter.call(lambda: _completion(stub.url), key="same-prompt"))
+        threads = [threading.Thread(target=ask) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(results) == 5 and len(set(results)) == 1
+    assert stub.state.requests == 1
+    assert limiter.stats["calls"] == 5
+    assert limiter.stats["coalesced"] == 4
+    assert limiter.stats["upstream"] == 1
+
+
+def test_gives_up_after_max_retries():
+    limiter = _limiter(max_retries=2)
+    with StubServer(latency=0, fail_first=10, retry_after=0.05) as stub:
+        with pytest.raises(ValueError, match="after 3 attempt"):
+            limiter.call(lambda: _completion(stub.url))
+
+    assert stub.state.requests == 3
+    assert limiter.stats["upstream"] == 3
+    assert limiter.stats["retries"] == 2
+    assert limiter.stats["failures"] == 1
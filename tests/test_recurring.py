@@ -0,0 +1,51 @@
+import pandas as pd
+
+from app.RECURRING import detect_recurring_transactions
+
+
+def _frame(rows):
+    """Processed-statement frame from (date, desc, dr, cr) tuples"""
+    df = pd.DataFrame(rows, columns=["date", "desc", "dr", "cr"])
+    df["date"] = pd.to_datetime(df["date"])
+    return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+def test_monthly_salary_and_weekly_subscription():
+    rows = [(f"2024-{month:02d}-01", f"NEFT CR-HDFC000{month}-ACME CORP-SALARY", 0.0, 55_000.0 + month)
+            for month in range(1, 7)]
+    rows += [(day, "UPI/DR/SPOTIFY/Payment", 119.0, 0.0)
+             for day in pd.date_range("2024-01-03", periods=8, freq="7D").strftime("%Y-%m-%d")]
+    # One-off payments to a merchant never recur
+    rows += [("2024-02-14", "UPI/DR/FLORIST/Payment", 900.0, 0.0),
+             ("2024-05-02", "UPI/DR/FLORIST/Payment", 4_000.0, 0.0)]
+
+    found = {item["period"]: item for item in detect_recurring_transactions(_frame(rows))}
+
+    assert set(found) == {"monthly", "weekly"}
+    salary = found["monthly"]
+    assert salary["direction"] == "credit"
+    assert salary["occurrences"] == 6
+    assert salary["regularity"] == 1.0
+    assert salary["last_date"] == "01-Jun-2024"
+    assert "SALARY" in salary["description"]
+
+    spotify = found["weekly"]
+    assert spotify["direction"] == "debit"
+    assert spotify["occurrences"] == 8
+    assert spotify["avg_amount"] == 119.0
+    assert spotify["annual_amount"] == round(119.0 * 365.25 / 7, 2)
+    assert spotify["next_expected"] == "28-Feb-2024"
+
+
+def test_irregular_gaps_and_amounts_are_not_recurring():
+    # Same payee, but the gaps wander and the amounts span several bands
+    rows = [("2024-01-01", "UPI/DR/PLUMBER/Payment", 500.0, 0.0),
+            ("2024-01-19", "UPI/DR/PLUMBER/Payment", 520.0, 0.0),
+            ("2024-03-30", "UPI/DR/PLUMBER/Payment", 480.0, 0.0),
+            ("2024-04-02", "UPI/DR/PLUMBER/Payment", 510.0, 0.0),
+            ("2024-05-01", "UPI/DR/GROCER/Payment", 300.0, 0.0),
+            ("2024-06-01", "UPI/DR/GROCER/Payment", 2_400.0, 0.0),
+            ("2024-07-01", "UPI/DR/GROCER/Payment", 90.0, 0.0)]
+
+    assert detect_recurring_transactions(_frame(rows)) == []
+    assert detect_recurring_transactions(_frame([])) == []
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ROLLING import WINDOWS, rolling_cash_flow
+
+
+@pytest.fixture(scope="module")
+def daily():
+    """Sparse daily totals (paise) and balances over about a year"""
+    rng = np.random.default_rng(3)
+    days = np.sort(rng.choice(np.arange(19_000, 19_400), size=220, replace=False)).astype(np.int64)
+    dr = rng.integers(0, 500_000, size=len(days))
+    cr = np.where(rng.random(len(days)) < 0.1, rng.integers(0, 5_000_000, size=len(days)), 0)
+    close = 100_000 + np.cumsum(cr - dr) / 100
+    low = close - rng.uniform(0, 2_000, size=len(days))
+    frame = pd.DataFrame({"dr": dr / 100, "cr": cr / 100, "close": close, "low": low},
+                         index=pd.to_datetime(days.astype("datetime64[D]")))
+    return days, dr, cr, close, low, frame
+
+
+def test_window_sums_equal_pandas_rolling(daily):
+    days, dr, cr, close, low, frame = daily
+    _, series = rolling_cash_flow(days, dr, cr, close, low)
+    # Dense calendar: quiet days have no flow and keep the last closing balance
+    dense = frame[["dr", "cr"]].asfreq("D", fill_value=0.0)
+    dense_low = frame["low"].reindex(dense.index).fillna(frame["close"].reindex(dense.index).ffill())
+
+    assert series["date"].tolist() == dense.index.tolist()
+    for window in WINDOWS:
+        debit = dense["dr"].rolling(window, min_periods=1).sum()
+        credit = dense["cr"].rolling(window, min_periods=1).sum()
+        np.testing.assert_allclose(series[f"debit_{window}d"], debit, atol=1e-6)
+        np.testing.assert_allclose(series[f"credit_{window}d"], credit, atol=1e-6)
+        np.testing.assert_allclose(series[f"net_{window}d"], credit - debit, atol=1e-6)
+        np.testing.assert_allclose(series[f"min_balance_{window}d"],
+                                   dense_low.rolling(window, min_periods=1).min(), atol=1e-6)
+        # Same as pandas' time-based window on the sparse days
+        np.testing.assert_allclose(series.set_index("date")[f"debit_{window}d"].loc[frame.index],
+                                   frame["dr"].rolling(f"{window}D").sum(), atol=1e-6)
+
+
+def test_summary_reads_complete_windows(daily):
+    days, dr, cr, close, low, frame = daily
+    summary, series = rolling_cash_flow(days, dr, cr, close, low)
+    assert set(summary) == {f"{window}d" for window in WINDOWS}
+
+    complete = series.iloc[29:]
+    metrics = summary["30d"]
+    assert metrics["avg_debit"] == round(complete["debit_30d"].mean(), 2)
+    assert metrics["peak_burn"]["debit"] == round(complete["debit_30d"].max(), 2)
+    assert metrics["worst_net"]["net"] == round(complete["net_30d"].min(), 2)
+    assert metrics["lowest_balance"]["min_balance"] == round(complete["min_balance_30d"].min(), 2)
+    assert metrics["latest"]["debit"] == round(series["debit_30d"].iloc[-1], 2)
+
+
+def test_windows_longer_than_the_statement_are_left_out():
+    days = np.array([19_000, 19_003, 19_010], dtype=np.int64)
+    summary, series = rolling_cash_flow(days, np.array([100, 200, 300]), np.zeros(3, dtype=np.int64))
+    assert set(summary) == {"7d"}
+    assert len(series) == 11
+
+    summary, series = rolling_cash_flow(np.array([], dtype=np.int64), [], [])
+    assert summary == {} and series.empty